@@ -0,0 +1,67 @@
+"""Benchmark of the binary command and CXFER paths against an in-process emulated dupico"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import os
+import timeit
+
+from dupicolib.board_interfaces.m3_board_commands import CommandCode, M3BoardCommands
+from dupicolib.board_interfaces.special_modes.cxfer import CXFERTransfer
+from dupicolib.board_utilities import BoardUtilities
+from dupicolib.emulators.link import EmulatedSerial
+from dupicolib.emulators.m3_emulator import M3Emulator
+from dupicolib.emulators.virtual_chips import VirtualROM
+
+# Taken from a 27C2001
+ADDRESS_PINS: list[int] = [12, 11, 10, 9, 8, 7, 6, 5, 27, 26, 23, 25, 4, 28, 29, 3, 2, 30]
+DATA_PINS: list[int] = [13, 14, 15, 17, 18, 19, 20, 22]
+
+def run(commands: int = 20000) -> dict[str, float]:
+    """Send `commands` READ commands, one by one and in bursts, then dump a 27C2001 with CXFER, also through the I/O thread
+
+    Args:
+        commands (int, optional): Number of commands to send. Defaults to 20000.
+
+    Returns:
+        dict[str, float]: Commands per second and CXFER throughput
+    """
+    image: bytes = os.urandom(1 << len(ADDRESS_PINS))
+    ser = EmulatedSerial(M3Emulator(VirtualROM(image, ADDRESS_PINS, DATA_PINS)))
+    BoardUtilities.initialize_connection(ser) # type: ignore
+
+    read_cmd: bytes = bytes([CommandCode.READ.value])
+
+    def single() -> None:
+        for _ in range(commands):
+            BoardUtilities.send_binary_command(ser, read_cmd, 8) # type: ignore
+
+    def burst() -> None:
+        M3BoardCommands.read_pins_sequence(commands, None, ser) # type: ignore
+
+    def cxfer() -> None:
+        # The configuration is sent on the first run only, the following ones measure the transfer alone
+        M3BoardCommands._cxfer_configure(ADDRESS_PINS, DATA_PINS, [], ser) # type: ignore
+        CXFERTransfer.read(CommandCode.CXFER.value, ser, None, len(image)) # type: ignore
+        M3BoardCommands._cxfer_check_completion(ser) # type: ignore
+
+    def cxfer_buffered() -> None:
+        M3BoardCommands.cxfer_read_buffered(ADDRESS_PINS, DATA_PINS, [], None, ser) # type: ignore
+
+    single_time: float = min(timeit.repeat(single, number=1, repeat=3))
+    burst_time: float = min(timeit.repeat(burst, number=1, repeat=3))
+    cxfer_time: float = min(timeit.repeat(cxfer, number=1, repeat=3))
+    cxfer_buffered_time: float = min(timeit.repeat(cxfer_buffered, number=1, repeat=3))
+
+    return {
+        'send_binary_command_per_s': commands / single_time,
+        'send_binary_commands_per_s': commands / burst_time,
+        'cxfer_read_bytes_per_s': len(image) / cxfer_time,
+        'cxfer_read_buffered_bytes_per_s': len(image) / cxfer_buffered_time,
+    }
+
+if __name__ == '__main__':
+    for key, val in run().items():
+        print(f'{key}: {val:.2f}')
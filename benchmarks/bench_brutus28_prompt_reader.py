@@ -0,0 +1,88 @@
+"""Benchmark comparing the buffered Brutus28 prompt reader with the previous byte-by-byte reader"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import time
+from typing import Callable
+
+from dupicolib.board_interfaces.brutus28_board_commands import Brutus28PromptReader
+
+_PROMPT = b"CMD>"
+
+class SimulatedShellSerial:
+    """Serial port stand-in holding the output of a Brutus28 shell that already answered `responses` "pld input" commands"""
+
+    def __init__(self, responses: int):
+        self._rx = bytearray(b"".join(f"Input={idx & 0xFFFFFFF:028b}\r\nCMD> ".encode("ASCII") for idx in range(responses)))
+        self._pos = 0
+        self.size = len(self._rx)
+
+    @property
+    def in_waiting(self) -> int:
+        return self.size - self._pos
+
+    def read(self, size: int = 1) -> bytes:
+        data = bytes(self._rx[self._pos:self._pos + size])
+        self._pos += len(data)
+        return data
+
+def _legacy_read_until_prompt(ser: SimulatedShellSerial) -> str:
+    # The reader used before the buffered one: one byte per read, rescanning the whole response every time
+    data = bytearray()
+
+    while True:
+        chunk = ser.read(1)
+        if not chunk:
+            continue
+
+        data.extend(chunk)
+        if data.rstrip().endswith(_PROMPT):
+            return data.decode("ASCII", errors="replace")
+
+def _measure(responses: int, read_all: Callable[[SimulatedShellSerial], None]) -> dict[str, float]:
+    ser = SimulatedShellSerial(responses)
+
+    wall_start: float = time.perf_counter()
+    cpu_start: float = time.process_time()
+    read_all(ser)
+    cpu_time: float = time.process_time() - cpu_start
+    wall_time: float = time.perf_counter() - wall_start
+
+    return {
+        'bytes_per_s': ser.size / wall_time,
+        'cpu_time_s': cpu_time,
+    }
+
+def run(responses: int = 20000) -> dict[str, float]:
+    """Parse `responses` shell responses with both readers
+
+    Args:
+        responses (int, optional): Number of responses to parse. Defaults to 20000.
+
+    Returns:
+        dict[str, float]: Throughput and CPU time for each reader
+    """
+    def legacy(ser: SimulatedShellSerial) -> None:
+        for _ in range(responses):
+            _legacy_read_until_prompt(ser)
+
+    def buffered(ser: SimulatedShellSerial) -> None:
+        for _ in Brutus28PromptReader(ser).iter_responses(responses): # type: ignore
+            pass
+
+    legacy_res = _measure(responses, legacy)
+    buffered_res = _measure(responses, buffered)
+
+    return {
+        'legacy_bytes_per_s': legacy_res['bytes_per_s'],
+        'legacy_cpu_time_s': legacy_res['cpu_time_s'],
+        'buffered_bytes_per_s': buffered_res['bytes_per_s'],
+        'buffered_cpu_time_s': buffered_res['cpu_time_s'],
+    }
+
+if __name__ == '__main__':
+    for key, val in run().items():
+        print(f'{key}: {val:.3f}')
@@ -0,0 +1,34 @@
+"""Benchmark of the checksum calculators on large buffers"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import os
+import timeit
+
+from dupicolib.board_utilities import BoardUtilities
+
+def run(size: int = 1 << 20) -> dict[str, float]:
+    """Compute the command and CXFER checksums of a random buffer
+
+    Args:
+        size (int, optional): Size of the buffer. Defaults to 1 MiB.
+
+    Returns:
+        dict[str, float]: Throughput of each checksum
+    """
+    data: bytes = os.urandom(size)
+
+    command_time: float = min(timeit.repeat(lambda: BoardUtilities.command_checksum_calculator(data), number=1, repeat=5))
+    cxfer_time: float = min(timeit.repeat(lambda: BoardUtilities.cxfer_checksum_calculator(data), number=1, repeat=5))
+
+    return {
+        'command_checksum_bytes_per_s': size / command_time,
+        'cxfer_checksum_bytes_per_s': size / cxfer_time,
+    }
+
+if __name__ == '__main__':
+    for key, val in run().items():
+        print(f'{key}: {val:.2f}')
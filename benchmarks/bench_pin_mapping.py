@@ -0,0 +1,53 @@
+"""Benchmark comparing the precompiled pin mapper with the bit-by-bit mapping loops"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import timeit
+
+from dupicolib.board_commands_interface import BoardCommandsInterface
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+
+# Taken from a 27C2001, data pins
+PIN_LIST_8BIT: list[int] = [13, 14, 15, 17, 18, 19, 20, 22]
+
+# Taken from a 27C2001, address pins
+PIN_LIST_18BIT: list[int] = [12, 11, 10, 9, 8, 7, 6, 5, 27, 26, 23, 25, 4, 28, 29, 3, 2, 30]
+
+# Every pin of a 28 pin socket
+PIN_LIST_28BIT: list[int] = [*range(1, 21), *range(22, 30)]
+
+def run(pins: list[int] = PIN_LIST_18BIT, iterations: int = 1 << 16) -> dict[str, float]:
+    """Map `iterations` consecutive values to the pins and back, with both implementations
+
+    Args:
+        pins (list[int]): Pins to map
+        iterations (int, optional): Number of values to map. Defaults to 65536.
+
+    Returns:
+        dict[str, float]: Mappings per second for each implementation, and the resulting speedup
+    """
+    pin_map = M3BoardCommands._PIN_NUMBER_TO_INDEX_MAP
+
+    def loop_mapping() -> None:
+        for value in range(iterations):
+            BoardCommandsInterface._map_pins_to_value(pin_map, pins, BoardCommandsInterface._map_value_to_pins(pin_map, pins, value))
+
+    def table_mapping() -> None:
+        for value in range(iterations):
+            M3BoardCommands.map_pins_to_value(pins, M3BoardCommands.map_value_to_pins(pins, value))
+
+    loop_time: float = min(timeit.repeat(loop_mapping, number=1, repeat=3))
+    table_time: float = min(timeit.repeat(table_mapping, number=1, repeat=3))
+
+    return {
+        'loop_mappings_per_s': iterations / loop_time,
+        'table_mappings_per_s': iterations / table_time,
+        'speedup': loop_time / table_time,
+    }
+
+if __name__ == '__main__':
+    for key, val in run().items():
+        print(f'{key}: {val:.2f}')
@@ -0,0 +1,62 @@
+"""Run all the benchmarks and emit the results as JSON, to track performance across releases"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+sys.path.insert(0, 'benchmarks')
+
+import argparse
+from datetime import datetime, timezone
+import json
+import platform
+from typing import Callable, Dict
+
+import bench_board_io
+import bench_brutus28_prompt_reader
+import bench_checksums
+import bench_pin_mapping
+
+BENCHMARKS: Dict[str, Callable[[], dict[str, float]]] = {
+    'checksums': bench_checksums.run,
+    'pin_mapping_8bit': lambda: bench_pin_mapping.run(bench_pin_mapping.PIN_LIST_8BIT),
+    'pin_mapping_18bit': lambda: bench_pin_mapping.run(bench_pin_mapping.PIN_LIST_18BIT),
+    'pin_mapping_28bit': lambda: bench_pin_mapping.run(bench_pin_mapping.PIN_LIST_28BIT),
+    'board_io': bench_board_io.run,
+    'brutus28_prompt_reader': bench_brutus28_prompt_reader.run,
+}
+
+def run(names: list[str] | None = None) -> dict:
+    """Run the benchmarks
+
+    Args:
+        names (list[str] | None, optional): Benchmarks to run, all of them if None. Defaults to None.
+
+    Returns:
+        dict: Environment information and the results of every benchmark
+    """
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'results': {name: BENCHMARKS[name]() for name in (names or BENCHMARKS)},
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the dupicolib benchmarks')
+    parser.add_argument('names', nargs='*', help=f'Benchmarks to run, all of them if omitted. Available: {", ".join(BENCHMARKS)}')
+    parser.add_argument('-o', '--output', help='File receiving the JSON results, stdout if omitted')
+    args = parser.parse_args()
+
+    if unknown := [name for name in args.names if name not in BENCHMARKS]:
+        parser.error(f'Unknown benchmarks: {", ".join(unknown)}')
+
+    results = json.dumps(run(args.names), indent=2)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as out_file:
+            out_file.write(results + '\n')
+    else:
+        print(results)
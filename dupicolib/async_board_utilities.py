@@ -0,0 +1,143 @@
+"""This module contains low level utility code to communicate with the board through asyncio"""
+
+from typing import Sequence, Tuple, final
+import asyncio
+import logging
+import time
+
+from dupicolib.async_serial import AsyncSerialPort
+from dupicolib.board_interfaces.command_structures import CommandTokens
+from dupicolib.board_utilities import BinaryBurstResult, BoardUtilities, HandshakeConfig, HandshakeResult
+
+@final
+class AsyncBoardUtilities:
+    """
+    This class contains the asyncio counterpart of the basic utilities in BoardUtilities.
+    Frames and checksums are the same, only the I/O is awaited.
+    """
+
+    _MAX_RESPONSE_SIZE: int = 32
+    _ENCODING: str = 'ASCII'
+
+    _LOGGER = logging.getLogger(__name__)
+
+    @classmethod
+    async def handshake(cls, ser: AsyncSerialPort, config: HandshakeConfig | None = None) -> HandshakeResult:
+        """Wait for the board to announce the connection, toggling DTR between attempts.
+        Attempts, deadline and backoff follow the same HandshakeConfig as BoardUtilities.handshake,
+        other boards keep being served while we wait.
+
+        Args:
+            ser (AsyncSerialPort): Serial port connected to the dupico
+            config (HandshakeConfig | None, optional): Timing of the handshake, the defaults if None. Defaults to None.
+
+        Returns:
+            HandshakeResult: Outcome of the handshake, with the number of attempts and the time it took
+        """
+        config = config or HandshakeConfig()
+        banner: bytes = CommandTokens.BOARD_ENABLED.value.encode(cls._ENCODING)
+        start_time: float = time.perf_counter()
+        deadline: float = start_time + config.deadline
+        backoff: float = config.initial_backoff
+        original_timeout: float | None = ser.timeout
+        attempt: int = 0
+
+        BoardUtilities.mark_connection_reset(ser)
+
+        try:
+            # The port was just opened, so the first attempt waits without toggling DTR
+            while attempt < config.max_attempts and (now := time.perf_counter()) < deadline:
+                attempt += 1
+                attempt_end: float = min(deadline, now + config.attempt_timeout)
+                line: bytearray = bytearray()
+
+                # Awaiting does not block the other boards, so there is no need to poll in short steps
+                while (now := time.perf_counter()) < attempt_end:
+                    ser.timeout = attempt_end - now
+                    line += await ser.readline(cls._MAX_RESPONSE_SIZE - len(line))
+
+                    if line.endswith(b'\n') or len(line) >= cls._MAX_RESPONSE_SIZE:
+                        if line.strip() == banner:
+                            elapsed = time.perf_counter() - start_time
+                            cls._LOGGER.debug(f'Connection try {attempt} succeeded after {elapsed:.3f}s!')
+                            return HandshakeResult(True, attempt, elapsed)
+                        cls._LOGGER.debug(f'Connection try {attempt} got "{bytes(line)}"')
+                        line.clear()
+
+                cls._LOGGER.debug(f'Connection try {attempt} failed!')
+
+                if attempt >= config.max_attempts:
+                    break
+
+                # Reset the connection to the board
+                ser.dtr = False
+                ser.reset_input_buffer()
+                await asyncio.sleep(max(0.0, min(backoff, deadline - time.perf_counter())))
+                ser.dtr = True
+                backoff = min(backoff * config.backoff_factor, config.max_backoff)
+        finally:
+            ser.timeout = original_timeout
+
+        return HandshakeResult(False, attempt, time.perf_counter() - start_time)
+
+    @classmethod
+    async def initialize_connection(cls, ser: AsyncSerialPort, retries: int = 2, config: HandshakeConfig | None = None) -> bool:
+        """Wait for the board to announce the connection, toggling DTR between attempts.
+        See BoardUtilities.initialize_connection.
+
+        Args:
+            ser (AsyncSerialPort): Serial port connected to the dupico
+            retries (int, optional): Number of retries used to check for the string. Defaults to 2.
+            config (HandshakeConfig | None, optional): Timing of the handshake, overrides retries if set. Defaults to None.
+
+        Returns:
+            bool: True if the connection is validated.
+        """
+        cls._LOGGER.debug('Attempting to detect board...')
+
+        result = await cls.handshake(ser, config or HandshakeConfig(max_attempts=retries))
+        if result.ready:
+            ser.reset_input_buffer()
+            return True
+
+        cls._LOGGER.critical(f'Detection attempt failed after {result.attempts} tries and {result.elapsed:.3f}s.')
+
+        return False
+
+    @classmethod
+    async def send_binary_command(cls, ser: AsyncSerialPort, cmd: bytes, resp_data_len: int = 0) -> bytes | None:
+        ser.write(BoardUtilities.frame_binary_command(cmd))
+
+        # In this case, we just send the command and ignore any response, that we expect to be handled by the caller
+        if resp_data_len <= 0:
+            cls._LOGGER.debug(f'Sending command {cmd}, ignoring any response.')
+            return None
+        else:
+            cls._LOGGER.debug(f'Sending command {cmd}, expecting a response of length {resp_data_len}.')
+
+        resp: bytes = await ser.read(1)
+        if len(resp) == 1 and resp[0] == cmd[0] | BoardUtilities.BINARY_COMMAND_RESPONSE_FLAG:
+            resp += await ser.read(resp_data_len + 1) # + 1 as we also need the checksum
+
+        return BoardUtilities.validate_binary_response(ser, cmd, resp, resp_data_len)
+
+    @classmethod
+    async def send_binary_commands(cls, ser: AsyncSerialPort, cmds: Sequence[Tuple[bytes, int]]) -> BinaryBurstResult:
+        """Send multiple commands with a single write, then validate all the responses.
+        See BoardUtilities.send_binary_commands.
+
+        Args:
+            ser (AsyncSerialPort): Serial port connected to the board
+            cmds (Sequence[Tuple[bytes, int]]): List of (command, expected response data length) pairs
+
+        Returns:
+            BinaryBurstResult: The response data for every command, and the index of the failed command, if any
+        """
+        if not cmds:
+            return BinaryBurstResult([])
+
+        cls._LOGGER.debug(f'Sending {len(cmds)} commands in a single burst.')
+        burst, resp_size = BoardUtilities.frame_binary_commands(cmds)
+        ser.write(burst)
+
+        return BoardUtilities.parse_binary_responses(ser, cmds, await ser.read(resp_size))
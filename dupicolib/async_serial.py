@@ -0,0 +1,156 @@
+"""This module contains an asyncio-based serial port, for use with the async board command classes"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import time
+from typing import final
+
+import serial
+
+class _SerialReadProtocol(asyncio.Protocol):
+    def __init__(self, port: AsyncSerialPort):
+        self._port = port
+
+    def data_received(self, data: bytes) -> None:
+        self._port._feed_data(data)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self._port._feed_eof()
+
+@final
+class AsyncSerialPort:
+    """
+    Serial port driven by the asyncio event loop.
+
+    Reads mirror the pyserial semantics: they wait until the requested amount of data is
+    received or the timeout expires, and in the latter case return whatever was received.
+    The port is built on asyncio pipe transports over the file descriptor of the tty device,
+    so it works with real serial ports and ptys on POSIX systems.
+    """
+
+    def __init__(self, timeout: float | None = 1.0):
+        self.timeout: float | None = timeout
+        self._ser: serial.Serial | None = None
+        self._buffer: bytearray = bytearray()
+        self._data_event: asyncio.Event = asyncio.Event()
+        self._eof: bool = False
+        self._read_transport: asyncio.ReadTransport | None = None
+        self._write_transport: asyncio.WriteTransport | None = None
+
+    @classmethod
+    async def open(cls, port: str, baudrate: int = 115200, timeout: float | None = 1.0) -> AsyncSerialPort:
+        """Open a serial port
+
+        Args:
+            port (str): Path of the serial port device
+            baudrate (int, optional): Baud rate. Defaults to 115200.
+            timeout (float | None, optional): Read timeout in seconds, None to wait forever. Defaults to 1.0.
+
+        Returns:
+            AsyncSerialPort: The opened port
+        """
+        # pyserial takes care of configuring the tty, then we hand its descriptor to the event loop
+        ser = serial.Serial(port, baudrate, timeout=0)
+        async_port = cls(timeout)
+
+        try:
+            await async_port._attach(ser.fileno())
+        except BaseException:
+            ser.close()
+            raise
+
+        async_port._ser = ser
+        return async_port
+
+    async def _attach(self, fd: int) -> None:
+        loop = asyncio.get_running_loop()
+
+        # Each transport takes ownership of (and will close) its own copy of the descriptor
+        self._read_transport, _ = await loop.connect_read_pipe(lambda: _SerialReadProtocol(self), os.fdopen(os.dup(fd), 'rb', buffering=0))
+        self._write_transport, _ = await loop.connect_write_pipe(asyncio.BaseProtocol, os.fdopen(os.dup(fd), 'wb', buffering=0))
+
+    def _feed_data(self, data: bytes) -> None:
+        self._buffer.extend(data)
+        self._data_event.set()
+
+    def _feed_eof(self) -> None:
+        self._eof = True
+        self._data_event.set()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def dtr(self) -> bool:
+        return self._ser.dtr if self._ser is not None else False
+
+    @dtr.setter
+    def dtr(self, state: bool) -> None:
+        if self._ser is not None:
+            self._ser.dtr = state
+
+    def reset_input_buffer(self) -> None:
+        self._buffer.clear()
+
+    def write(self, data: bytes | bytearray | memoryview) -> int:
+        if self._write_transport is None:
+            raise IOError('Port is not open')
+
+        self._write_transport.write(bytes(data))
+        return len(data)
+
+    async def _wait_for_data(self, predicate_len: int, terminator: bytes | None = None) -> None:
+        deadline: float | None = None if self.timeout is None else time.monotonic() + self.timeout
+
+        while len(self._buffer) < predicate_len and not self._eof:
+            if terminator is not None and terminator in self._buffer:
+                return
+
+            self._data_event.clear()
+            remaining: float | None = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return
+
+            try:
+                await asyncio.wait_for(self._data_event.wait(), remaining)
+            except TimeoutError:
+                return
+
+    async def read(self, size: int = 1) -> bytes:
+        await self._wait_for_data(size)
+
+        data: bytes = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    async def readinto(self, buffer: bytearray | memoryview) -> int:
+        await self._wait_for_data(len(buffer))
+
+        read_len: int = min(len(buffer), len(self._buffer))
+        buffer[:read_len] = self._buffer[:read_len]
+        del self._buffer[:read_len]
+        return read_len
+
+    async def readline(self, size: int = -1) -> bytes:
+        await self._wait_for_data(size if size > 0 else sys.maxsize, b'\n')
+
+        line_end: int = self._buffer.find(b'\n')
+        read_len: int = len(self._buffer) if line_end < 0 else line_end + 1
+        if size > 0:
+            read_len = min(read_len, size)
+
+        data: bytes = bytes(self._buffer[:read_len])
+        del self._buffer[:read_len]
+        return data
+
+    def close(self) -> None:
+        for transport in (self._read_transport, self._write_transport):
+            if transport is not None:
+                transport.close()
+
+        if self._ser is not None:
+            self._ser.close()
@@ -1,6 +1,6 @@
 """Board command class factory"""
 
-from typing import final, Dict, Type
+from typing import final, Dict, List, Type
 from collections import defaultdict
 
 from dupicolib.hardware_board_commands import HardwareBoardCommands
@@ -23,4 +23,22 @@ class BoardCommandClassFactory:
         Returns:
             Type[BoardCommands]: subclass of BoardCommands that handle this specific board
         """        
-        return cls._COMMAND_CLASS_MAP[model][version[FWVersionKeys.MAJOR.value]]
\ No newline at end of file
+        return cls._COMMAND_CLASS_MAP[model][version[FWVersionKeys.MAJOR.value]]
+
+    @classmethod
+    def get_command_classes(cls) -> List[Type[HardwareBoardCommands]]:
+        """Return all the command classes this factory can pick
+
+        Returns:
+            List[Type[HardwareBoardCommands]]: The command classes, without duplicates
+        """
+        classes: List[Type[HardwareBoardCommands]] = []
+
+        for version_map in cls._COMMAND_CLASS_MAP.values():
+            candidates: List[Type[HardwareBoardCommands]] = list(version_map.values())
+            if isinstance(version_map, defaultdict) and version_map.default_factory is not None:
+                candidates.append(version_map.default_factory())
+
+            classes.extend(command_class for command_class in candidates if command_class not in classes)
+
+        return classes
\ No newline at end of file
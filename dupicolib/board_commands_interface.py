@@ -1,16 +1,27 @@
 """This module is an abstract class to set the shape for classes providing higher-level interface to the boards"""
 
-from typing import Callable, Dict
+from array import array
+from collections.abc import Iterable
+from typing import Any, Callable, Dict, Iterator
 from abc import ABC
+from functools import lru_cache
 
 import serial
 
+from dupicolib.dump_sinks import DumpSink
+from dupicolib.pin_mapper import PinMapper
+
+_PIN_MAPPER_CACHE_SIZE: int = 64
+
 class BoardCommandsInterface(ABC):
     _BASIC_PIN_NUMBER_TO_INDEX_MAP: Dict[int, int] = {
         0: -1, # Indicates a not connected pin
         21: -1, 42: -1 # Two power pins
     } 
 
+    # Subclasses define here the map associating socket pin numbers to board bit indexes
+    _PIN_NUMBER_TO_INDEX_MAP: Dict[int, int]
+
     # Model and version command need to be common to every device, so we can gather the information
     # needed to distinguish them from one another
     @staticmethod
@@ -87,6 +98,35 @@ class BoardCommandsInterface(ABC):
         """        
         raise NotImplementedError()
     
+    @classmethod
+    def write_pins_sequence(cls, values: Iterable[int], update_callback: Callable[[int], bool | None] | None = None, ser: serial.Serial | None = None) -> array | None:
+        """Set the pins to every value in sequence, reading their status back after each one.
+        Commands are pipelined to the board in windows, so the sequence is not limited by the latency of every single round trip.
+
+        Args:
+            values (Iterable[int]): Values that the pins will be set to, e.g. an array('Q')
+            update_callback (Callable[[int], bool | None] | None, optional): A callback receiving the number of steps completed. Returning False stops the sequence early. Defaults to None.
+            ser (serial.Serial | None, optional): serial port on which to send the commands. Defaults to None.
+
+        Returns:
+            array | None: An array('Q') with the value read back at every step, or None in case of parsing issues
+        """
+        raise NotImplementedError()
+
+    @classmethod
+    def read_pins_sequence(cls, count: int, update_callback: Callable[[int], bool | None] | None = None, ser: serial.Serial | None = None) -> array | None:
+        """Read the value of the pins a number of times, pipelining the commands to the board in windows
+
+        Args:
+            count (int): Number of reads to perform
+            update_callback (Callable[[int], bool | None] | None, optional): A callback receiving the number of reads completed. Returning False stops the sequence early. Defaults to None.
+            ser (serial.Serial | None, optional): serial port on which to send the commands. Defaults to None.
+
+        Returns:
+            array | None: An array('Q') with the value of every read, or None in case of parsing issues
+        """
+        raise NotImplementedError()
+    
     @staticmethod
     def detect_osc_pins(reads: int, ser: serial.Serial | None = None) -> int | None:
         """Repeat reads a number of times and reports which pins changed their state in at least one of the reads
@@ -116,6 +156,60 @@ class BoardCommandsInterface(ABC):
         """        
         raise NotImplementedError()
 
+    @staticmethod
+    def cxfer_data_size(address_pins: list[int], data_pins: list[int]) -> int:
+        """Calculate the size of the data returned by a CXFER read
+
+        Args:
+            address_pins (list[int]): List of the pins composing the address
+            data_pins (list[int]): List of the pins composing the data
+
+        Returns:
+            int: Size in bytes of the content of the IC
+        """
+        return (1 << len(address_pins)) * -(len(data_pins) // -8)
+
+    @classmethod
+    def cxfer_stream(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], ser: serial.Serial | None = None) -> Iterator[bytes]:
+        """Streaming version of cxfer_read: yields the blocks of data read from the IC as soon as they are verified.
+
+        Args:
+            address_pins (list[int]): List of the pins composing the address, in order, starting from A0, and already mapped on the dupico socket
+            data_pins (list[int]): List of the pins composing the data, in order, starting from D0, and already mapped on the dupico socket
+            hi_pins (list[int]): List of the pins that must be always set to a high logic level during the transfer.
+            ser (serial.Serial | None, optional): Serial port on which to send the commands. Defaults to None.
+
+        Yields:
+            Iterator[bytes]: The blocks of data read from the IC, in order
+        """
+        raise NotImplementedError()
+
+    @classmethod
+    def cxfer_read_to_sink(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], sink: DumpSink, update_callback: Callable[[int], None] | None, ser: serial.Serial | None = None) -> int:
+        """Same as cxfer_read, but every block is written to a sink as soon as it's read, instead of collecting the whole content in memory.
+
+        Args:
+            address_pins (list[int]): List of the pins composing the address, in order, starting from A0, and already mapped on the dupico socket
+            data_pins (list[int]): List of the pins composing the data, in order, starting from D0, and already mapped on the dupico socket
+            hi_pins (list[int]): List of the pins that must be always set to a high logic level during the transfer.
+            sink (DumpSink): Destination of the data
+            update_callback (Callable[[int], None] | None): A callback that will receive periodic updates of bytes read.
+            ser (serial.Serial | None, optional): Serial port on which to send the commands. Defaults to None.
+
+        Returns:
+            int: Number of bytes written to the sink
+        """
+        written: int = 0
+
+        for block in cls.cxfer_stream(address_pins, data_pins, hi_pins, ser):
+            sink.write(block)
+            written += len(block)
+
+            if update_callback:
+                update_callback(written)
+
+        return written
+
     @classmethod
     def map_value_to_pins(cls, pins: list[int], value: int) -> int:
         raise NotImplementedError()
@@ -171,6 +265,52 @@ class BoardCommandsInterface(ABC):
 
         return ret_val
     
+    @classmethod
+    def map_values_to_pins_array(cls, pins: list[int], values: Iterable[int]) -> Any:
+        """Batch version of map_value_to_pins, converting many values with a single call.
+        For example, passing numpy.arange(1 << len(address_pins), dtype=numpy.uint64) computes
+        the address masks for the whole address space of an IC.
+
+        Vectorized through NumPy if the optional dependency is installed.
+
+        Args:
+            pins (list[int]): A list of the pins associated to every bit of the input values
+            values (Iterable[int]): The values to map to the pins, ideally a numpy.ndarray of uint64
+
+        Returns:
+            numpy.ndarray | array: An uint64 numpy.ndarray with the pin states, or an array('Q') if NumPy is not installed
+        """
+        return cls._get_pin_mapper(tuple(pins)).map_values_to_pins_array(values)
+
+    @classmethod
+    def map_pins_to_values_array(cls, pins: list[int], values: Iterable[int]) -> Any:
+        """Batch version of map_pins_to_value, converting many pin states read from the board with a single call.
+
+        Vectorized through NumPy if the optional dependency is installed.
+
+        Args:
+            pins (list[int]): The list of pins associated to the values
+            values (Iterable[int]): The pin states, ideally a numpy.ndarray of uint64
+
+        Returns:
+            numpy.ndarray | array: An uint64 numpy.ndarray with the values, or an array('Q') if NumPy is not installed
+        """
+        return cls._get_pin_mapper(tuple(pins)).map_pins_to_values_array(values)
+    
+    @classmethod
+    @lru_cache(maxsize=_PIN_MAPPER_CACHE_SIZE)
+    def _get_pin_mapper(cls, pins: tuple[int, ...]) -> PinMapper:
+        """Return a compiled mapper for the specified pins, built on the pin map of this class.
+        Mappers are cached, so building the lookup tables happens only once per pin list.
+
+        Args:
+            pins (tuple[int, ...]): The pins associated to every bit of the value
+
+        Returns:
+            PinMapper: A mapper for the pin list
+        """
+        return PinMapper(cls._PIN_NUMBER_TO_INDEX_MAP, pins)
+
     @classmethod
     def _get_basic_index_map(cls) -> dict[int, int]:
         return cls._BASIC_PIN_NUMBER_TO_INDEX_MAP
\ No newline at end of file
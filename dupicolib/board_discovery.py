@@ -0,0 +1,117 @@
+"""This module contains code to find and identify the boards connected to the host"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import logging
+from typing import TYPE_CHECKING, Type, final
+
+import serial
+from serial.tools import list_ports
+
+from dupicolib.board_fw_version import FWVersionDict
+from dupicolib.board_pool import BoardPool
+from dupicolib.board_utilities import HandshakeConfig
+from dupicolib.hardware_board_commands import HardwareBoardCommands
+
+if TYPE_CHECKING:
+    from dupicolib.detection_cache import DetectionCache
+
+_LOGGER = logging.getLogger(__name__)
+
+# Model and version are read after the handshake, each one given this share of the probe time
+_COMMAND_TIME_SHARE: float = 0.2
+
+@dataclass
+class DiscoveredBoard:
+    """A board found on a port"""
+    port: str
+    model: int
+    version: str
+    parsed_version: FWVersionDict | None
+    command_class: Type[HardwareBoardCommands]
+
+@final
+class BoardDiscovery:
+    """
+    This class probes all the candidate ports at the same time, each one in its own thread.
+    Every probe is bound by its own deadline, so a port that does not answer in time gives up by itself
+    and is left out of the results, without stalling the scan.
+    """
+
+    @staticmethod
+    def candidate_ports() -> list[str]:
+        """List the serial ports available on the host
+
+        Returns:
+            list[str]: Device names of the ports
+        """
+        return sorted(port_info.device for port_info in list_ports.comports())
+
+    @classmethod
+    def discover(cls, ports: Iterable[str] | None = None, timeout: float = 5.0, baudrate: int = 115200, command_classes: Mapping[str, Type[HardwareBoardCommands]] | None = None, cache: DetectionCache | None = None) -> list[DiscoveredBoard]:
+        """Probe ports in parallel and identify the boards connected to them
+
+        Args:
+            ports (Iterable[str] | None, optional): Ports to probe, all the serial ports of the host if None. Defaults to None.
+            timeout (float, optional): Time in seconds given to every port, see probe_port. Defaults to 5.0.
+            baudrate (int, optional): Baud rate for the ports. Defaults to 115200.
+            command_classes (Mapping[str, Type[HardwareBoardCommands]] | None, optional): Explicit command classes for ports that must not be autodetected. Defaults to None.
+            cache (DetectionCache | None, optional): Cache of the detection results for autodetected boards. Defaults to None.
+
+        Returns:
+            list[DiscoveredBoard]: The identified boards, in the order of the ports
+        """
+        port_list: list[str] = list(ports) if ports is not None else cls.candidate_ports()
+        classes: Mapping[str, Type[HardwareBoardCommands]] = command_classes or {}
+
+        if not port_list:
+            return []
+
+        # All probes run at the same time and give up by themselves, so the whole scan is bound by the per-port timeout
+        with ThreadPoolExecutor(max_workers=len(port_list)) as executor:
+            futures = [executor.submit(cls.probe_port, port, timeout, baudrate, classes.get(port), cache) for port in port_list]
+
+        boards: list[DiscoveredBoard] = []
+        for port, future in zip(port_list, futures):
+            if (exc := future.exception()) is not None:
+                _LOGGER.warning(f'Probing port {port} failed: {exc}')
+            elif (board := future.result()) is not None:
+                boards.append(board)
+
+        return boards
+
+    @staticmethod
+    def probe_port(port: str, timeout: float = 5.0, baudrate: int = 115200, command_class: Type[HardwareBoardCommands] | None = None, cache: DetectionCache | None = None) -> DiscoveredBoard | None:
+        """Open a port, identify the board connected to it and close the port.
+
+        The timeout is split between the handshake and the reads of model and version, which are bound
+        by the read and write timeouts of the port. The same split applies to command classes with their own
+        protocol and to the check of cached boards, so every probe ends within about the timeout.
+
+        Args:
+            port (str): Port to probe
+            timeout (float, optional): Time in seconds given to the probe. Defaults to 5.0.
+            baudrate (int, optional): Baud rate for the port. Defaults to 115200.
+            command_class (Type[HardwareBoardCommands] | None, optional): Command class to use instead of autodetection. Defaults to None.
+            cache (DetectionCache | None, optional): Cache of the detection results, used when autodetecting. Defaults to None.
+
+        Returns:
+            DiscoveredBoard | None: The identified board, or None if nothing was identified
+        """
+        command_timeout: float = timeout * _COMMAND_TIME_SHARE
+        handshake_time: float = timeout - 2 * command_timeout
+        config = HandshakeConfig(deadline=handshake_time, attempt_timeout=handshake_time / HandshakeConfig.max_attempts)
+
+        with serial.Serial(port, baudrate, timeout=command_timeout, write_timeout=command_timeout) as ser:
+            if command_class is None and cache is not None:
+                conn = cache.identify_board(port, ser, config=config)
+            else:
+                conn = BoardPool.identify_board(port, ser, command_class, config)
+
+        if conn is None:
+            return None
+
+        return DiscoveredBoard(conn.port, conn.model, conn.version, conn.parsed_version, conn.command_class)
@@ -0,0 +1,189 @@
+"""This module contains the asyncio interface for M3 (dupico) boards"""
+
+from typing import Callable, Tuple, final
+from array import array
+from collections.abc import AsyncIterator, Iterable
+from itertools import islice, repeat
+import struct
+import weakref
+
+from dupicolib.async_board_utilities import AsyncBoardUtilities
+from dupicolib.async_serial import AsyncSerialPort
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands, CommandCode
+from dupicolib.board_interfaces.special_modes.async_cxfer import AsyncCXFERTransfer
+from dupicolib.board_utilities import BoardUtilities
+from dupicolib.hardware_board_commands import CommandCode as HardwareCommandCode
+
+_PINS_SEQUENCE_WINDOW_SIZE: int = 64
+
+@final
+class AsyncM3BoardCommands:
+    """
+    asyncio counterpart of M3BoardCommands: every method awaits the board instead of blocking the thread,
+    so a single event loop can drive many boards at once.
+    Command frames, pin maps and CXFER configurations are shared with M3BoardCommands.
+    """
+
+    # CXFER configuration currently held by the board on every connection
+    _CXFER_PROFILE_BY_PORT: weakref.WeakKeyDictionary[AsyncSerialPort, Tuple[int, Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[int, ...]]]] = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    async def get_model(ser: AsyncSerialPort) -> int | None:
+        res: bytes | None = await AsyncBoardUtilities.send_binary_command(ser, bytes([HardwareCommandCode.MODEL.value]), 1)
+
+        if res is not None:
+            return res[0]
+        else:
+            return None
+
+    @staticmethod
+    async def get_version(ser: AsyncSerialPort) -> str | None:
+        res: bytes | None = await AsyncBoardUtilities.send_binary_command(ser, bytes([HardwareCommandCode.VERSION.value]), 10)
+
+        if res is not None:
+            return res.decode(encoding='ASCII').rstrip('\x00').strip() # Clear the terminating NULLs
+        else:
+            return None
+
+    @staticmethod
+    async def test_board(ser: AsyncSerialPort) -> bool | None:
+        res: bytes | None = await AsyncBoardUtilities.send_binary_command(ser, bytes([CommandCode.TEST.value]), 1)
+
+        if res is not None:
+            return res[0] == 1
+        else:
+            return None
+
+    @staticmethod
+    async def set_power(state: bool, ser: AsyncSerialPort) -> bool | None:
+        res: bytes | None = await AsyncBoardUtilities.send_binary_command(ser, bytes([CommandCode.POWER.value, 1 if state else 0]), 1)
+
+        if res is not None:
+            return res[0] == 1
+        else:
+            return None
+
+    @staticmethod
+    async def write_pins(pins: int, ser: AsyncSerialPort) -> int | None:
+        res: bytes | None = await AsyncBoardUtilities.send_binary_command(ser, bytes([CommandCode.WRITE.value, *struct.pack('<Q', pins)]), 8)
+
+        if res is not None:
+            return struct.unpack('<Q', res)[0]
+        else:
+            return None
+
+    @staticmethod
+    async def read_pins(ser: AsyncSerialPort) -> int | None:
+        res: bytes | None = await AsyncBoardUtilities.send_binary_command(ser, bytes([CommandCode.READ.value]), 8)
+
+        if res is not None:
+            return struct.unpack('<Q', res)[0]
+        else:
+            return None
+
+    @staticmethod
+    async def detect_osc_pins(reads: int, ser: AsyncSerialPort) -> int | None:
+        res: bytes | None = await AsyncBoardUtilities.send_binary_command(ser, bytes([CommandCode.OSC_DET.value, reads & 0xFF]), 8)
+
+        if res is not None:
+            return struct.unpack('<Q', res)[0]
+        else:
+            return None
+
+    @classmethod
+    async def write_pins_sequence(cls, values: Iterable[int], update_callback: Callable[[int], bool | None] | None, ser: AsyncSerialPort, window_size: int = _PINS_SEQUENCE_WINDOW_SIZE) -> array | None:
+        """See M3BoardCommands.write_pins_sequence"""
+        commands = ((bytes([CommandCode.WRITE.value, *struct.pack('<Q', value)]), 8) for value in values)
+        return await cls._send_pins_commands(commands, update_callback, ser, window_size)
+
+    @classmethod
+    async def read_pins_sequence(cls, count: int, update_callback: Callable[[int], bool | None] | None, ser: AsyncSerialPort, window_size: int = _PINS_SEQUENCE_WINDOW_SIZE) -> array | None:
+        """See M3BoardCommands.read_pins_sequence"""
+        return await cls._send_pins_commands(repeat((bytes([CommandCode.READ.value]), 8), count), update_callback, ser, window_size)
+
+    @staticmethod
+    async def _send_pins_commands(commands: Iterable[Tuple[bytes, int]], update_callback: Callable[[int], bool | None] | None, ser: AsyncSerialPort, window_size: int) -> array | None:
+        if window_size <= 0:
+            return None
+
+        readbacks: array = array('Q')
+        cmd_iter = iter(commands)
+
+        while window := list(islice(cmd_iter, window_size)):
+            result = await AsyncBoardUtilities.send_binary_commands(ser, window)
+            if not result.ok:
+                return None
+
+            for res in result.responses:
+                readbacks.append(struct.unpack('<Q', res)[0]) # type: ignore
+                if update_callback is not None and update_callback(len(readbacks)) is False:
+                    return readbacks
+
+        return readbacks
+
+    @classmethod
+    async def cxfer_read(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], update_callback: Callable[[int], None] | None, ser: AsyncSerialPort) -> bytearray | None:
+        file_data: bytearray = bytearray()
+
+        async for data_block in cls.cxfer_stream(address_pins, data_pins, hi_pins, ser):
+            file_data.extend(data_block)
+
+            if update_callback:
+                update_callback(len(file_data))
+
+        return file_data
+
+    @classmethod
+    async def cxfer_stream(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], ser: AsyncSerialPort) -> AsyncIterator[bytes]:
+        """Configure and start a CXFER read, yielding the data blocks while the transfer is running.
+        See M3BoardCommands.cxfer_stream.
+
+        Raises:
+            IOError: In case of errors during the transfer
+
+        Yields:
+            AsyncIterator[bytes]: The verified blocks of data read from the IC, in order
+        """
+        try:
+            await cls._cxfer_configure(address_pins, data_pins, hi_pins, ser)
+
+            async for data_block in AsyncCXFERTransfer.iter_blocks(CommandCode.CXFER.value, ser):
+                yield data_block
+
+            # Clear the buffer from the last response code from the dupico, and the checksum (command + parameter + checksum = 3 bytes)
+            resp_data: bytes = await ser.read(3)
+
+            if (resp_size := len(resp_data)) != 3:
+                raise IOError(f'Response from transfer command is too short: {resp_size}!')
+            elif resp_data[0] != CommandCode.CXFER.value | BoardUtilities.BINARY_COMMAND_RESPONSE_FLAG:
+                raise IOError(f'Read wrong response type after execution of CXFER: {resp_data[0]:0{2}X}')
+            elif BoardUtilities.command_checksum_calculator(resp_data):
+                raise IOError('Wrong checksum for CXFER read command.')
+        except BaseException:
+            # If a transfer fails or is abandoned, we can't trust the state of the board anymore
+            cls._CXFER_PROFILE_BY_PORT.pop(ser, None)
+            raise
+
+    @classmethod
+    async def _cxfer_configure(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], ser: AsyncSerialPort) -> None:
+        profile: Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[int, ...]] = (tuple(address_pins), tuple(data_pins), tuple(hi_pins))
+
+        # Skip the configuration only if the board was not reset since it was sent
+        if cls._CXFER_PROFILE_BY_PORT.get(ser) == (BoardUtilities.connection_epoch(ser), profile):
+            return
+
+        cls._CXFER_PROFILE_BY_PORT.pop(ser, None)
+
+        result = await AsyncBoardUtilities.send_binary_commands(ser, M3BoardCommands._cxfer_config_commands(*profile))
+        if not result.ok:
+            raise IOError(f'Board rejected CXFER configuration command {result.failed_index}')
+
+        cls._CXFER_PROFILE_BY_PORT[ser] = (BoardUtilities.connection_epoch(ser), profile)
+
+    @staticmethod
+    def map_value_to_pins(pins: list[int], value: int) -> int:
+        return M3BoardCommands.map_value_to_pins(pins, value)
+
+    @staticmethod
+    def map_pins_to_value(pins: list[int], value: int) -> int:
+        return M3BoardCommands.map_pins_to_value(pins, value)
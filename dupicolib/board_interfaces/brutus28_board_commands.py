@@ -8,17 +8,96 @@ logic.
 
 from __future__ import annotations
 
+from array import array
+from collections.abc import Iterable
+from itertools import islice
 import re
 import time
-from typing import Callable, Dict, final
+import weakref
+from typing import Callable, Dict, Iterator, final
 
 import serial
 
+from dupicolib import instrumentation
+from dupicolib.board_utilities import HandshakeConfig
+from dupicolib.dump_sinks import DumpSink
 from dupicolib.hardware_board_commands import HardwareBoardCommands
 
 _PROMPT = b"CMD>"
-_READ_CHUNK_SIZE = 1
 _MAX_PIN_MASK = (1 << 28) - 1
+# Time waited for the prompt when synchronizing with the shell, and for the reply to a command
+_SYNC_TIMEOUT: float = 2.0
+_RESPONSE_TIMEOUT: float = 5.0
+# Number of addresses (each one a "pld output" + "pld input" pair) sent in a single burst
+_PIPELINE_WINDOW_SIZE = 64
+
+
+@final
+class Brutus28PromptReader:
+    """Buffered reader splitting the Brutus28 shell output into responses terminated by the prompt.
+
+    Reads take everything the port has waiting, only the newly received bytes are scanned
+    for the prompt, and bytes following a prompt are kept for the next response.
+    Whitespace following a prompt, e.g. its trailing space, is dropped even when it arrives later.
+    The reader holds only a weak reference to the port, so that caching it by port does not keep the port alive.
+    """
+
+    def __init__(self, ser: serial.Serial):
+        self._ser_ref = weakref.ref(ser)
+        self._buffer = bytearray()
+        self._scan_pos = 0
+        self._after_prompt = False
+        # Used by the commands that do not give their own timeout
+        self.response_timeout: float = _RESPONSE_TIMEOUT
+
+    @property
+    def ser(self) -> serial.Serial:
+        ser = self._ser_ref()
+        if ser is None:
+            raise ReferenceError("The serial port of the Brutus28 prompt reader was released")
+
+        return ser
+
+    def clear(self) -> None:
+        """Drop any buffered data, to be used together with a reset of the port input buffer."""
+        self._buffer.clear()
+        self._scan_pos = 0
+        self._after_prompt = False
+
+    def read_response(self, timeout: float | None = None) -> str:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ser = self.ser
+
+        while True:
+            if self._after_prompt and self._buffer:
+                stripped_size = len(self._buffer) - len(self._buffer.lstrip())
+                del self._buffer[:stripped_size]
+                self._scan_pos = 0
+                self._after_prompt = not self._buffer
+
+            prompt_pos = self._buffer.find(_PROMPT, self._scan_pos)
+            if prompt_pos >= 0:
+                response_end = prompt_pos + len(_PROMPT)
+                response = self._buffer[:response_end]
+                del self._buffer[:response_end]
+                self._scan_pos = 0
+                self._after_prompt = True
+                return response.decode("ASCII", errors="replace")
+
+            # A prompt might be split between this read and the next one
+            self._scan_pos = max(0, len(self._buffer) - len(_PROMPT) + 1)
+
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("Timed out waiting for Brutus28 prompt")
+
+            # Reading at least one byte blocks for the port timeout when nothing is waiting
+            chunk = ser.read(max(1, ser.in_waiting))
+            if chunk:
+                self._buffer.extend(chunk)
+
+    def iter_responses(self, count: int, timeout: float | None = None) -> Iterator[str]:
+        for _ in range(count):
+            yield self.read_response(timeout)
 
 
 @final
@@ -40,38 +119,116 @@ class Brutus28BoardCommands(HardwareBoardCommands):
 
     _INPUT_RE = re.compile(r"Input=([01]{1,28})")
     _LAST_OUTPUT_MASK_BY_SERIAL_ID: Dict[int, int] = {}
+    # Readers go away together with their port
+    _PROMPT_READER_BY_SERIAL: weakref.WeakKeyDictionary[serial.Serial, Brutus28PromptReader] = weakref.WeakKeyDictionary()
 
-    @staticmethod
-    def _read_until_prompt(ser: serial.Serial, timeout: float | None = None) -> str:
-        deadline = None if timeout is None else time.monotonic() + timeout
-        data = bytearray()
+    @classmethod
+    def _get_prompt_reader(cls, ser: serial.Serial) -> Brutus28PromptReader:
+        reader = cls._PROMPT_READER_BY_SERIAL.get(ser)
+        if reader is None:
+            reader = Brutus28PromptReader(ser)
+            cls._PROMPT_READER_BY_SERIAL[ser] = reader
 
-        while True:
-            if deadline is not None and time.monotonic() > deadline:
-                raise TimeoutError("Timed out waiting for Brutus28 prompt")
+        return reader
 
-            chunk = ser.read(_READ_CHUNK_SIZE)
-            if not chunk:
-                continue
+    @classmethod
+    def _reset_input(cls, ser: serial.Serial) -> None:
+        ser.reset_input_buffer()
+        cls._get_prompt_reader(ser).clear()
 
-            data.extend(chunk)
-            if data.rstrip().endswith(_PROMPT):
-                return data.decode("ASCII", errors="replace")
+        if (metrics := instrumentation.active) is not None:
+            metrics.count_error("buffer_reset")
+
+    @classmethod
+    def _read_until_prompt(cls, ser: serial.Serial, timeout: float | None = None) -> str:
+        return cls._get_prompt_reader(ser).read_response(timeout)
 
     @classmethod
-    def _send_text_command(cls, ser: serial.Serial, command: str, timeout: float | None = 5.0) -> str:
+    def _send_text_command(cls, ser: serial.Serial, command: str, timeout: float | None = None) -> str:
+        timeout = cls._get_prompt_reader(ser).response_timeout if timeout is None else timeout
+        metrics = instrumentation.active
+        if metrics is None:
+            ser.write(f"{command}\r".encode("ASCII"))
+            return cls._read_until_prompt(ser, timeout)
+
+        start_time = time.perf_counter()
         ser.write(f"{command}\r".encode("ASCII"))
-        return cls._read_until_prompt(ser, timeout)
+        try:
+            response = cls._read_until_prompt(ser, timeout)
+        except TimeoutError:
+            metrics.count_error("response")
+            raise
+
+        # Commands are grouped by their first two words, e.g. "pld output"
+        metrics.observe_command(" ".join(command.split()[:2]), time.perf_counter() - start_time, len(command) + 1, len(response))
+        return response
+
+    @classmethod
+    def _send_text_commands(cls, ser: serial.Serial, commands: list[str], timeout: float | None = None) -> list[str]:
+        """Write a burst of commands with a single write, then collect one response per command.
+
+        Raises:
+            TimeoutError: If a response is missing. The input buffer is cleared so the shell can be resynchronized.
+        """
+        reader = cls._get_prompt_reader(ser)
+        timeout = reader.response_timeout if timeout is None else timeout
+        metrics = instrumentation.active
+        start_time = time.perf_counter() if metrics is not None else 0.0
+        burst = "".join(f"{command}\r" for command in commands).encode("ASCII")
+        ser.write(burst)
+
+        responses: list[str] = []
+        try:
+            for response in reader.iter_responses(len(commands), timeout):
+                responses.append(response)
+        except TimeoutError as exc:
+            if metrics is not None:
+                metrics.count_error("response")
+            cls._reset_input(ser)
+            command = commands[len(responses)]
+            raise TimeoutError(f"Missing Brutus28 response for command {len(responses) + 1} of {len(commands)} ({command!r})") from exc
+
+        if metrics is not None:
+            metrics.observe_command("text_burst", time.perf_counter() - start_time, len(burst), sum(len(response) for response in responses))
+
+        return responses
 
     @classmethod
-    def initialize_connection(cls, ser: serial.Serial, retries: int = 3) -> bool:
-        """Synchronize with the Brutus28 command prompt."""
+    def _parse_input_response(cls, output: str) -> int | None:
+        match = cls._INPUT_RE.search(output)
+        if not match:
+            return None
 
-        for _ in range(retries):
-            ser.reset_input_buffer()
+        return int(match.group(1), 2)
+
+    @classmethod
+    def initialize_connection(cls, ser: serial.Serial, retries: int = 3, config: HandshakeConfig | None = None) -> bool:
+        """Synchronize with the Brutus28 command prompt.
+
+        Args:
+            ser (serial.Serial): Serial port connected to the Brutus28
+            retries (int, optional): Number of times the prompt is requested. Defaults to 3.
+            config (HandshakeConfig | None, optional): Timing of the synchronization, overrides retries if set.
+                The replies to the following commands are then waited for up to its attempt timeout. Defaults to None.
+
+        Returns:
+            bool: True if the prompt was received
+        """
+        reader = cls._get_prompt_reader(ser)
+        attempts: int = retries if config is None else config.max_attempts
+        attempt_timeout: float = _SYNC_TIMEOUT if config is None else config.attempt_timeout
+        deadline: float | None = None if config is None else time.monotonic() + config.deadline
+        reader.response_timeout = _RESPONSE_TIMEOUT if config is None else config.attempt_timeout
+
+        for _ in range(attempts):
+            timeout: float = attempt_timeout
+            if deadline is not None and (timeout := min(attempt_timeout, deadline - time.monotonic())) <= 0:
+                break
+
+            cls._reset_input(ser)
             ser.write(b"\r")
             try:
-                cls._read_until_prompt(ser, 2.0)
+                cls._read_until_prompt(ser, timeout)
                 return True
             except TimeoutError:
                 continue
@@ -140,64 +297,163 @@ class Brutus28BoardCommands(HardwareBoardCommands):
             return None
 
         output = Brutus28BoardCommands._send_text_command(ser, "pld input")
-        match = Brutus28BoardCommands._INPUT_RE.search(output)
-        if not match:
-            return None
-
-        return int(match.group(1), 2)
+        return Brutus28BoardCommands._parse_input_response(output)
 
     @staticmethod
-    def detect_osc_pins(reads: int, ser: serial.Serial | None = None) -> int | None:
+    def detect_osc_pins(reads: int, ser: serial.Serial | None = None, window_size: int = _PIPELINE_WINDOW_SIZE) -> int | None:
         if ser is None or reads <= 0:
             return None
 
-        first_read = Brutus28BoardCommands.read_pins(ser)
-        if first_read is None:
+        readbacks = Brutus28BoardCommands.read_pins_sequence(reads, None, ser, window_size)
+        if readbacks is None:
             return None
 
         changed = 0
-        previous = first_read
-        for _ in range(reads - 1):
-            current = Brutus28BoardCommands.read_pins(ser)
-            if current is None:
-                return None
-
+        for previous, current in zip(readbacks, readbacks[1:]):
             changed |= previous ^ current
-            previous = current
 
         return changed
 
     @classmethod
-    def cxfer_read(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], update_callback: Callable[[int], None] | None, ser: serial.Serial | None = None) -> bytes | None:
-        if ser is None:
+    def write_pins_sequence(cls, values: Iterable[int], update_callback: Callable[[int], bool | None] | None = None, ser: serial.Serial | None = None, window_size: int = _PIPELINE_WINDOW_SIZE) -> array | None:
+        """Set the pins to every value in sequence, reading the inputs back after each one.
+        Every window of `window_size` "pld output"/"pld input" pairs is sent in a single burst.
+
+        Returns:
+            array | None: An array('Q') with the input readback for every value, None in case of parsing issues
+        """
+        if ser is None or window_size <= 0:
+            return None
+
+        return cls._collect_readbacks(cls._iter_write_readbacks(values, ser, window_size), update_callback)
+
+    @classmethod
+    def read_pins_sequence(cls, count: int, update_callback: Callable[[int], bool | None] | None = None, ser: serial.Serial | None = None, window_size: int = _PIPELINE_WINDOW_SIZE) -> array | None:
+        if ser is None or window_size <= 0:
+            return None
+
+        return cls._collect_readbacks(cls._iter_read_readbacks(count, ser, window_size), update_callback)
+
+    @staticmethod
+    def _collect_readbacks(readbacks: Iterator[int | None], update_callback: Callable[[int], bool | None] | None) -> array | None:
+        result = array("Q")
+
+        for readback in readbacks:
+            if readback is None:
+                return None
+
+            result.append(readback)
+            if update_callback is not None and update_callback(len(result)) is False:
+                break
+
+        return result
+
+    @classmethod
+    def _iter_write_readbacks(cls, values: Iterable[int], ser: serial.Serial, window_size: int) -> Iterator[int | None]:
+        """Yield the input readback (None if it can't be parsed) after setting the outputs to every value, one burst per window."""
+        values_iter = iter(values)
+
+        while window := list(islice(values_iter, window_size)):
+            commands: list[str] = []
+            for value in window:
+                commands.append(f"pld output 0x{value & _MAX_PIN_MASK:x}")
+                commands.append("pld input")
+
+            outputs = cls._send_text_commands(ser, commands)
+            cls._LAST_OUTPUT_MASK_BY_SERIAL_ID[id(ser)] = window[-1] & _MAX_PIN_MASK
+
+            # Every odd response belongs to a "pld input" command
+            for output in outputs[1::2]:
+                yield cls._parse_input_response(output)
+
+    @classmethod
+    def _iter_read_readbacks(cls, count: int, ser: serial.Serial, window_size: int) -> Iterator[int | None]:
+        for window_start in range(0, count, window_size):
+            for output in cls._send_text_commands(ser, ["pld input"] * min(window_size, count - window_start)):
+                yield cls._parse_input_response(output)
+
+    @classmethod
+    def cxfer_read(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], update_callback: Callable[[int], None] | None, ser: serial.Serial | None = None, window_size: int = _PIPELINE_WINDOW_SIZE) -> bytes | None:
+        """Read the IC by driving every address from the host.
+
+        Commands are pipelined: for every window of `window_size` addresses, all the
+        "pld output"/"pld input" pairs are written in one burst and the responses are parsed
+        as they stream back. A window size of 1 waits for every response before sending the next command.
+        """
+        if ser is None or window_size <= 0:
             return None
 
         data = bytearray()
+
+        for chunk in cls._iter_cxfer_chunks(address_pins, data_pins, hi_pins, ser, window_size, update_callback):
+            if chunk is None:
+                return None
+
+            data.extend(chunk)
+
+        return bytes(data)
+
+    @classmethod
+    def cxfer_read_to_sink(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], sink: DumpSink, update_callback: Callable[[int], None] | None, ser: serial.Serial | None = None, window_size: int = _PIPELINE_WINDOW_SIZE) -> int:
+        """Same as cxfer_read, writing the data of every window to the sink as soon as it's parsed.
+
+        Like cxfer_read, nothing is read without a serial port or with a window size that is not positive.
+
+        Raises:
+            IOError: If a readback can't be parsed
+
+        Returns:
+            int: Number of bytes written to the sink, 0 if nothing was read
+        """
+        if ser is None or window_size <= 0:
+            return 0
+
+        written = 0
+
+        for chunk in cls._iter_cxfer_chunks(address_pins, data_pins, hi_pins, ser, window_size, update_callback):
+            if chunk is None:
+                raise IOError(f"Unable to parse a readback after {written} bytes")
+
+            sink.write(chunk)
+            written += len(chunk)
+
+        return written
+
+    @classmethod
+    def _iter_cxfer_chunks(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], ser: serial.Serial, window_size: int,
+                           update_callback: Callable[[int], None] | None) -> Iterator[bytearray | None]:
+        """Yield the data read in every window, or None once a readback can't be parsed."""
+        progress = 0
         address_count = 1 << len(address_pins)
         data_width = -(len(data_pins) // -8)
         hi_pin_mask = cls.map_value_to_pins(hi_pins, _MAX_PIN_MASK)
+        address_mapper = cls._get_pin_mapper(tuple(address_pins))
+        data_mapper = cls._get_pin_mapper(tuple(data_pins))
 
-        for address in range(address_count):
-            address_mask = cls.map_value_to_pins(address_pins, address)
-            if cls.write_pins(hi_pin_mask | address_mask, ser) is None:
-                return None
+        output_masks = (hi_pin_mask | address_mapper.map_value_to_pins(address) for address in range(address_count))
+        readbacks = cls._iter_write_readbacks(output_masks, ser, window_size)
 
-            read_mask = cls.read_pins(ser)
-            if read_mask is None:
-                return None
+        while read_masks := list(islice(readbacks, window_size)):
+            chunk = bytearray()
 
-            value = cls.map_pins_to_value(data_pins, read_mask)
-            data.extend(value.to_bytes(data_width, "big"))
+            for read_mask in read_masks:
+                if read_mask is None:
+                    yield None
+                    return
 
-            if update_callback is not None:
-                update_callback(len(data))
+                value = data_mapper.map_pins_to_value(read_mask)
+                chunk.extend(value.to_bytes(data_width, "big"))
 
-        return bytes(data)
+                if update_callback is not None:
+                    update_callback(progress + len(chunk))
+
+            progress += len(chunk)
+            yield chunk
 
     @classmethod
     def map_value_to_pins(cls, pins: list[int], value: int) -> int:
-        return cls._map_value_to_pins(cls._PIN_NUMBER_TO_INDEX_MAP, pins, value)
+        return cls._get_pin_mapper(tuple(pins)).map_value_to_pins(value)
 
     @classmethod
     def map_pins_to_value(cls, pins: list[int], value: int) -> int:
-        return cls._map_pins_to_value(cls._PIN_NUMBER_TO_INDEX_MAP, pins, value)
+        return cls._get_pin_mapper(tuple(pins)).map_pins_to_value(value)
@@ -1,17 +1,26 @@
 """This module contains higher-level code for board interfacing"""
 
-from typing import Callable, Dict, final
+from typing import Callable, Dict, Iterator, Tuple, final
+from array import array
+from collections.abc import Generator, Iterable
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice, repeat
 import struct
 from enum import Enum
+import weakref
 
 import serial
 
 from dupicolib.board_interfaces.special_modes.cxfer import CXFERTransfer
 from dupicolib.board_utilities import BoardUtilities
+from dupicolib.dump_sinks import DumpSink
 from dupicolib.hardware_board_commands import HardwareBoardCommands
 import dupicolib.utils as DPUtils
 
 _CXFER_SHIFT_BLOCK_SIZE: int = 16
+_CXFER_PROFILE_CACHE_SIZE: int = 16
+_PINS_SEQUENCE_WINDOW_SIZE: int = 64
 
 class CommandCode(Enum):
     WRITE = 0
@@ -45,6 +54,9 @@ class M3BoardCommands(HardwareBoardCommands):
         41: 39
     } | HardwareBoardCommands._get_basic_index_map() # Merge the pin mappings from the superclass
 
+    # CXFER configuration (address, data and hi pins) currently held by the board on every connection
+    _CXFER_PROFILE_BY_SERIAL: weakref.WeakKeyDictionary[serial.Serial, Tuple[int, Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[int, ...]]]] = weakref.WeakKeyDictionary()
+
     @staticmethod
     def test_board(ser: serial.Serial) -> bool | None:
         """Perform a minimal self-test of the board
@@ -115,6 +127,58 @@ class M3BoardCommands(HardwareBoardCommands):
         else:
             return None
         
+    @classmethod
+    def write_pins_sequence(cls, values: Iterable[int], update_callback: Callable[[int], bool | None] | None = None, ser: serial.Serial | None = None, window_size: int = _PINS_SEQUENCE_WINDOW_SIZE) -> array | None:
+        """Set the pins to every value in sequence, reading their status back after each one.
+        Every window of `window_size` WRITE commands is sent in a single burst.
+
+        Args:
+            values (Iterable[int]): Values that the pins will be set to, e.g. an array('Q')
+            update_callback (Callable[[int], bool | None] | None, optional): A callback receiving the number of steps completed. Returning False stops the sequence early. Defaults to None.
+            ser (serial.Serial | None, optional): serial port on which to send the commands. Defaults to None.
+            window_size (int, optional): Number of commands sent in a single burst. Defaults to 64.
+
+        Returns:
+            array | None: An array('Q') with the value read back at every step, or None in case of parsing issues
+        """
+        commands = ((bytes([CommandCode.WRITE.value, *struct.pack('<Q', value)]), 8) for value in values)
+        return cls._send_pins_commands(commands, update_callback, ser, window_size)
+
+    @classmethod
+    def read_pins_sequence(cls, count: int, update_callback: Callable[[int], bool | None] | None = None, ser: serial.Serial | None = None, window_size: int = _PINS_SEQUENCE_WINDOW_SIZE) -> array | None:
+        """Read the value of the pins a number of times, every window of `window_size` READ commands is sent in a single burst.
+
+        Args:
+            count (int): Number of reads to perform
+            update_callback (Callable[[int], bool | None] | None, optional): A callback receiving the number of reads completed. Returning False stops the sequence early. Defaults to None.
+            ser (serial.Serial | None, optional): serial port on which to send the commands. Defaults to None.
+            window_size (int, optional): Number of commands sent in a single burst. Defaults to 64.
+
+        Returns:
+            array | None: An array('Q') with the value of every read, or None in case of parsing issues
+        """
+        return cls._send_pins_commands(repeat((bytes([CommandCode.READ.value]), 8), count), update_callback, ser, window_size)
+
+    @staticmethod
+    def _send_pins_commands(commands: Iterable[Tuple[bytes, int]], update_callback: Callable[[int], bool | None] | None, ser: serial.Serial | None, window_size: int) -> array | None:
+        if ser is None or window_size <= 0:
+            return None
+
+        readbacks: array = array('Q')
+        cmd_iter: Iterator[Tuple[bytes, int]] = iter(commands)
+
+        while window := list(islice(cmd_iter, window_size)):
+            result = BoardUtilities.send_binary_commands(ser, window)
+            if not result.ok:
+                return None
+
+            for res in result.responses:
+                readbacks.append(struct.unpack('<Q', res)[0]) # type: ignore
+                if update_callback is not None and update_callback(len(readbacks)) is False:
+                    return readbacks
+
+        return readbacks
+
     @staticmethod
     def detect_osc_pins(reads: int, ser: serial.Serial) -> int | None:
         """Repeat reads a number of times and reports which pins changed their state in at least one of the reads
@@ -134,11 +198,166 @@ class M3BoardCommands(HardwareBoardCommands):
             return None
         
     @classmethod
-    def cxfer_read(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], update_callback: Callable[[int], None] | None, ser: serial.Serial) -> bytes | None:
+    def cxfer_read(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], update_callback: Callable[[int], None] | None, ser: serial.Serial) -> bytearray | None:
+        with cls._cxfer_session(ser):
+            cls._cxfer_configure(address_pins, data_pins, hi_pins, ser)
+
+            # Data is received in a buffer preallocated to the size of the IC, and returned without copies
+            data: bytearray | None = CXFERTransfer.read(CommandCode.CXFER.value, ser, update_callback, cls.cxfer_data_size(address_pins, data_pins))
+
+            cls._cxfer_check_completion(ser)
+
+        return data
+
+    @classmethod
+    def cxfer_read_into(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], buffer: bytearray | memoryview, update_callback: Callable[[int], None] | None, ser: serial.Serial) -> int:
+        """Same as cxfer_read, but the data is received straight into a caller-provided buffer.
+        The size of the buffer can be obtained via cxfer_data_size.
+
+        Args:
+            address_pins (list[int]): List of the pins composing the address, in order, starting from A0, and already mapped on the dupico socket
+            data_pins (list[int]): List of the pins composing the data, in order, starting from D0, and already mapped on the dupico socket
+            hi_pins (list[int]): List of the pins that must be always set to a high logic level during the transfer.
+            buffer (bytearray | memoryview): Writable buffer that will receive the data
+            update_callback (Callable[[int], None] | None): A callback that will receive periodic updates of bytes read.
+            ser (serial.Serial): Serial port on which to send the commands.
+
+        Raises:
+            IOError: In case of errors during the transfer, or if the buffer is too small
+
+        Returns:
+            int: Number of bytes received
+        """
+        with cls._cxfer_session(ser):
+            cls._cxfer_configure(address_pins, data_pins, hi_pins, ser)
+
+            received: int = CXFERTransfer.read_into(CommandCode.CXFER.value, ser, buffer, update_callback)
+
+            cls._cxfer_check_completion(ser)
+
+        return received
+
+    @classmethod
+    def cxfer_read_to_sink(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], sink: DumpSink, update_callback: Callable[[int], None] | None, ser: serial.Serial | None = None) -> int:
+        """See BoardCommandsInterface.cxfer_read_to_sink. Nothing is read without a serial port, and 0 is returned."""
+        if ser is None:
+            return 0
+
+        with cls._cxfer_session(ser):
+            cls._cxfer_configure(address_pins, data_pins, hi_pins, ser)
+
+            written: int = CXFERTransfer.read_to_sink(CommandCode.CXFER.value, ser, sink, update_callback, cls.cxfer_data_size(address_pins, data_pins))
+
+            cls._cxfer_check_completion(ser)
+
+        return written
+
+    @classmethod
+    def cxfer_read_buffered(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], update_callback: Callable[[int], None] | None, ser: serial.Serial,
+                            block_callback: Callable[[memoryview], None] | None = None) -> bytearray | None:
+        """Same as cxfer_read, but the serial port is drained by a dedicated I/O thread while the callbacks
+        run in the calling thread, so slow progress reporting or hashing does not stall the transfer.
+
+        Args:
+            address_pins (list[int]): List of the pins composing the address, in order, starting from A0, and already mapped on the dupico socket
+            data_pins (list[int]): List of the pins composing the data, in order, starting from D0, and already mapped on the dupico socket
+            hi_pins (list[int]): List of the pins that must be always set to a high logic level during the transfer.
+            update_callback (Callable[[int], None] | None): A callback that will receive periodic updates of bytes read.
+            ser (serial.Serial): Serial port on which to send the commands.
+            block_callback (Callable[[memoryview], None] | None, optional): A callback receiving every verified block. Defaults to None.
+
+        Raises:
+            IOError: In case of errors during the transfer
+
+        Returns:
+            bytearray | None: The data read from the IC
+        """
+        with cls._cxfer_session(ser):
+            cls._cxfer_configure(address_pins, data_pins, hi_pins, ser)
+
+            data: bytearray | None = CXFERTransfer.read_buffered(CommandCode.CXFER.value, ser, update_callback, cls.cxfer_data_size(address_pins, data_pins), block_callback)
+
+            cls._cxfer_check_completion(ser)
+
+        return data
+
+    @classmethod
+    def cxfer_stream(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], ser: serial.Serial) -> Iterator[bytes]:
+        """Configure and start a CXFER read, yielding the data blocks while the transfer is running.
+        Every block is yielded as soon as its checksum is verified and acknowledged.
+
+        The generator must be consumed until the end, or the board will be left in the middle of a transfer.
+
+        Args:
+            address_pins (list[int]): List of the pins composing the address, in order, starting from A0, and already mapped on the dupico socket
+            data_pins (list[int]): List of the pins composing the data, in order, starting from D0, and already mapped on the dupico socket
+            hi_pins (list[int]): List of the pins that must be always set to a high logic level during the transfer.
+            ser (serial.Serial): Serial port on which to send the commands.
+
+        Raises:
+            IOError: In case of errors during the transfer
+
+        Yields:
+            Iterator[bytes]: The verified blocks of data read from the IC, in order
+        """
+        with cls._cxfer_session(ser):
+            cls._cxfer_configure(address_pins, data_pins, hi_pins, ser)
+
+            yield from CXFERTransfer.iter_blocks(CommandCode.CXFER.value, ser)
+
+            cls._cxfer_check_completion(ser)
+
+    @classmethod
+    @contextmanager
+    def _cxfer_session(cls, ser: serial.Serial) -> Generator[None, None, None]:
+        # If a transfer fails or is abandoned, we can't trust the state of the board anymore
+        try:
+            yield
+        except BaseException:
+            cls.clear_cxfer_profile_cache(ser)
+            raise
+
+    @classmethod
+    def clear_cxfer_profile_cache(cls, ser: serial.Serial) -> None:
+        """Forget the CXFER configuration cached for a connection, forcing the next transfer to send it again.
+        To be called when the board is reset, e.g. after reinitializing the connection.
+
+        Args:
+            ser (serial.Serial): Serial port connected to the board
+        """
+        cls._CXFER_PROFILE_BY_SERIAL.pop(ser, None)
+
+    @classmethod
+    def _cxfer_configure(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], ser: serial.Serial) -> None:
+        profile: Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[int, ...]] = (tuple(address_pins), tuple(data_pins), tuple(hi_pins))
+
+        # The board already holds this configuration, unless it was reset in the meantime: no need to send it again
+        if cls._CXFER_PROFILE_BY_SERIAL.get(ser) == (BoardUtilities.connection_epoch(ser), profile):
+            return
+
+        cls.clear_cxfer_profile_cache(ser)
+
+        # Send all the configuration frames back to back, then validate all the responses together
+        result = BoardUtilities.send_binary_commands(ser, cls._cxfer_config_commands(*profile))
+
+        if not result.ok:
+            raise IOError(f'Board rejected CXFER configuration command {result.failed_index}')
+
+        cls._CXFER_PROFILE_BY_SERIAL[ser] = (BoardUtilities.connection_epoch(ser), profile)
+
+    @classmethod
+    @lru_cache(maxsize=_CXFER_PROFILE_CACHE_SIZE)
+    def _cxfer_config_commands(cls, address_pins: Tuple[int, ...], data_pins: Tuple[int, ...], hi_pins: Tuple[int, ...]) -> Tuple[Tuple[bytes, int], ...]:
+        """Build the configuration commands for a CXFER profile
+
+        Returns:
+            Tuple[Tuple[bytes, int], ...]: All the commands, each one paired with its response length
+        """
         address_shift_map: list[int] = []
         data_shift_map: list[int] = []
         hi_pin_mask: int
         data_pin_mask: int
+        frames: list[bytes] = []
         
         for pin in address_pins:
             address_shift_map.append(cls._PIN_NUMBER_TO_INDEX_MAP[pin])
@@ -146,34 +365,36 @@ class M3BoardCommands(HardwareBoardCommands):
         for pin in data_pins:
             data_shift_map.append(cls._PIN_NUMBER_TO_INDEX_MAP[pin])
 
-        hi_pin_mask = cls.map_value_to_pins(hi_pins, 0xFFFFFFFFFFFFFFFF)
-        data_pin_mask = cls.map_value_to_pins(data_pins, 0xFFFFFFFFFFFFFFFF)
+        hi_pin_mask = cls.map_value_to_pins(list(hi_pins), 0xFFFFFFFFFFFFFFFF)
+        data_pin_mask = cls.map_value_to_pins(list(data_pins), 0xFFFFFFFFFFFFFFFF)
 
         # Clear the configuration for CXFER on the board
-        BoardUtilities.send_binary_command(ser, bytes([CommandCode.CXFER.value, CXFERTransfer.CXFERSubCommand.CLEAR.value, *([0] * 16)]), 1)
+        frames.append(bytes([CommandCode.CXFER.value, CXFERTransfer.CXFERSubCommand.CLEAR.value, *([0] * 16)]))
 
         # Set the address shift map
         for idx, addr_chunk in enumerate(DPUtils.iter_grouper(address_shift_map, _CXFER_SHIFT_BLOCK_SIZE, 0)):
-            BoardUtilities.send_binary_command(ser, bytes([CommandCode.CXFER.value, CXFERTransfer.CXFERSubCommand.SET_ADDR_MAP_0.value + idx, *struct.pack(f'{len(addr_chunk)}B', *addr_chunk)]), 1)
+            frames.append(bytes([CommandCode.CXFER.value, CXFERTransfer.CXFERSubCommand.SET_ADDR_MAP_0.value + idx, *struct.pack(f'{len(addr_chunk)}B', *addr_chunk)]))
 
         # Set the data shift map
         for idx, data_chunk in enumerate(DPUtils.iter_grouper(data_shift_map, _CXFER_SHIFT_BLOCK_SIZE, 0)):
-            BoardUtilities.send_binary_command(ser, bytes([CommandCode.CXFER.value, CXFERTransfer.CXFERSubCommand.SET_DATA_MAP_0.value + idx, *struct.pack(f'{len(data_chunk)}B', *data_chunk)]), 1)
+            frames.append(bytes([CommandCode.CXFER.value, CXFERTransfer.CXFERSubCommand.SET_DATA_MAP_0.value + idx, *struct.pack(f'{len(data_chunk)}B', *data_chunk)]))
 
         # Set the hi-out mask
-        BoardUtilities.send_binary_command(ser, bytes([CommandCode.CXFER.value, CXFERTransfer.CXFERSubCommand.SET_HI_OUT_MASK.value, *struct.pack('<Q', hi_pin_mask), *([0] * 8)]), 1)
+        frames.append(bytes([CommandCode.CXFER.value, CXFERTransfer.CXFERSubCommand.SET_HI_OUT_MASK.value, *struct.pack('<Q', hi_pin_mask), *([0] * 8)]))
 
         # Set the data mask
-        BoardUtilities.send_binary_command(ser, bytes([CommandCode.CXFER.value, CXFERTransfer.CXFERSubCommand.SET_DATA_MASK.value, *struct.pack('<Q', data_pin_mask), *([0] * 8)]), 1)
+        frames.append(bytes([CommandCode.CXFER.value, CXFERTransfer.CXFERSubCommand.SET_DATA_MASK.value, *struct.pack('<Q', data_pin_mask), *([0] * 8)]))
 
         # Send address width
-        BoardUtilities.send_binary_command(ser, bytes([CommandCode.CXFER.value, CXFERTransfer.CXFERSubCommand.SET_ADDR_WIDTH.value, *struct.pack(f'B', len(address_pins)), *([0] * 15)]), 1)
+        frames.append(bytes([CommandCode.CXFER.value, CXFERTransfer.CXFERSubCommand.SET_ADDR_WIDTH.value, *struct.pack(f'B', len(address_pins)), *([0] * 15)]))
 
         # Send data width
-        BoardUtilities.send_binary_command(ser, bytes([CommandCode.CXFER.value, CXFERTransfer.CXFERSubCommand.SET_DATA_WIDTH.value, *struct.pack(f'B', len(data_pins)), *([0] * 15)]), 1)
+        frames.append(bytes([CommandCode.CXFER.value, CXFERTransfer.CXFERSubCommand.SET_DATA_WIDTH.value, *struct.pack(f'B', len(data_pins)), *([0] * 15)]))
 
-        data: bytes | None = CXFERTransfer.read(CommandCode.CXFER.value, ser, update_callback)
+        return tuple((frame, 1) for frame in frames)
 
+    @staticmethod
+    def _cxfer_check_completion(ser: serial.Serial) -> None:
         # Clear the buffer from the last response code from the dupico, and the checksum (command + parameter + checksum = 3 bytes)
         resp_data: bytes = ser.read(3)
 
@@ -184,14 +405,12 @@ class M3BoardCommands(HardwareBoardCommands):
                 raise IOError(f'Read wrong response type after execution of CXFER: {resp_data[0]:0{2}X}')
             elif BoardUtilities.command_checksum_calculator(resp_data):
                 raise IOError('Wrong checksum for CXFER read command.')
-
-        return data
     
             
     @classmethod
     def map_value_to_pins(cls, pins: list[int], value: int) -> int:
-        return cls._map_value_to_pins(cls._PIN_NUMBER_TO_INDEX_MAP, pins, value)
+        return cls._get_pin_mapper(tuple(pins)).map_value_to_pins(value)
     
     @classmethod
     def map_pins_to_value(cls, pins: list[int], value: int) -> int:
-        return cls._map_pins_to_value(cls._PIN_NUMBER_TO_INDEX_MAP, pins, value)
\ No newline at end of file
+        return cls._get_pin_mapper(tuple(pins)).map_pins_to_value(value)
\ No newline at end of file
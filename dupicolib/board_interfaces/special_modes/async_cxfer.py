@@ -0,0 +1,90 @@
+"""Code to support the CXFER transfer modes through asyncio"""
+
+import logging
+import struct
+from collections.abc import AsyncIterator
+from typing import Callable, final
+
+from dupicolib.async_board_utilities import AsyncBoardUtilities
+from dupicolib.async_serial import AsyncSerialPort
+from dupicolib.board_interfaces.special_modes.cxfer import CXFERBlockFailedError, CXFERTransfer
+from dupicolib.board_utilities import BoardUtilities
+
+_LOGGER = logging.getLogger(__name__)
+
+@final
+class AsyncCXFERTransfer:
+    """asyncio counterpart of CXFERTransfer, the protocol is the same"""
+
+    _XMIT_BLOCK_SIZE: int = CXFERTransfer._XMIT_BLOCK_SIZE
+    _XFER_RESPONSE_SIZE: int = CXFERTransfer._XFER_RESPONSE_SIZE
+    _XFER_CHECKSUM_SIZE: int = CXFERTransfer._XFER_CHECKSUM_SIZE
+
+    @classmethod
+    async def read(cls, command_code: int, ser: AsyncSerialPort, update_callback: Callable[[int], None] | None = None) -> bytearray | None:
+        file_data: bytearray = bytearray()
+
+        async for data_block in cls.iter_blocks(command_code, ser):
+            file_data.extend(data_block)
+
+            if update_callback:
+                update_callback(len(file_data))
+
+        return file_data
+
+    @classmethod
+    async def iter_blocks(cls, command_code: int, ser: AsyncSerialPort) -> AsyncIterator[bytes]:
+        """Start a transfer and yield every block of data as soon as its checksum is verified and acknowledged.
+        See CXFERTransfer.iter_blocks.
+
+        Args:
+            command_code (int): Command code used by the board for CXFER commands
+            ser (AsyncSerialPort): Serial port on which to send the commands
+
+        Raises:
+            IOError: In case of timeouts, unexpected responses or checksum errors
+            CXFERBlockFailedError: If the board reports a failed block
+
+        Yields:
+            AsyncIterator[bytes]: The verified blocks, in order
+        """
+        header: bytearray = bytearray(cls._XFER_RESPONSE_SIZE)
+        block_buffer: bytearray = bytearray(cls._XMIT_BLOCK_SIZE + cls._XFER_CHECKSUM_SIZE)
+        resp: int
+        received: int = 0
+
+        # Start the transfer!
+        await AsyncBoardUtilities.send_binary_command(ser, bytes([command_code, CXFERTransfer.CXFERSubCommand.EXECUTE_READ.value, *([0] * 16)]), 0)
+
+        while True:
+            if (data_len := await ser.readinto(header)) != cls._XFER_RESPONSE_SIZE:
+                raise IOError(f'Received {data_len} data for starting block!')
+
+            resp, = struct.unpack('>I', header)
+
+            if resp == CXFERTransfer.CXFERResponse.XFER_PKT_START.value:
+                _LOGGER.debug(f'Received a XFER_PKT_START packet, current file size {received}')
+            elif resp == CXFERTransfer.CXFERResponse.XFER_DONE.value:
+                _LOGGER.info(f'Received a XFER_DONE packet, current file size {received}')
+                break
+            elif resp == CXFERTransfer.CXFERResponse.XFER_PKT_FAIL.value:
+                raise CXFERBlockFailedError(f'Board reported a failed block, current file size {received}', received)
+            else:
+                raise IOError(f'Received {resp:0{4}X} while expecting a start block.')
+
+            # Block and checksum are received together
+            if await ser.readinto(block_buffer) != len(block_buffer):
+                raise IOError('Timed out while waiting to read data...')
+
+            with memoryview(block_buffer) as view:
+                calc_checksum: int = BoardUtilities.cxfer_checksum_calculator(view[:cls._XMIT_BLOCK_SIZE])
+            resp, = struct.unpack_from('<H', block_buffer, cls._XMIT_BLOCK_SIZE)
+
+            if resp != calc_checksum:
+                raise IOError(f'Calculated checksum is {calc_checksum:0{4}X}, received is {resp:0{4}X}')
+
+            # Once verified, send the checksum back
+            ser.write(block_buffer[cls._XMIT_BLOCK_SIZE:])
+
+            received += cls._XMIT_BLOCK_SIZE
+            yield bytes(block_buffer[:cls._XMIT_BLOCK_SIZE])
@@ -2,20 +2,34 @@
 
 from enum import Enum
 import logging
+import queue
 import struct
-from typing import Callable, final
+import threading
+import time
+from typing import Callable, Iterator, final
 
 import serial
 
+from dupicolib import instrumentation
 from dupicolib.board_utilities import BoardUtilities
+from dupicolib.dump_sinks import DumpSink
 
 _LOGGER = logging.getLogger(__name__)
 
+class CXFERBlockFailedError(IOError):
+    """Raised when the board reports a failed block (XFER_PKT_FAIL). Carries the number of bytes received before it."""
+
+    def __init__(self, message: str, received: int):
+        super().__init__(message)
+        self.received = received
+
 @final
 class CXFERTransfer:
     _XMIT_BLOCK_SIZE: int = 1024
     _XFER_RESPONSE_SIZE: int = 4
     _XFER_CHECKSUM_SIZE: int = 2
+    _RING_DEPTH: int = 4 # Blocks the I/O thread can receive ahead of the consumer
+    _IO_POLL_INTERVAL: float = 0.05
 
     class CXFERSubCommand(Enum):
         SET_ADDR_MAP_0 = 0x00
@@ -39,58 +53,362 @@ class CXFERTransfer:
         XFER_DONE = 0xC00FFFEE
 
     @classmethod
-    def read(cls, command_code: int, ser: serial.Serial, update_callback: Callable[[int], None] | None = None) -> bytes | None:
-        file_data: bytearray = bytearray()
-        data_block: bytearray
-        resp: int
+    def read(cls, command_code: int, ser: serial.Serial, update_callback: Callable[[int], None] | None = None, size_hint: int = 0) -> bytearray | None:
+        """Start a transfer and return all the data read.
+
+        Data is received straight into a single buffer, preallocated from the size hint, which is returned without
+        further copies: the returned object is a bytearray.
+
+        Args:
+            command_code (int): Command code used by the board for CXFER commands
+            ser (serial.Serial): Serial port on which to send the commands
+            update_callback (Callable[[int], None] | None, optional): A callback that will receive periodic updates of bytes read. Defaults to None.
+            size_hint (int, optional): Expected size of the data, the buffer grows if more is received. Defaults to 0.
+
+        Raises:
+            IOError: In case of timeouts, unexpected responses or checksum errors
+            CXFERBlockFailedError: If the board reports a failed block
+
+        Returns:
+            bytearray | None: The data read
+        """
+        # Round up to whole blocks, and leave room for the checksum of the last block
+        file_data: bytearray = bytearray(-(size_hint // -cls._XMIT_BLOCK_SIZE) * cls._XMIT_BLOCK_SIZE + cls._XFER_CHECKSUM_SIZE)
+
+        received: int = cls._receive_blocks(command_code, ser, file_data, True, update_callback)
+        del file_data[received:]
+
+        return file_data
+
+    @classmethod
+    def read_into(cls, command_code: int, ser: serial.Serial, buffer: bytearray | memoryview, update_callback: Callable[[int], None] | None = None) -> int:
+        """Start a transfer and receive the data straight into a caller-provided buffer.
+
+        The buffer will not be resized. At most two bytes past the received data might be overwritten.
+
+        Args:
+            command_code (int): Command code used by the board for CXFER commands
+            ser (serial.Serial): Serial port on which to send the commands
+            buffer (bytearray | memoryview): Writable buffer that will receive the data
+            update_callback (Callable[[int], None] | None, optional): A callback that will receive periodic updates of bytes read. Defaults to None.
+
+        Raises:
+            IOError: In case of timeouts, unexpected responses, checksum errors or if the buffer is too small
+            CXFERBlockFailedError: If the board reports a failed block
+
+        Returns:
+            int: Number of bytes received
+        """
+        return cls._receive_blocks(command_code, ser, buffer, False, update_callback)
+
+    @classmethod
+    def iter_blocks(cls, command_code: int, ser: serial.Serial) -> Iterator[bytes]:
+        """Start a transfer and yield every block of data as soon as its checksum is verified and acknowledged.
+
+        The generator must be consumed until the end: the board expects every block to be
+        acknowledged before completing the transfer.
+
+        Args:
+            command_code (int): Command code used by the board for CXFER commands
+            ser (serial.Serial): Serial port on which to send the commands
+
+        Raises:
+            IOError: In case of timeouts, unexpected responses or checksum errors
+            CXFERBlockFailedError: If the board reports a failed block
+
+        Yields:
+            Iterator[bytes]: The verified blocks, in order
+        """
+        # A single buffer is reused for every block
+        block_buffer: bytearray = bytearray(cls._XMIT_BLOCK_SIZE + cls._XFER_CHECKSUM_SIZE)
+
+        for _ in cls._iter_received_blocks(command_code, ser, block_buffer, False, True):
+            yield bytes(block_buffer[:cls._XMIT_BLOCK_SIZE])
+
+    @classmethod
+    def read_to_sink(cls, command_code: int, ser: serial.Serial, sink: DumpSink, update_callback: Callable[[int], None] | None = None, size: int | None = None) -> int:
+        """Start a transfer and write every block to a sink as soon as it's verified and acknowledged.
+        A single block buffer is used, whatever the size of the transfer.
+
+        Args:
+            command_code (int): Command code used by the board for CXFER commands
+            ser (serial.Serial): Serial port on which to send the commands
+            sink (DumpSink): Destination of the data
+            update_callback (Callable[[int], None] | None, optional): A callback that will receive periodic updates of bytes read. Defaults to None.
+            size (int | None, optional): Size of the data, to drop the padding of the last block. Everything is written if None. Defaults to None.
+
+        Raises:
+            IOError: In case of timeouts, unexpected responses or checksum errors
+            CXFERBlockFailedError: If the board reports a failed block
+
+        Returns:
+            int: Number of bytes written to the sink
+        """
+        block_buffer: bytearray = bytearray(cls._XMIT_BLOCK_SIZE + cls._XFER_CHECKSUM_SIZE)
+        written: int = 0
+
+        with memoryview(block_buffer) as view:
+            for _ in cls._iter_received_blocks(command_code, ser, block_buffer, False, True):
+                length: int = cls._XMIT_BLOCK_SIZE if size is None else max(0, min(cls._XMIT_BLOCK_SIZE, size - written))
+
+                if length:
+                    sink.write(view[:length])
+                    written += length
+
+                if update_callback:
+                    update_callback(written)
+
+        return written
+
+    @classmethod
+    def read_buffered(cls, command_code: int, ser: serial.Serial, update_callback: Callable[[int], None] | None = None, size_hint: int = 0,
+                      block_callback: Callable[[memoryview], None] | None = None, depth: int = _RING_DEPTH) -> bytearray | None:
+        """Same as read, but the port is drained by a dedicated I/O thread (see iter_blocks_buffered),
+        so slow callbacks overlap with the transfer instead of stalling it.
+
+        Args:
+            command_code (int): Command code used by the board for CXFER commands
+            ser (serial.Serial): Serial port on which to send the commands
+            update_callback (Callable[[int], None] | None, optional): A callback that will receive periodic updates of bytes read. Defaults to None.
+            size_hint (int, optional): Expected size of the data, the buffer grows if more is received. Defaults to 0.
+            block_callback (Callable[[memoryview], None] | None, optional): A callback receiving every verified block, e.g. to hash it. Defaults to None.
+            depth (int, optional): Number of block buffers in the ring. Defaults to 4.
+
+        Raises:
+            IOError: In case of timeouts, unexpected responses or checksum errors
+            CXFERBlockFailedError: If the board reports a failed block
+
+        Returns:
+            bytearray | None: The data read
+        """
+        file_data: bytearray = bytearray(-(size_hint // -cls._XMIT_BLOCK_SIZE) * cls._XMIT_BLOCK_SIZE)
+        received: int = 0
+
+        for block in cls.iter_blocks_buffered(command_code, ser, depth):
+            if received + cls._XMIT_BLOCK_SIZE > len(file_data):
+                file_data.extend(bytes(cls._XMIT_BLOCK_SIZE))
+
+            file_data[received:received + cls._XMIT_BLOCK_SIZE] = block
+            received += cls._XMIT_BLOCK_SIZE
+
+            if block_callback:
+                block_callback(block)
+            if update_callback:
+                update_callback(received)
+
+        del file_data[received:]
+
+        return file_data
+
+    @classmethod
+    def iter_blocks_buffered(cls, command_code: int, ser: serial.Serial, depth: int = _RING_DEPTH) -> Iterator[memoryview]:
+        """Start a transfer run by a dedicated I/O thread, and yield the verified blocks.
+
+        The I/O thread receives the blocks into a ring of preallocated buffers, verifying and acknowledging
+        every one of them as soon as it's complete, as the board waits for the acknowledge before sending the next block.
+        When all the buffers are waiting to be consumed, the I/O thread stops acknowledging and the board waits.
+
+        Every yielded view refers to a buffer of the ring, valid only until the next block is requested.
+        The port must not be used by the caller until the generator is exhausted or closed.
+
+        Args:
+            command_code (int): Command code used by the board for CXFER commands
+            ser (serial.Serial): Serial port on which to send the commands
+            depth (int, optional): Number of block buffers in the ring. Defaults to 4.
+
+        Raises:
+            IOError: In case of timeouts, unexpected responses or checksum errors
+            CXFERBlockFailedError: If the board reports a failed block
+
+        Yields:
+            Iterator[memoryview]: The verified blocks, in order
+        """
+        if depth < 1:
+            raise ValueError('The ring needs at least one buffer')
+
+        ring: list[bytearray] = [bytearray(cls._XMIT_BLOCK_SIZE + cls._XFER_CHECKSUM_SIZE) for _ in range(depth)]
+        free_slots: queue.SimpleQueue[int] = queue.SimpleQueue()
+        # Never holds more than the ring size, plus the final result
+        ready_slots: queue.SimpleQueue[int | BaseException | None] = queue.SimpleQueue()
+        stop = threading.Event()
+
+        for slot in range(depth):
+            free_slots.put(slot)
+
+        io_thread = threading.Thread(target=cls._receive_into_ring, args=(command_code, ser, ring, free_slots, ready_slots, stop), name='cxfer-io', daemon=True)
+        io_thread.start()
+
+        try:
+            while (slot := ready_slots.get()) is not None:
+                if isinstance(slot, BaseException):
+                    raise slot
+
+                yield memoryview(ring[slot])[:cls._XMIT_BLOCK_SIZE]
+                free_slots.put(slot)
+        finally:
+            stop.set()
+            io_thread.join()
+
+    @classmethod
+    def _receive_into_ring(cls, command_code: int, ser: serial.Serial, ring: list[bytearray],
+                           free_slots: queue.SimpleQueue[int], ready_slots: queue.SimpleQueue[int | BaseException | None], stop: threading.Event) -> None:
+        header: bytearray = bytearray(cls._XFER_RESPONSE_SIZE)
+        checksum: bytearray = bytearray(cls._XFER_CHECKSUM_SIZE)
+        received: int = 0
+        metrics = instrumentation.active
+        block_start: float = 0.0
+
+        try:
+            # Start the transfer!
+            BoardUtilities.send_binary_command(ser, bytes([command_code, cls.CXFERSubCommand.EXECUTE_READ.value, *([0] * 16)]), 0)
+
+            while not stop.is_set():
+                if not cls._read_block_header(ser, header, received):
+                    ready_slots.put(None)
+                    return
+
+                # Wait for the consumer to release a buffer, the board will wait for the acknowledge meanwhile
+                while True:
+                    try:
+                        slot: int = free_slots.get(timeout=cls._IO_POLL_INTERVAL)
+                        break
+                    except queue.Empty:
+                        if stop.is_set():
+                            return
+
+                # Time spent waiting for the consumer is not link time
+                if metrics is not None:
+                    block_start = time.perf_counter()
+
+                with memoryview(ring[slot]) as view:
+                    cls._read_block(ser, view, checksum, metrics, block_start)
+
+                received += cls._XMIT_BLOCK_SIZE
+                ready_slots.put(slot)
+        except BaseException as exc: # pylint: disable=broad-exception-caught
+            # Errors are raised again in the consumer thread
+            ready_slots.put(exc)
+
+    @classmethod
+    def _receive_blocks(cls, command_code: int, ser: serial.Serial, buffer: bytearray | memoryview, grow: bool, update_callback: Callable[[int], None] | None) -> int:
+        received: int = 0
+
+        for offset in cls._iter_received_blocks(command_code, ser, buffer, grow, False):
+            received = offset + cls._XMIT_BLOCK_SIZE
+
+            if update_callback:
+                update_callback(received)
+
+        return received
+
+    @staticmethod
+    def _read_exact_into(ser: serial.Serial, view: memoryview) -> int:
+        read_len: int = 0
+
+        while read_len < len(view):
+            if not (data_len := ser.readinto(view[read_len:])):
+                break
+
+            read_len += data_len
+
+        return read_len
+
+    @classmethod
+    def _iter_received_blocks(cls, command_code: int, ser: serial.Serial, buffer: bytearray | memoryview, grow: bool, reuse: bool) -> Iterator[int]:
+        """Run a transfer, receiving every block into the buffer and yielding its offset once verified and acknowledged.
+
+        Args:
+            command_code (int): Command code used by the board for CXFER commands
+            ser (serial.Serial): Serial port on which to send the commands
+            buffer (bytearray | memoryview): Buffer receiving the data
+            grow (bool): True if the buffer is a bytearray that can be extended when full
+            reuse (bool): True to receive every block at the start of the buffer
+
+        Raises:
+            IOError: In case of timeouts, unexpected responses, checksum errors or if the buffer is too small
+            CXFERBlockFailedError: If the board reports a failed block
+
+        Yields:
+            Iterator[int]: The offset in the buffer of every verified block
+        """
+        header: bytearray = bytearray(cls._XFER_RESPONSE_SIZE)
+        checksum: bytearray = bytearray(cls._XFER_CHECKSUM_SIZE)
+        offset: int = 0
+        metrics = instrumentation.active
+        block_start: float = 0.0
 
         # Start the transfer!
         BoardUtilities.send_binary_command(ser, bytes([command_code, cls.CXFERSubCommand.EXECUTE_READ.value, *([0] * 16)]), 0)
 
         while True:
-            data: bytes = ser.read(cls._XFER_RESPONSE_SIZE)
-
-            if (data_len := len(data)) != cls._XFER_RESPONSE_SIZE:
-                raise IOError(f'Received {data_len} data for starting block!')
-            
-            resp, = struct.unpack('>I', data)
+            if metrics is not None:
+                block_start = time.perf_counter()
 
-            if resp == cls.CXFERResponse.XFER_PKT_START.value:
-                _LOGGER.debug(f'Received a XFER_PKT_START packet, current file size {len(file_data)}')
-            elif resp == cls.CXFERResponse.XFER_DONE.value:
-                _LOGGER.info(f'Received a XFER_DONE packet, current file size {len(file_data)}')
+            if not cls._read_block_header(ser, header, offset):
                 break
-            else:
-                raise IOError(f'Received {resp:0{4}X} while expecting a start block.')
-            
-            data_block = bytearray()
-            rem_data: int = cls._XMIT_BLOCK_SIZE
-
-            while rem_data > 0:
-                data = ser.read(16)
-
-                if (data_len := len(data)) <= 0:
-                    raise IOError('Timed out while waiting to read data...')
-                
-                rem_data = rem_data - data_len
-                data_block.extend(data)
-
-            calc_checksum: int = BoardUtilities.cxfer_checksum_calculator(bytes(data_block))
-            data = ser.read(cls._XFER_CHECKSUM_SIZE)
-            if (data_len := len(data)) != cls._XFER_CHECKSUM_SIZE:
-                raise IOError(f'Received {data_len} data for checksum!')
-            resp, = struct.unpack('<H', data)
-
-            if resp != calc_checksum:
-                raise IOError(f'Calculated checksum is {calc_checksum:0{4}X}, received is {resp:0{4}X}')
-            
-            # Append the block data to the file buffer
-            file_data.extend(data_block)
-
-            # Once verified, send the checksum back
-            ser.write(data) 
 
-            if update_callback:
-                update_callback(len(file_data))
-            
-        return bytes(file_data)
\ No newline at end of file
+            if offset + cls._XMIT_BLOCK_SIZE > len(buffer):
+                if not (grow and isinstance(buffer, bytearray)):
+                    raise IOError(f'Buffer of {len(buffer)} bytes is too small for the received data')
+                buffer.extend(bytes(cls._XMIT_BLOCK_SIZE + cls._XFER_CHECKSUM_SIZE))
+
+            with memoryview(buffer) as view:
+                # If there is room, the checksum is read together with the block, it will be overwritten by the next one
+                read_size: int = cls._XMIT_BLOCK_SIZE + (cls._XFER_CHECKSUM_SIZE if offset + cls._XMIT_BLOCK_SIZE + cls._XFER_CHECKSUM_SIZE <= len(view) else 0)
+                cls._read_block(ser, view[offset:offset + read_size], checksum, metrics, block_start)
+
+            yield offset
+
+            if not reuse:
+                offset += cls._XMIT_BLOCK_SIZE
+
+    @classmethod
+    def _read_block_header(cls, ser: serial.Serial, header: bytearray, received: int) -> bool:
+        """Read the header preceding every block
+
+        Returns:
+            bool: True if a block follows, False if the transfer is done
+        """
+        if (data_len := cls._read_exact_into(ser, memoryview(header))) != cls._XFER_RESPONSE_SIZE:
+            raise IOError(f'Received {data_len} data for starting block!')
+
+        resp, = struct.unpack('>I', header)
+
+        if resp == cls.CXFERResponse.XFER_PKT_START.value:
+            _LOGGER.debug(f'Received a XFER_PKT_START packet, current file size {received}')
+            return True
+        elif resp == cls.CXFERResponse.XFER_DONE.value:
+            _LOGGER.info(f'Received a XFER_DONE packet, current file size {received}')
+            return False
+        elif resp == cls.CXFERResponse.XFER_PKT_FAIL.value:
+            raise CXFERBlockFailedError(f'Board reported a failed block, current file size {received}', received)
+        else:
+            raise IOError(f'Received {resp:0{4}X} while expecting a start block.')
+
+    @classmethod
+    def _read_block(cls, ser: serial.Serial, view: memoryview, checksum: bytearray, metrics: instrumentation.Metrics | None, block_start: float) -> None:
+        """Receive a block into the view, verify it and send the acknowledge.
+        If the view has room for it, the checksum is read together with the block.
+        """
+        if cls._read_exact_into(ser, view) != len(view):
+            raise IOError('Timed out while waiting to read data...')
+
+        calc_checksum: int = BoardUtilities.cxfer_checksum_calculator(view[:cls._XMIT_BLOCK_SIZE])
+
+        if len(view) > cls._XMIT_BLOCK_SIZE:
+            checksum[:] = view[cls._XMIT_BLOCK_SIZE:]
+        elif (data_len := cls._read_exact_into(ser, memoryview(checksum))) != cls._XFER_CHECKSUM_SIZE:
+            raise IOError(f'Received {data_len} data for checksum!')
+
+        resp, = struct.unpack('<H', checksum)
+
+        if resp != calc_checksum:
+            if metrics is not None:
+                metrics.count_error('checksum')
+            raise IOError(f'Calculated checksum is {calc_checksum:0{4}X}, received is {resp:0{4}X}')
+
+        # Once verified, send the checksum back
+        ser.write(checksum)
+
+        if metrics is not None:
+            metrics.observe_cxfer_block(cls._XFER_RESPONSE_SIZE + cls._XMIT_BLOCK_SIZE + cls._XFER_CHECKSUM_SIZE, time.perf_counter() - block_start)
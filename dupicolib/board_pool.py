@@ -0,0 +1,273 @@
+"""This module contains code to drive multiple boards in parallel"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import logging
+import os
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Type, final
+
+import serial
+
+from dupicolib.board_command_class_factory import BoardCommandClassFactory
+from dupicolib.board_fw_version import FWVersionDict, FwVersionTools
+from dupicolib.board_utilities import BoardUtilities, HandshakeConfig
+from dupicolib.hardware_board_commands import HardwareBoardCommands
+
+if TYPE_CHECKING:
+    from dupicolib.detection_cache import DetectionCache
+
+_LOGGER = logging.getLogger(__name__)
+
+@dataclass
+class BoardConnection:
+    """An open and identified board"""
+    port: str
+    ser: serial.Serial
+    model: int
+    version: str
+    parsed_version: FWVersionDict | None
+    command_class: Type[HardwareBoardCommands]
+
+@dataclass
+class DumpJob:
+    """A dump to perform: the pin profile of the IC and where to put its content"""
+    address_pins: list[int]
+    data_pins: list[int]
+    hi_pins: list[int]
+    output: str | os.PathLike | Callable[[bytes], None]
+    name: str = ''
+
+@dataclass
+class DumpResult:
+    job: DumpJob
+    port: str
+    size: int
+    elapsed: float
+    error: Exception | None = None
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.size / self.elapsed if self.elapsed > 0 else 0.0
+
+@dataclass
+class BoardStats:
+    jobs: int = 0
+    failed_jobs: int = 0
+    bytes_read: int = 0
+    busy_time: float = 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_read / self.busy_time if self.busy_time > 0 else 0.0
+
+@dataclass
+class DumpReport:
+    results: list[DumpResult] = field(default_factory=list)
+    board_stats: dict[str, BoardStats] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def bytes_read(self) -> int:
+        return sum(stats.bytes_read for stats in self.board_stats.values())
+
+    @property
+    def bytes_per_second(self) -> float:
+        """Aggregate throughput over the whole run"""
+        return self.bytes_read / self.elapsed if self.elapsed > 0 else 0.0
+
+@final
+class BoardPool:
+    """
+    This class opens and identifies a set of boards in parallel.
+
+    dupico boards are identified through their model and firmware version, and get their command class
+    from BoardCommandClassFactory. Boards that can't be autodetected (e.g. Brutus28) can be given an explicit command class.
+    """
+
+    def __init__(self, ports: Iterable[str], baudrate: int = 115200, timeout: float = 5.0, command_classes: Mapping[str, Type[HardwareBoardCommands]] | None = None, cache: DetectionCache | None = None):
+        """
+        Args:
+            ports (Iterable[str]): Serial ports to open
+            baudrate (int, optional): Baud rate for the ports. Defaults to 115200.
+            timeout (float, optional): Read timeout for the ports. Defaults to 5.0.
+            command_classes (Mapping[str, Type[HardwareBoardCommands]] | None, optional): Explicit command classes for ports that must not be autodetected. Defaults to None.
+            cache (DetectionCache | None, optional): Cache of the detection results for autodetected boards. Defaults to None.
+        """
+        self._ports: list[str] = list(ports)
+        self._baudrate: int = baudrate
+        self._timeout: float = timeout
+        self._command_classes: Mapping[str, Type[HardwareBoardCommands]] = command_classes or {}
+        self._cache: DetectionCache | None = cache
+        self._boards: list[BoardConnection] = []
+
+    def __enter__(self) -> BoardPool:
+        self.open()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def boards(self) -> list[BoardConnection]:
+        return list(self._boards)
+
+    def open(self) -> list[BoardConnection]:
+        """Open and identify all the ports in parallel. Ports that fail are logged and left out of the pool.
+
+        Returns:
+            list[BoardConnection]: The boards that were identified, in the order of the ports
+        """
+        with ThreadPoolExecutor(max_workers=max(1, len(self._ports))) as executor:
+            connections = list(executor.map(self._open_board, self._ports))
+
+        self._boards = [conn for conn in connections if conn is not None]
+        return self.boards
+
+    def close(self) -> None:
+        for board in self._boards:
+            board.ser.close()
+        self._boards = []
+
+    def _open_board(self, port: str) -> BoardConnection | None:
+        try:
+            ser = serial.Serial(port, self._baudrate, timeout=self._timeout)
+        except serial.SerialException as exc:
+            _LOGGER.error(f'Unable to open port {port}: {exc}')
+            return None
+
+        try:
+            command_class = self._command_classes.get(port)
+            if command_class is None and self._cache is not None:
+                conn = self._cache.identify_board(port, ser)
+            else:
+                conn = self.identify_board(port, ser, command_class)
+
+            if conn is not None:
+                return conn
+        except Exception as exc:
+            _LOGGER.error(f'Unable to identify the board on port {port}: {exc}')
+
+        ser.close()
+        return None
+
+    @staticmethod
+    def identify_board(port: str, ser: serial.Serial, command_class: Type[HardwareBoardCommands] | None = None, config: HandshakeConfig | None = None) -> BoardConnection | None:
+        """Initialize the connection with a board and detect its model, version and command class
+
+        Args:
+            port (str): Name of the port
+            ser (serial.Serial): Open serial port connected to the board
+            command_class (Type[HardwareBoardCommands] | None, optional): Command class to use instead of autodetection. Defaults to None.
+            config (HandshakeConfig | None, optional): Timing of the handshake, also passed to command classes with their own initialize_connection. The defaults if None. Defaults to None.
+
+        Returns:
+            BoardConnection | None: The identified board, or None if identification failed
+        """
+        parsed_version: FWVersionDict | None = None
+
+        if command_class is not None:
+            # Boards with their own protocol handle the connection by themselves, within the same timing
+            initialize = getattr(command_class, 'initialize_connection', None)
+            if initialize is not None and not initialize(ser, config=config):
+                return None
+        elif not BoardUtilities.initialize_connection(ser, config=config):
+            return None
+
+        model: int | None = (command_class or HardwareBoardCommands).get_model(ser)
+        version: str | None = (command_class or HardwareBoardCommands).get_version(ser)
+
+        if model is None or version is None:
+            _LOGGER.error(f'Unable to read model or version of the board on {port}')
+            return None
+
+        if command_class is None:
+            parsed_version = FwVersionTools.parse(version)
+            command_class = BoardCommandClassFactory.get_command_class(model, parsed_version)
+
+        _LOGGER.info(f'Found board model {model}, version {version} on {port}')
+        return BoardConnection(port, ser, model, version, parsed_version, command_class)
+
+@final
+class DumpScheduler:
+    """
+    This class spreads a queue of dump jobs across the free boards of a pool, one worker thread per board.
+    """
+
+    def __init__(self, pool: BoardPool):
+        self._pool = pool
+
+    def run(self, jobs: Iterable[DumpJob], result_callback: Callable[[DumpResult], None] | None = None) -> DumpReport:
+        """Run all the jobs, each one on the first board that becomes free
+
+        Args:
+            jobs (Iterable[DumpJob]): Jobs to run
+            result_callback (Callable[[DumpResult], None] | None, optional): Callback receiving every result as soon as it is ready. It's called from the worker threads. Defaults to None.
+
+        Returns:
+            DumpReport: Results of every job, per-board and aggregate throughput
+        """
+        boards: list[BoardConnection] = self._pool.boards
+        if not boards:
+            raise IOError('No boards available in the pool')
+
+        job_queue: queue.SimpleQueue[DumpJob] = queue.SimpleQueue()
+        for job in jobs:
+            job_queue.put(job)
+
+        report = DumpReport(board_stats={board.port: BoardStats() for board in boards})
+        report_lock = threading.Lock()
+
+        def worker(board: BoardConnection) -> None:
+            while True:
+                try:
+                    job = job_queue.get_nowait()
+                except queue.Empty:
+                    return
+
+                result = self._run_job(board, job)
+
+                with report_lock:
+                    stats = report.board_stats[board.port]
+                    stats.jobs += 1
+                    stats.bytes_read += result.size
+                    stats.busy_time += result.elapsed
+                    if result.error is not None:
+                        stats.failed_jobs += 1
+                    report.results.append(result)
+
+                if result_callback is not None:
+                    result_callback(result)
+
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(boards)) as executor:
+            for future in [executor.submit(worker, board) for board in boards]:
+                future.result()
+        report.elapsed = time.perf_counter() - start_time
+
+        return report
+
+    @staticmethod
+    def _run_job(board: BoardConnection, job: DumpJob) -> DumpResult:
+        start_time = time.perf_counter()
+
+        try:
+            data = board.command_class.cxfer_read(job.address_pins, job.data_pins, job.hi_pins, None, board.ser)
+            if data is None:
+                raise IOError(f'Dump of {job.name or "job"} on {board.port} failed')
+
+            if callable(job.output):
+                job.output(data)
+            else:
+                with open(job.output, 'wb') as out_file:
+                    out_file.write(data)
+        except Exception as exc:
+            _LOGGER.error(f'Dump of {job.name or "job"} on {board.port} failed: {exc}')
+            return DumpResult(job, board.port, 0, time.perf_counter() - start_time, exc)
+
+        return DumpResult(job, board.port, len(data), time.perf_counter() - start_time)
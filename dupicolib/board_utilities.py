@@ -1,15 +1,49 @@
 """This module contains low level utility code to communicate with the board"""
 
-from typing import final
-from functools import reduce
-import operator
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Sequence, Tuple, final
 import logging
 import time
+import weakref
 
 import serial
 
+from dupicolib import instrumentation
 from dupicolib.board_interfaces.command_structures import CommandTokens
 
+if TYPE_CHECKING:
+    from dupicolib.async_serial import AsyncSerialPort
+
+@dataclass
+class HandshakeConfig:
+    """Timing of the connection handshake, all times are in seconds"""
+    max_attempts: int = 2
+    deadline: float = 10.0
+    attempt_timeout: float = 2.0
+    poll_interval: float = 0.02
+    initial_backoff: float = 0.05
+    backoff_factor: float = 2.0
+    max_backoff: float = 0.5
+
+@dataclass
+class HandshakeResult:
+    ready: bool
+    attempts: int
+    elapsed: float
+
+@dataclass
+class BinaryBurstResult:
+    """Outcome of a burst of binary commands. Responses are None for commands that expect none,
+    and for the failed command and all the following ones, which were not processed."""
+    responses: list[bytes | None]
+    failed_index: int | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.failed_index is None
+
 @final
 class BoardUtilities:
     """
@@ -23,31 +57,96 @@ class BoardUtilities:
 
     _LOGGER = logging.getLogger(__name__)
 
+    # Number of times the board behind every port has been reset, to invalidate the state cached per connection
+    _CONNECTION_EPOCH_BY_SERIAL: weakref.WeakKeyDictionary[object, int] = weakref.WeakKeyDictionary()
+
     @classmethod
-    def _connection_string_loop_check(cls, ser: serial.Serial, retries: int) -> bool:
-        # We'll try to read the string right away, before toggling DTR,
-        # because we expect that this code is called somewhat right after the 
-        # serial port is opened, and thus already providing a DTR toggle.
-
-        for i in range(1, retries + 1):
-            response = ser.readline(cls._MAX_RESPONSE_SIZE).decode(cls._ENCODING).strip()
-            if response and response == CommandTokens.BOARD_ENABLED.value:
-                cls._LOGGER.debug(f'Connection try {i} succeeded!')
-                return True
-            cls._LOGGER.debug(f'Connection try {i} failed, got "{response}"!')     
-
-            # Reset the connection to the board
-            ser.dtr = False
-            # Clear everything we have up to now
-            ser.reset_input_buffer()
-            time.sleep(0.5)
-            ser.dtr = True
-            time.sleep(0.5)
+    def connection_epoch(cls, ser: object) -> int:
+        """Count of the resets of the board connected to a port. State cached for a connection
+        (e.g. the CXFER configuration) is valid only as long as this value does not change.
+
+        Args:
+            ser (object): Serial port connected to the board, sync or async
 
-        return False   
+        Returns:
+            int: The number of resets seen so far
+        """
+        return cls._CONNECTION_EPOCH_BY_SERIAL.get(ser, 0)
+
+    @classmethod
+    def mark_connection_reset(cls, ser: object) -> None:
+        """Record that the board connected to a port has been reset, or is being connected
+
+        Args:
+            ser (object): Serial port connected to the board, sync or async
+        """
+        cls._CONNECTION_EPOCH_BY_SERIAL[ser] = cls.connection_epoch(ser) + 1
 
     @classmethod
-    def initialize_connection(cls, ser: serial.Serial, retries: int = 2) -> bool:
+    def handshake(cls, ser: serial.Serial, config: HandshakeConfig | None = None) -> HandshakeResult:
+        """Wait for the board to announce the connection, polling the port with short reads.
+
+        The banner is accepted as soon as it's complete. If an attempt times out, DTR is toggled to reset
+        the board, waiting with exponential backoff between the toggles, until the attempts or the overall deadline run out.
+
+        Args:
+            ser (serial.Serial): Serial port connected to the dupico
+            config (HandshakeConfig | None, optional): Timing of the handshake, the defaults if None. Defaults to None.
+
+        Returns:
+            HandshakeResult: Outcome of the handshake, with the number of attempts and the time it took
+        """
+        config = config or HandshakeConfig()
+        banner: bytes = CommandTokens.BOARD_ENABLED.value.encode(cls._ENCODING)
+        start_time: float = time.perf_counter()
+        deadline: float = start_time + config.deadline
+        backoff: float = config.initial_backoff
+        original_timeout: float | None = ser.timeout
+        attempt: int = 0
+
+        # The banner is sent only after a reset, so whatever the board held before is gone
+        cls.mark_connection_reset(ser)
+
+        try:
+            # We'll try to read the string right away, before toggling DTR,
+            # because we expect that this code is called somewhat right after the
+            # serial port is opened, and thus already providing a DTR toggle.
+            while attempt < config.max_attempts and (now := time.perf_counter()) < deadline:
+                attempt += 1
+                attempt_end: float = min(deadline, now + config.attempt_timeout)
+                line: bytearray = bytearray()
+
+                while (now := time.perf_counter()) < attempt_end:
+                    ser.timeout = min(config.poll_interval, attempt_end - now)
+                    line += ser.readline(cls._MAX_RESPONSE_SIZE - len(line))
+
+                    if line.endswith(b'\n') or len(line) >= cls._MAX_RESPONSE_SIZE:
+                        if line.strip() == banner:
+                            elapsed = time.perf_counter() - start_time
+                            cls._LOGGER.debug(f'Connection try {attempt} succeeded after {elapsed:.3f}s!')
+                            return HandshakeResult(True, attempt, elapsed)
+                        cls._LOGGER.debug(f'Connection try {attempt} got "{bytes(line)}"')
+                        line.clear()
+
+                cls._LOGGER.debug(f'Connection try {attempt} failed!')
+
+                if attempt >= config.max_attempts:
+                    break
+
+                # Reset the connection to the board
+                ser.dtr = False
+                # Clear everything we have up to now
+                ser.reset_input_buffer()
+                time.sleep(max(0.0, min(backoff, deadline - time.perf_counter())))
+                ser.dtr = True
+                backoff = min(backoff * config.backoff_factor, config.max_backoff)
+        finally:
+            ser.timeout = original_timeout
+
+        return HandshakeResult(False, attempt, time.perf_counter() - start_time)
+
+    @classmethod
+    def initialize_connection(cls, ser: serial.Serial, retries: int = 2, config: HandshakeConfig | None = None) -> bool:
         """This method toggles DTR and checks that the connection to the board is established by waiting for
         a specific string to be received.
         This string is sent by the board as soon as it detects a new connection.
@@ -57,26 +156,29 @@ class BoardUtilities:
         Args:
             ser (serial.Serial): Serial port connected to the dupico
             retries (int, optional): Number of retries used to check for the string. Defaults to 2.
+            config (HandshakeConfig | None, optional): Timing of the handshake, overrides retries if set. Defaults to None.
 
         Returns:
             bool: True if the connection is validated and board set to the proper protocol.
-        """        
+        """
 
         cls._LOGGER.debug('Attempting to detect board...')
 
-        if(cls._connection_string_loop_check(ser, retries)):
+        result = cls.handshake(ser, config or HandshakeConfig(max_attempts=retries))
+        if result.ready:
             ser.reset_input_buffer()
             return True
-    
-        cls._LOGGER.critical('Detection attempt failed.')
+
+        cls._LOGGER.critical(f'Detection attempt failed after {result.attempts} tries and {result.elapsed:.3f}s.')
 
         return False
 
     @classmethod
     def send_binary_command(cls, ser: serial.Serial, cmd: bytes, resp_data_len: int = 0) -> bytes | None:
-        chks: int = cls.command_checksum_calculator(cmd)
+        metrics = instrumentation.active
+        start_time: float = time.perf_counter() if metrics is not None else 0.0
 
-        ser.write(bytes([*cmd, chks]))
+        ser.write(cls.frame_binary_command(cmd))
 
         # In this case, we just send the command and ignore any response, that we expect to be handled by the caller
         if resp_data_len <= 0:
@@ -85,36 +187,145 @@ class BoardUtilities:
         else:
             cls._LOGGER.debug(f'Sending command {cmd}, expecting a response of length {resp_data_len}.')
 
+        resp: bytes = ser.read(1)
+        if len(resp) == 1 and resp[0] == cmd[0] | cls.BINARY_COMMAND_RESPONSE_FLAG:
+            resp += ser.read(resp_data_len + 1) # + 1 as we also need the checksum
+
+        if metrics is not None:
+            metrics.observe_command(f'0x{cmd[0]:02X}', time.perf_counter() - start_time, len(cmd) + 1, len(resp))
+
+        return cls.validate_binary_response(ser, cmd, resp, resp_data_len)
 
+    @classmethod
+    def send_binary_commands(cls, ser: serial.Serial, cmds: Sequence[Tuple[bytes, int]]) -> BinaryBurstResult:
+        """Send multiple commands with a single write, then read and validate all the responses in a single pass.
+        This way the cost of the USB round trip is paid once for the whole list of commands.
+
+        If a response is wrong, the input buffer is cleared and processing stops: the index of that command
+        is reported in the result, and the responses for it and for all the following ones will be None.
+
+        Args:
+            ser (serial.Serial): Serial port connected to the board
+            cmds (Sequence[Tuple[bytes, int]]): List of (command, expected response data length) pairs. Commands with a length <= 0 expect no response.
+
+        Returns:
+            BinaryBurstResult: The response data for every command, and the index of the failed command, if any
+        """
+        if not cmds:
+            return BinaryBurstResult([])
+
+        cls._LOGGER.debug(f'Sending {len(cmds)} commands in a single burst.')
+        metrics = instrumentation.active
+        start_time: float = time.perf_counter() if metrics is not None else 0.0
+
+        burst, resp_size = cls.frame_binary_commands(cmds)
+        ser.write(burst)
+
+        # Responses are all read together, then split
+        resp_data: bytes = ser.read(resp_size)
+
+        if metrics is not None:
+            metrics.observe_command('binary_burst', time.perf_counter() - start_time, len(burst), len(resp_data))
+
+        return cls.parse_binary_responses(ser, cmds, resp_data)
+
+    @classmethod
+    def frame_binary_command(cls, cmd: bytes) -> bytes:
+        """Append the checksum to a binary command, ready to be sent"""
+        return bytes([*cmd, cls.command_checksum_calculator(cmd)])
+
+    @staticmethod
+    def binary_response_size(resp_data_len: int) -> int:
+        """Size of the response to a binary command: response code, data and checksum, or nothing if no data is expected"""
+        return resp_data_len + 2 if resp_data_len > 0 else 0
+
+    @classmethod
+    def frame_binary_commands(cls, cmds: Sequence[Tuple[bytes, int]]) -> Tuple[bytes, int]:
+        """Frame a list of binary commands to be sent with a single write
+
+        Args:
+            cmds (Sequence[Tuple[bytes, int]]): List of (command, expected response data length) pairs
+
+        Returns:
+            Tuple[bytes, int]: The framed commands, and the total size of the responses to read back
+        """
+        burst: bytes = b''.join(cls.frame_binary_command(cmd) for cmd, _ in cmds)
+        return burst, sum(cls.binary_response_size(resp_data_len) for _, resp_data_len in cmds)
+
+    @classmethod
+    def parse_binary_responses(cls, ser: serial.Serial | AsyncSerialPort, cmds: Sequence[Tuple[bytes, int]], resp_data: bytes) -> BinaryBurstResult:
+        """Split the responses to a list of commands sent together, validating them in order.
+        Processing stops at the first wrong response, see send_binary_commands.
+
+        Args:
+            ser (serial.Serial | AsyncSerialPort): Serial port the commands were sent on, its input buffer is cleared in case of errors
+            cmds (Sequence[Tuple[bytes, int]]): List of (command, expected response data length) pairs
+            resp_data (bytes): Everything read back after sending the commands
+
+        Returns:
+            BinaryBurstResult: The response data for every command, and the index of the failed command, if any
+        """
+        results: list[bytes | None] = [None] * len(cmds)
+
+        offset: int = 0
+        for idx, (cmd, resp_data_len) in enumerate(cmds):
+            resp_size: int = cls.binary_response_size(resp_data_len)
+            if resp_size == 0:
+                continue
+
+            res: bytes | None = cls.validate_binary_response(ser, cmd, resp_data[offset:offset + resp_size], resp_data_len)
+            if res is None:
+                cls._LOGGER.error(f'Command {idx} of {len(cmds)} in the burst failed, {cmd}')
+                return BinaryBurstResult(results, idx)
+
+            results[idx] = res
+            offset += resp_size
+
+        return BinaryBurstResult(results)
+
+    @classmethod
+    def validate_binary_response(cls, ser: serial.Serial | AsyncSerialPort, cmd: bytes, resp: bytes, resp_data_len: int) -> bytes | None:
+        """Check a response (response code, data and checksum) to a binary command.
+        In case of errors, the input buffer is cleared.
+
+        Returns:
+            bytes | None: The response data, or None if the response is wrong
+        """
         expected_resp = cmd[0] | cls.BINARY_COMMAND_RESPONSE_FLAG
-        resp_code: bytes = ser.read(1)
-        if (len(resp_code) == 0):
+        if (len(resp) == 0):
             cls._LOGGER.error(f'Got a zero-length response')
-            ser.reset_input_buffer()
+            cls._reset_after_error(ser, 'response')
             return None
 
-        if (len(resp_code) != 1 or resp_code[0] != expected_resp):
-            cls._LOGGER.error(f'Got response {resp_code[0]:0{2}X} while expected was {expected_resp:0{2}X}')
-            ser.reset_input_buffer()
+        if resp[0] != expected_resp:
+            cls._LOGGER.error(f'Got response {resp[0]:0{2}X} while expected was {expected_resp:0{2}X}')
+            cls._reset_after_error(ser, 'response')
             return None
         
-        resp_data = ser.read(resp_data_len + 1) # + 1 as we also need the checksum
-        if (len(resp_data) - 1) != resp_data_len:
-            cls._LOGGER.error(f'Got response data length {len(resp_data)}, expected was {resp_data_len}')
-            ser.reset_input_buffer()
+        if (len(resp) - 2) != resp_data_len:
+            cls._LOGGER.error(f'Got response data length {len(resp) - 1}, expected was {resp_data_len}')
+            cls._reset_after_error(ser, 'response')
             return None
         
-        if cls.command_checksum_calculator(resp_code + resp_data) != 0:
+        if cls.command_checksum_calculator(resp) != 0:
             cls._LOGGER.error(f'Command has wrong checksum')
-            ser.reset_input_buffer()
+            cls._reset_after_error(ser, 'checksum')
             return None            
         
-        return resp_data[:-1] # Avoid returning the checksum
+        return resp[1:-1] # Avoid returning the response code and the checksum
+
+    @staticmethod
+    def _reset_after_error(ser: serial.Serial | AsyncSerialPort, kind: str) -> None:
+        ser.reset_input_buffer()
+
+        if (metrics := instrumentation.active) is not None:
+            metrics.count_error(kind)
+            metrics.count_error('buffer_reset')
 
     @staticmethod
-    def command_checksum_calculator(data: bytes) -> int: 
-        return reduce(operator.sub, bytes([0, *data])) & 0xFF
+    def command_checksum_calculator(data: bytes | bytearray | memoryview) -> int: 
+        return -sum(data) & 0xFF
     
     @staticmethod
-    def cxfer_checksum_calculator(data: bytes) -> int: 
-        return reduce(operator.add, bytes([0, *data])) & 0xFFFF
+    def cxfer_checksum_calculator(data: bytes | bytearray | memoryview) -> int: 
+        return sum(data) & 0xFFFF
@@ -0,0 +1,194 @@
+"""This module contains an on-disk cache of board detection results, keyed by USB identity"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, replace
+import json
+import logging
+import os
+import threading
+import time
+from typing import Type, final
+
+import serial
+from serial.tools import list_ports
+
+from dupicolib.board_command_class_factory import BoardCommandClassFactory
+from dupicolib.board_fw_version import FWVersionDict
+from dupicolib.board_interfaces.brutus28_board_commands import Brutus28BoardCommands
+from dupicolib.board_pool import BoardConnection, BoardPool
+from dupicolib.board_utilities import BoardUtilities, HandshakeConfig
+from dupicolib.hardware_board_commands import HardwareBoardCommands
+
+_LOGGER = logging.getLogger(__name__)
+
+# Boards with their own protocol, not picked by BoardCommandClassFactory
+_BUILTIN_COMMAND_CLASSES: tuple[Type[HardwareBoardCommands], ...] = (Brutus28BoardCommands,)
+
+@dataclass
+class CachedDetection:
+    """Detection result of a board, as stored in the cache"""
+    model: int
+    version: str
+    parsed_version: FWVersionDict
+    command_class: str
+
+@final
+class DetectionCache:
+    """
+    This class keeps the model, firmware version and command class of every board that was
+    detected, keyed by the VID, PID and serial number of its USB interface.
+
+    Known boards skip the DTR toggles and the model query: a single version query tells if the board is
+    ready and still runs the same firmware. The connection banner is waited for only if the board has one
+    pending or does not answer. A full detection is done if the version does not match.
+
+    Command classes are stored by name and resolved only against the classes known to dupicolib,
+    an unknown name is treated as a cache miss.
+    """
+
+    def __init__(self, path: str | os.PathLike, banner_config: HandshakeConfig | None = None):
+        """
+        Args:
+            path (str | os.PathLike): Path of the JSON file backing the cache. It's created on the first save.
+            banner_config (HandshakeConfig | None, optional): Timing of the wait for the banner of known boards that are not ready, a single attempt without DTR toggles if None. Defaults to None.
+        """
+        self._path: str | os.PathLike = path
+        self._banner_config: HandshakeConfig = banner_config or HandshakeConfig(max_attempts=1)
+        self._lock = threading.Lock()
+        self._entries: dict[str, CachedDetection] = {}
+
+        try:
+            with open(path, 'r', encoding='utf-8') as cache_file:
+                self._entries = {key: CachedDetection(**entry) for key, entry in json.load(cache_file).items()}
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError) as exc:
+            _LOGGER.warning(f'Ignoring invalid detection cache {path}: {exc}')
+
+    @staticmethod
+    def usb_key(port: str) -> str | None:
+        """Build the cache key for a port from its USB identity
+
+        Args:
+            port (str): Name of the port
+
+        Returns:
+            str | None: A VID:PID:serial key, or None if the port is not an USB device with a serial number
+        """
+        for port_info in list_ports.comports():
+            if port_info.device == port and port_info.vid is not None and port_info.serial_number:
+                return f'{port_info.vid:04X}:{port_info.pid:04X}:{port_info.serial_number}'
+
+        return None
+
+    def lookup(self, key: str) -> CachedDetection | None:
+        with self._lock:
+            return self._entries.get(key)
+
+    def store(self, key: str, conn: BoardConnection) -> None:
+        """Store the detection result of a board and save the cache
+
+        Args:
+            key (str): Cache key of the board
+            conn (BoardConnection): The identified board. Boards without a parsed version are not cached.
+        """
+        if conn.parsed_version is None:
+            return
+
+        with self._lock:
+            self._entries[key] = CachedDetection(conn.model, conn.version, conn.parsed_version, self._class_name(conn.command_class))
+            self._save()
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._save()
+
+    def identify_board(self, port: str, ser: serial.Serial, key: str | None = None, config: HandshakeConfig | None = None) -> BoardConnection | None:
+        """Identify a board using the cache, falling back to BoardPool.identify_board
+
+        Args:
+            port (str): Name of the port
+            ser (serial.Serial): Open serial port connected to the board
+            key (str | None, optional): Cache key of the board, looked up from the USB identity of the port if None. Defaults to None.
+            config (HandshakeConfig | None, optional): Timing of the detection. Its deadline bounds the check of a known board together
+                with the full detection that might follow it. Defaults to None.
+
+        Returns:
+            BoardConnection | None: The identified board, or None if identification failed
+        """
+        key = key or self.usb_key(port)
+        start_time: float = time.monotonic()
+
+        if key is not None and (entry := self.lookup(key)) is not None:
+            command_class = self._resolve_class(entry.command_class)
+
+            banner_config: HandshakeConfig = self._banner_config
+            if config is not None:
+                banner_config = replace(banner_config, attempt_timeout=min(banner_config.attempt_timeout, config.attempt_timeout),
+                                        deadline=min(banner_config.deadline, config.deadline))
+
+            # The command class depends on the firmware version, so a reflashed board must not match its old entry
+            if command_class is not None and self._check_version(port, ser, command_class, banner_config) == entry.version:
+                _LOGGER.info(f'Found cached board model {entry.model}, version {entry.version} on {port}')
+                return BoardConnection(port, ser, entry.model, entry.version, entry.parsed_version, command_class)
+
+            _LOGGER.info(f'Cached detection for {port} is stale, running full detection')
+            ser.reset_input_buffer()
+
+            # The full detection only gets what the check left of the deadline
+            if config is not None:
+                remaining: float = config.deadline - (time.monotonic() - start_time)
+                if remaining <= 0:
+                    _LOGGER.warning(f'No time left for the full detection on {port}')
+                    self.forget(key)
+                    return None
+
+                config = replace(config, deadline=remaining, attempt_timeout=min(config.attempt_timeout, remaining))
+
+        conn = BoardPool.identify_board(port, ser, config=config)
+
+        if conn is None:
+            if key is not None:
+                self.forget(key)
+        elif key is not None:
+            self.store(key, conn)
+
+        return conn
+
+    def _save(self) -> None:
+        tmp_path = f'{os.fspath(self._path)}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+            json.dump({key: asdict(entry) for key, entry in self._entries.items()}, cache_file, indent=2)
+        os.replace(tmp_path, self._path)
+
+    @staticmethod
+    def _check_version(port: str, ser: serial.Serial, command_class: Type[HardwareBoardCommands], banner_config: HandshakeConfig) -> str | None:
+        # Opening the port resets the board, which might be announcing itself: let a pending banner through first
+        if ser.in_waiting:
+            BoardUtilities.handshake(ser, banner_config)
+            ser.reset_input_buffer()
+
+        if (version := command_class.get_version(ser)) is not None:
+            return version
+
+        # The board might still be booting, wait for its banner and ask once more
+        _LOGGER.debug(f'No answer from the board on {port}, waiting for it to be ready')
+        BoardUtilities.handshake(ser, banner_config)
+        ser.reset_input_buffer()
+
+        return command_class.get_version(ser)
+
+    @staticmethod
+    def _class_name(command_class: Type[HardwareBoardCommands]) -> str:
+        return f'{command_class.__module__}:{command_class.__qualname__}'
+
+    @classmethod
+    def _resolve_class(cls, name: str) -> Type[HardwareBoardCommands] | None:
+        for command_class in (*BoardCommandClassFactory.get_command_classes(), *_BUILTIN_COMMAND_CLASSES):
+            if cls._class_name(command_class) == name:
+                return command_class
+
+        _LOGGER.warning(f'Cached command class {name} is not known')
+        return None
@@ -0,0 +1,213 @@
+"""This module contains sinks receiving the content of a dump block by block, writing it to disk as it arrives"""
+
+from __future__ import annotations
+
+from abc import ABC
+import mmap
+import os
+from typing import BinaryIO, TextIO, final
+
+class DumpSink(ABC):
+    """
+    This class sets the shape of a destination for the content of a dump: data is written in order,
+    one block at a time, so that the whole image never needs to be kept in memory.
+
+    Blocks passed to write might be views on buffers that are reused right after the call, so they must be copied or consumed right away.
+    """
+
+    def __init__(self) -> None:
+        self.written: int = 0
+
+    def __enter__(self) -> DumpSink:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write(self, data: bytes | bytearray | memoryview) -> None:
+        """Append a block of data to the dump
+
+        Args:
+            data (bytes | bytearray | memoryview): The block, following the previous one
+        """
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        """Complete the output and release it"""
+        pass
+
+@final
+class MmapSink(DumpSink):
+    """This class writes the dump into a file preallocated to the size of the IC and mapped in memory"""
+
+    def __init__(self, path: str | os.PathLike, size: int):
+        """
+        Args:
+            path (str | os.PathLike): Path of the output file, overwritten if it exists
+            size (int): Size of the dump, e.g. from BoardCommandsInterface.cxfer_data_size
+
+        Raises:
+            ValueError: If the size is not positive
+        """
+        if size <= 0:
+            raise ValueError(f'Cannot map a dump of {size} bytes')
+
+        super().__init__()
+        self.size: int = size
+        self._file: BinaryIO = open(path, 'w+b')
+        self._file.truncate(size)
+        self._map: mmap.mmap = mmap.mmap(self._file.fileno(), size)
+
+    def write(self, data: bytes | bytearray | memoryview) -> None:
+        end: int = self.written + len(data)
+        if end > self.size:
+            raise IOError(f'Received {end} bytes for a dump of {self.size} bytes')
+
+        self._map[self.written:end] = data
+        self.written = end
+
+    def close(self) -> None:
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+        self._file.close()
+
+@final
+class RawFileSink(DumpSink):
+    """This class appends the dump to a binary file, as it arrives"""
+
+    def __init__(self, path: str | os.PathLike, append: bool = False):
+        """
+        Args:
+            path (str | os.PathLike): Path of the output file
+            append (bool, optional): True to add to an existing file, e.g. when resuming a dump, False to overwrite it. Defaults to False.
+        """
+        super().__init__()
+        self._file: BinaryIO = open(path, 'ab' if append else 'wb')
+
+    def write(self, data: bytes | bytearray | memoryview) -> None:
+        self._file.write(data)
+        self.written += len(data)
+
+    def close(self) -> None:
+        self._file.close()
+
+class _RecordSink(DumpSink):
+    """Base of the text encoders: data is split in records of a fixed size, keeping only the incomplete one in memory"""
+
+    def __init__(self, path: str | os.PathLike, record_size: int, base_address: int):
+        if not 0 < record_size <= 0xF0:
+            raise ValueError(f'Records of {record_size} bytes are not supported')
+
+        super().__init__()
+        self.record_size: int = record_size
+        self.base_address: int = base_address
+        self._file: TextIO = open(path, 'w', encoding='ascii', newline='\r\n')
+        self._pending: bytearray = bytearray()
+        self._pending_address: int = base_address
+
+    def write(self, data: bytes | bytearray | memoryview) -> None:
+        self._pending += data
+        self.written += len(data)
+
+        consumed: int = 0
+        while len(self._pending) - consumed >= self.record_size:
+            self._emit_data(self._pending_address, memoryview(self._pending)[consumed:consumed + self.record_size])
+            self._pending_address += self.record_size
+            consumed += self.record_size
+
+        del self._pending[:consumed]
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+
+        if self._pending:
+            self._emit_data(self._pending_address, memoryview(self._pending))
+            self._pending_address += len(self._pending)
+            self._pending.clear()
+
+        self._emit_end()
+        self._file.close()
+
+    def _emit_data(self, address: int, data: memoryview) -> None:
+        raise NotImplementedError()
+
+    def _emit_end(self) -> None:
+        raise NotImplementedError()
+
+@final
+class IntelHexSink(_RecordSink):
+    """This class encodes the dump as Intel HEX, using extended linear address records past the first 64 KiB"""
+
+    def __init__(self, path: str | os.PathLike, record_size: int = 16, base_address: int = 0):
+        """
+        Args:
+            path (str | os.PathLike): Path of the output file, overwritten if it exists
+            record_size (int, optional): Data bytes in every record. Defaults to 16.
+            base_address (int, optional): Address of the first byte of the dump. Defaults to 0.
+        """
+        super().__init__(path, record_size, base_address)
+        self._segment: int = 0
+
+    def _emit_data(self, address: int, data: memoryview) -> None:
+        # Records can't cross a 64 KiB boundary
+        while data:
+            if (segment := address >> 16) != self._segment:
+                self._emit_record(0x04, 0, segment.to_bytes(2, 'big'))
+                self._segment = segment
+
+            length: int = min(len(data), 0x10000 - (address & 0xFFFF))
+            self._emit_record(0x00, address & 0xFFFF, data[:length])
+            address += length
+            data = data[length:]
+
+    def _emit_end(self) -> None:
+        self._emit_record(0x01, 0, b'')
+
+    def _emit_record(self, record_type: int, address: int, data: bytes | memoryview) -> None:
+        record: bytes = bytes([len(data), address >> 8, address & 0xFF, record_type]) + data
+        self._file.write(f':{record.hex().upper()}{-sum(record) & 0xFF:02X}\n')
+
+@final
+class SRecordSink(_RecordSink):
+    """This class encodes the dump as Motorola S-records, using the shortest address width that fits the dump"""
+
+    def __init__(self, path: str | os.PathLike, size: int | None = None, record_size: int = 16, base_address: int = 0, header: bytes = b''):
+        """
+        Args:
+            path (str | os.PathLike): Path of the output file, overwritten if it exists
+            size (int | None, optional): Size of the dump, used to select S1, S2 or S3 records. S3 records are used if None. Defaults to None.
+            record_size (int, optional): Data bytes in every record. Defaults to 16.
+            base_address (int, optional): Address of the first byte of the dump. Defaults to 0.
+            header (bytes, optional): Content of the S0 header record. Defaults to b''.
+        """
+        super().__init__(path, record_size, base_address)
+        self._records: int = 0
+
+        end_address: int = 1 << 32 if size is None else base_address + size
+        if end_address <= 1 << 16:
+            self._address_size = 2
+        elif end_address <= 1 << 24:
+            self._address_size = 3
+        else:
+            self._address_size = 4
+
+        self._emit_record(0, 0, 2, header[:0xFF - 3])
+
+    def _emit_data(self, address: int, data: memoryview) -> None:
+        self._emit_record(self._address_size - 1, address, self._address_size, data)
+        self._records += 1
+
+    def _emit_end(self) -> None:
+        if self._records <= 0xFFFF:
+            self._emit_record(5, self._records, 2, b'')
+        elif self._records <= 0xFFFFFF:
+            self._emit_record(6, self._records, 3, b'')
+
+        # S7, S8 or S9, matching the data records
+        self._emit_record(11 - self._address_size, 0, self._address_size, b'')
+
+    def _emit_record(self, record_type: int, address: int, address_size: int, data: bytes | memoryview) -> None:
+        record: bytes = bytes([address_size + len(data) + 1]) + address.to_bytes(address_size, 'big') + data
+        self._file.write(f'S{record_type}{record.hex().upper()}{~sum(record) & 0xFF:02X}\n')
@@ -0,0 +1,122 @@
+"""This module contains a simulator of the Brutus28 text command shell"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+import logging
+from typing import Tuple
+
+from dupicolib.board_interfaces.brutus28_board_commands import Brutus28BoardCommands
+from dupicolib.emulators.link import EmulatedDevice
+from dupicolib.emulators.virtual_chips import VirtualChip
+
+_LOGGER = logging.getLogger(__name__)
+
+_PIN_MASK: int = (1 << 28) - 1
+_PROMPT: str = 'CMD> '
+_ENCODING: str = 'ASCII'
+
+class Brutus28Simulator(EmulatedDevice):
+    """
+    This class simulates the Brutus28 shell: "version", "pld check", "pld enable", "pld disable",
+    "pld output <value>" and "pld input", with the 28 pins of the socket connected to a virtual chip.
+
+    Every command can be given its own execution time, looked up by the longest matching command prefix.
+    Pins are handled as bit indexes of the socket, as in Brutus28BoardCommands.
+    """
+
+    def __init__(self, chip: VirtualChip | None = None, version: str = 'Version 0.3 built SIM', echo: bool = True,
+                 command_latency: Mapping[str, float] | None = None, default_latency: float = 0.0, check_result: bool = True):
+        """
+        Args:
+            chip (VirtualChip | None, optional): IC plugged in the socket, inputs read back the outputs if None. Defaults to None.
+            version (str, optional): Line printed by the "version" command. Defaults to 'Version 0.3 built SIM'.
+            echo (bool, optional): True to echo back the commands, as the shell does when used from a terminal. Defaults to True.
+            command_latency (Mapping[str, float] | None, optional): Execution time in seconds by command prefix, e.g. {'pld input': 0.001}. Defaults to None.
+            default_latency (float, optional): Execution time of commands without a specific latency. Defaults to 0.0.
+            check_result (bool, optional): Result of "pld check". Defaults to True.
+        """
+        self.chip = chip
+        self.version = version
+        self.echo = echo
+        self.command_latency: dict[str, float] = dict(command_latency or {})
+        self.default_latency = default_latency
+        self.check_result = check_result
+
+        self.outputs: int = 0
+        self.enabled: bool = False
+        self.commands: list[str] = []
+        self._line: bytearray = bytearray()
+
+    def reset(self) -> bytes:
+        self.outputs = 0
+        self.enabled = False
+        self._line.clear()
+
+        # The shell prints nothing when the port is opened, the host pokes it to get a prompt
+        return b''
+
+    def process(self, data: bytes) -> bytes:
+        return b''.join(response for _, response in self.process_timed(data))
+
+    def process_timed(self, data: bytes) -> list[Tuple[float, bytes]]:
+        responses: list[Tuple[float, bytes]] = []
+
+        for char in data:
+            if char == ord('\r'):
+                command = self._line.decode(_ENCODING, errors='replace').strip()
+                self._line.clear()
+                self.commands.append(command)
+
+                echo = f'{command}\r\n' if self.echo else ''
+                responses.append((self._latency(command), f'{echo}{self._execute(command)}{_PROMPT}'.encode(_ENCODING)))
+            elif char != ord('\n'):
+                self._line.append(char)
+
+        return responses
+
+    def _latency(self, command: str) -> float:
+        matches = [prefix for prefix in self.command_latency if command.startswith(prefix)]
+        return self.command_latency[max(matches, key=len)] if matches else self.default_latency
+
+    def _execute(self, command: str) -> str:
+        words = command.split()
+
+        if not words:
+            return ''
+        elif command == 'version':
+            return f'{self.version}\r\n'
+        elif command == 'pld check':
+            return 'PASS\r\n' if self.check_result else 'FAIL\r\n'
+        elif command == 'pld enable':
+            self.enabled = True
+            return ''
+        elif command == 'pld disable':
+            self.enabled = False
+            return ''
+        elif words[:2] == ['pld', 'output'] and len(words) == 3:
+            try:
+                self.outputs = int(words[2], 0) & _PIN_MASK
+            except ValueError:
+                return f'Invalid value {words[2]}\r\n'
+            return ''
+        elif command == 'pld input':
+            return f'Input={self._inputs():028b}\r\n'
+
+        _LOGGER.debug(f'Unknown command {command}')
+        return f'Unknown command {command}\r\n'
+
+    def _inputs(self) -> int:
+        if self.chip is None:
+            return self.outputs
+
+        return self.chip.respond(self.outputs) & _PIN_MASK
+
+    @staticmethod
+    def pin_map() -> dict[int, int]:
+        """Mapping of the socket pins to the bit indexes used by the shell, to build virtual chips
+
+        Returns:
+            dict[int, int]: The pin map of Brutus28BoardCommands
+        """
+        return dict(Brutus28BoardCommands._PIN_NUMBER_TO_INDEX_MAP)
@@ -0,0 +1,298 @@
+"""This module contains the transports connecting emulated boards to the library: an in-process serial port and a pty server"""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+import logging
+import os
+import random
+import select
+import threading
+import time
+from typing import Deque, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+class EmulatedDevice:
+    """
+    This class sets the shape of an emulated board: it receives the bytes sent by the host
+    and returns the bytes it answers with.
+    """
+
+    def reset(self) -> bytes:
+        """Reset the board, as it happens when DTR is toggled or the port is opened
+
+        Returns:
+            bytes: Whatever the board sends right after the reset
+        """
+        raise NotImplementedError()
+
+    def process(self, data: bytes) -> bytes:
+        """Process data received from the host
+
+        Args:
+            data (bytes): Data sent by the host, commands might be split across calls
+
+        Returns:
+            bytes: The response of the board, empty if there is none yet
+        """
+        raise NotImplementedError()
+
+    def process_timed(self, data: bytes) -> list[Tuple[float, bytes]]:
+        """Same as process, for boards that take time to execute their commands
+
+        Args:
+            data (bytes): Data sent by the host, commands might be split across calls
+
+        Returns:
+            list[Tuple[float, bytes]]: The responses, in order, each one with the time the board takes to produce it
+        """
+        return [(0.0, self.process(data))]
+
+@dataclass
+class LinkProfile:
+    """Behaviour of the link between host and board. Faults are injected only on data sent by the board."""
+    latency: float = 0.0
+    corrupt_rate: float = 0.0
+    drop_rate: float = 0.0
+    seed: int | None = None
+
+    def apply(self, data: bytes, rng: random.Random) -> bytes:
+        """Inject faults in a response
+
+        Args:
+            data (bytes): Response of the board
+            rng (random.Random): Random generator of the link
+
+        Returns:
+            bytes: The response with at most a flipped bit and a missing byte
+        """
+        if not data or not (self.corrupt_rate or self.drop_rate):
+            return data
+
+        faulty = bytearray(data)
+        if rng.random() < self.corrupt_rate:
+            faulty[rng.randrange(len(faulty))] ^= 1 << rng.randrange(8)
+        if rng.random() < self.drop_rate:
+            del faulty[rng.randrange(len(faulty))]
+
+        return bytes(faulty)
+
+class EmulatedSerial:
+    """
+    This class exposes an emulated board through the subset of the serial.Serial interface used by the library,
+    in the spirit of pyserial's loop:// ports. Without latency every response is available as soon as
+    the command is written, so the board runs as fast as the host code.
+    """
+
+    def __init__(self, device: EmulatedDevice, profile: LinkProfile | None = None, timeout: float | None = 1.0):
+        """
+        Args:
+            device (EmulatedDevice): The board to talk to
+            profile (LinkProfile | None, optional): Latency and faults of the link, a perfect link if None. Defaults to None.
+            timeout (float | None, optional): Read timeout, same as serial.Serial. Defaults to 1.0.
+        """
+        self.port: str = f'emulated://{type(device).__name__}'
+        self.timeout: float | None = timeout
+        self.is_open: bool = True
+        self._device = device
+        self._profile = profile or LinkProfile()
+        self._rng = random.Random(self._profile.seed)
+        self._rx: bytearray = bytearray()
+        self._pending: Deque[Tuple[float, bytes]] = deque()
+        self._dtr: bool = True
+        self._busy_until: float = 0.0
+
+        self._deliver(device.reset())
+
+    def __enter__(self) -> EmulatedSerial:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def dtr(self) -> bool:
+        return self._dtr
+
+    @dtr.setter
+    def dtr(self, value: bool) -> None:
+        # The board resets on the rising edge
+        if value and not self._dtr:
+            self.reset_input_buffer()
+            self._deliver(self._device.reset())
+        self._dtr = value
+
+    @property
+    def in_waiting(self) -> int:
+        self._collect()
+        return len(self._rx)
+
+    def write(self, data: bytes | bytearray | memoryview) -> int:
+        for delay, response in self._device.process_timed(bytes(data)):
+            self._deliver(response, delay)
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        self._wait_for(lambda: len(self._rx) >= size)
+
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:
+        with memoryview(buffer) as view:
+            self._wait_for(lambda: len(self._rx) >= len(view))
+
+            size = min(len(view), len(self._rx))
+            view[:size] = self._rx[:size]
+            del self._rx[:size]
+            return size
+
+    def readline(self, size: int = -1) -> bytes:
+        def line_ready() -> bool:
+            return b'\n' in self._rx or 0 <= size <= len(self._rx)
+
+        self._wait_for(line_ready)
+
+        line_end = self._rx.find(b'\n') + 1 or len(self._rx)
+        if size >= 0:
+            line_end = min(line_end, size)
+
+        data = bytes(self._rx[:line_end])
+        del self._rx[:line_end]
+        return data
+
+    def reset_input_buffer(self) -> None:
+        self._rx.clear()
+        self._pending.clear()
+
+    def reset_output_buffer(self) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.is_open = False
+
+    def _deliver(self, data: bytes, delay: float = 0.0) -> None:
+        data = self._profile.apply(data, self._rng)
+
+        if delay > 0 or self._profile.latency > 0 or self._pending:
+            # The board executes one command at a time, then the response travels on the link
+            self._busy_until = max(time.perf_counter(), self._busy_until) + delay
+            self._pending.append((self._busy_until + self._profile.latency, data))
+        elif data:
+            self._rx.extend(data)
+
+    def _collect(self) -> None:
+        now = time.perf_counter()
+        while self._pending and self._pending[0][0] <= now:
+            self._rx.extend(self._pending.popleft()[1])
+
+    def _wait_for(self, condition) -> None:
+        deadline: float | None = None if self.timeout is None else time.perf_counter() + self.timeout
+
+        self._collect()
+        while not condition() and self._pending:
+            wait_time: float = self._pending[0][0] - time.perf_counter()
+            if deadline is not None:
+                wait_time = min(wait_time, deadline - time.perf_counter())
+                if wait_time < 0:
+                    break
+
+            time.sleep(max(0.0, wait_time))
+            self._collect()
+
+class PtyServer:
+    """
+    This class serves an emulated board on a pseudo-terminal, so it can be opened as a serial port by any process.
+
+    Opening and closing the port are detected on the master side: every time the port is opened
+    the board is reset and sends whatever it announces on connection.
+    """
+
+    _POLL_INTERVAL: float = 0.01
+    _READ_SIZE: int = 4096
+
+    def __init__(self, device: EmulatedDevice, profile: LinkProfile | None = None, banner_delay: float = 0.05):
+        """
+        Args:
+            device (EmulatedDevice): The board to serve
+            profile (LinkProfile | None, optional): Latency and faults of the link, a perfect link if None. Defaults to None.
+            banner_delay (float, optional): Time between the opening of the port and the reset of the board, leaving the host time to flush its buffers. Defaults to 0.05.
+        """
+        self._device = device
+        self._profile = profile or LinkProfile()
+        self._rng = random.Random(self._profile.seed)
+        self._banner_delay = banner_delay
+        self._master, slave = os.openpty()
+        self.port: str = os.ttyname(slave)
+        # Without open slave descriptors, the master reports a hangup until the port is opened
+        os.close(slave)
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True, name=f'PtyServer {self.port}')
+        self._thread.start()
+
+    def __enter__(self) -> PtyServer:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        os.close(self._master)
+
+    def _serve(self) -> None:
+        poller = select.poll()
+        poller.register(self._master, select.POLLIN)
+        connected: bool = False
+
+        while not self._stop.is_set():
+            events: int = 0
+            for _, event in poller.poll(int(self._POLL_INTERVAL * 1000)):
+                events |= event
+
+            if events & select.POLLHUP:
+                if connected:
+                    _LOGGER.debug(f'Port {self.port} closed')
+                    connected = False
+                time.sleep(self._POLL_INTERVAL)
+                continue
+
+            if not connected:
+                _LOGGER.debug(f'Port {self.port} opened')
+                connected = True
+                time.sleep(self._banner_delay)
+                self._send(self._device.reset())
+
+            if events & select.POLLIN:
+                try:
+                    data = os.read(self._master, self._READ_SIZE)
+                except OSError:
+                    continue
+
+                for delay, response in self._device.process_timed(data):
+                    time.sleep(delay)
+                    self._send(response)
+
+    def _send(self, data: bytes) -> None:
+        if not data:
+            return
+
+        if self._profile.latency > 0:
+            time.sleep(self._profile.latency)
+
+        with memoryview(self._profile.apply(data, self._rng)) as view:
+            written: int = 0
+            while written < len(view):
+                try:
+                    written += os.write(self._master, view[written:])
+                except OSError as exc:
+                    _LOGGER.debug(f'Unable to write to port {self.port}: {exc}')
+                    return
@@ -0,0 +1,211 @@
+"""This module contains a software emulator of the dupico M3 binary protocol"""
+
+from __future__ import annotations
+
+import logging
+import struct
+from typing import Dict, Iterator
+
+from dupicolib.board_interfaces.command_structures import CommandTokens
+from dupicolib.board_interfaces.m3_board_commands import CommandCode
+from dupicolib.board_interfaces.special_modes.cxfer import CXFERTransfer
+from dupicolib.board_utilities import BoardUtilities
+from dupicolib.emulators.link import EmulatedDevice
+from dupicolib.emulators.virtual_chips import VirtualChip
+from dupicolib.hardware_board_commands import CommandCode as BaseCommandCode
+from dupicolib.pin_mapper import PinMapper
+
+_LOGGER = logging.getLogger(__name__)
+
+_PIN_MASK: int = 0xFFFFFFFFFFFFFFFF
+
+# Bit indexes on the board, used to scatter and gather values through the CXFER shift maps
+_INDEX_MAP: Dict[int, int] = {idx: idx for idx in range(64)}
+
+# Size of every command, including the checksum
+_COMMAND_SIZES: Dict[int, int] = {
+    CommandCode.WRITE.value: 10,
+    CommandCode.READ.value: 2,
+    CommandCode.POWER.value: 3,
+    CommandCode.TEST.value: 2,
+    CommandCode.OSC_DET.value: 3,
+    CommandCode.CXFER.value: 19,
+    BaseCommandCode.MODEL.value: 2,
+    BaseCommandCode.VERSION.value: 2,
+}
+
+class M3Emulator(EmulatedDevice):
+    """
+    This class emulates the binary protocol of a dupico M3: pin access, power, self-test, oscillation
+    detection, model and version, and CXFER transfers with their configuration and acknowledge handshake.
+
+    The oscillation detection and self-test results are taken from the virtual chip and the constructor.
+    Malformed commands are dropped without a response, and so are commands with a wrong checksum.
+    """
+
+    MODEL: int = 3
+
+    def __init__(self, chip: VirtualChip, version: str = '0.1.0', test_result: bool = True):
+        """
+        Args:
+            chip (VirtualChip): IC plugged in the socket
+            version (str, optional): Firmware version reported by the board. Defaults to '0.1.0'.
+            test_result (bool, optional): Result of the self-test. Defaults to True.
+        """
+        self.chip = chip
+        self.version = version
+        self.test_result = test_result
+
+        self.pins: int = 0
+        self.power: bool = False
+        self._rx: bytearray = bytearray()
+        self._blocks: Iterator[bytes] | None = None
+        self._expected_ack: bytes = b''
+        self._clear_cxfer()
+
+    def reset(self) -> bytes:
+        self.pins = 0
+        self.power = False
+        self._rx.clear()
+        self._blocks = None
+        self._clear_cxfer()
+
+        return f'{CommandTokens.BOARD_ENABLED.value}\r\n'.encode('ASCII')
+
+    def process(self, data: bytes) -> bytes:
+        self._rx.extend(data)
+        response: bytearray = bytearray()
+
+        while self._rx:
+            if self._blocks is not None:
+                if len(self._rx) < CXFERTransfer._XFER_CHECKSUM_SIZE:
+                    break
+
+                if self._rx[:CXFERTransfer._XFER_CHECKSUM_SIZE] != self._expected_ack:
+                    # The host gave up on the transfer, what we received must be a new command
+                    _LOGGER.debug('Wrong acknowledge, aborting the transfer')
+                    self._blocks = None
+                    continue
+
+                del self._rx[:CXFERTransfer._XFER_CHECKSUM_SIZE]
+                response += self._next_block()
+                continue
+
+            if (command_size := _COMMAND_SIZES.get(self._rx[0])) is None:
+                _LOGGER.debug(f'Unknown command {self._rx[0]:02X}, dropping the input')
+                self._rx.clear()
+                break
+
+            if len(self._rx) < command_size:
+                break
+
+            command: bytes = bytes(self._rx[:command_size])
+            del self._rx[:command_size]
+
+            if BoardUtilities.command_checksum_calculator(command):
+                _LOGGER.debug(f'Wrong checksum for command {command.hex()}')
+                continue
+
+            response += self._execute(command[:-1])
+
+        return bytes(response)
+
+    def _execute(self, command: bytes) -> bytes:
+        code: int = command[0]
+
+        if code == CommandCode.WRITE.value:
+            self.pins, = struct.unpack_from('<Q', command, 1)
+            return self._response(code, struct.pack('<Q', self.chip.respond(self.pins) & _PIN_MASK))
+        elif code == CommandCode.READ.value:
+            return self._response(code, struct.pack('<Q', self.chip.respond(self.pins) & _PIN_MASK))
+        elif code == CommandCode.POWER.value:
+            self.power = command[1] != 0
+            return self._response(code, bytes([1 if self.power else 0]))
+        elif code == CommandCode.TEST.value:
+            return self._response(code, bytes([1 if self.test_result else 0]))
+        elif code == CommandCode.OSC_DET.value:
+            return self._response(code, struct.pack('<Q', self.chip.oscillating_pins & _PIN_MASK))
+        elif code == BaseCommandCode.MODEL.value:
+            return self._response(code, bytes([self.MODEL]))
+        elif code == BaseCommandCode.VERSION.value:
+            return self._response(code, self.version.encode('ASCII')[:10].ljust(10, b'\x00'))
+        else:
+            return self._cxfer(command)
+
+    def _cxfer(self, command: bytes) -> bytes:
+        sub_command: int = command[1]
+        params: bytes = command[2:]
+
+        if sub_command == CXFERTransfer.CXFERSubCommand.EXECUTE_READ.value:
+            self._blocks = self._iter_transfer()
+            return self._next_block()
+
+        if sub_command == CXFERTransfer.CXFERSubCommand.CLEAR.value:
+            self._clear_cxfer()
+        elif CXFERTransfer.CXFERSubCommand.SET_ADDR_MAP_0.value <= sub_command <= CXFERTransfer.CXFERSubCommand.SET_ADDR_MAP_3.value:
+            start = (sub_command - CXFERTransfer.CXFERSubCommand.SET_ADDR_MAP_0.value) * 16
+            self._address_map[start:start + 16] = params
+        elif CXFERTransfer.CXFERSubCommand.SET_DATA_MAP_0.value <= sub_command <= CXFERTransfer.CXFERSubCommand.SET_DATA_MAP_3.value:
+            start = (sub_command - CXFERTransfer.CXFERSubCommand.SET_DATA_MAP_0.value) * 16
+            self._data_map[start:start + 16] = params
+        elif sub_command == CXFERTransfer.CXFERSubCommand.SET_HI_OUT_MASK.value:
+            self._hi_mask, = struct.unpack_from('<Q', params)
+        elif sub_command == CXFERTransfer.CXFERSubCommand.SET_DATA_MASK.value:
+            self._data_mask, = struct.unpack_from('<Q', params)
+        elif sub_command == CXFERTransfer.CXFERSubCommand.SET_ADDR_WIDTH.value:
+            self._address_width = params[0]
+        elif sub_command == CXFERTransfer.CXFERSubCommand.SET_DATA_WIDTH.value:
+            self._data_width = params[0]
+        else:
+            _LOGGER.debug(f'Unknown CXFER subcommand {sub_command:02X}')
+            return b''
+
+        return self._response(command[0], bytes([1]))
+
+    def _clear_cxfer(self) -> None:
+        self._address_map: bytearray = bytearray(64)
+        self._data_map: bytearray = bytearray(64)
+        self._hi_mask: int = 0
+        self._data_mask: int = 0
+        self._address_width: int = 0
+        self._data_width: int = 0
+
+    def _transfer_data(self) -> bytes:
+        address_map: bytes = bytes(self._address_map[:self._address_width])
+        data_map: bytes = bytes(self._data_map[:self._data_width])
+
+        if (data := self.chip.cxfer_image(address_map, data_map, self._hi_mask)) is not None:
+            return data
+
+        word_size: int = -(self._data_width // -8)
+        address_mapper = PinMapper(_INDEX_MAP, address_map)
+        data_mapper = PinMapper(_INDEX_MAP, data_map)
+
+        return b''.join(data_mapper.map_pins_to_value(self.chip.respond(self._hi_mask | address_mapper.map_value_to_pins(address))).to_bytes(word_size, 'little')
+                        for address in range(1 << self._address_width))
+
+    def _iter_transfer(self) -> Iterator[bytes]:
+        data: bytes = self._transfer_data()
+        block_size: int = CXFERTransfer._XMIT_BLOCK_SIZE
+
+        for offset in range(0, len(data), block_size):
+            # The last block is padded to the full size
+            block: bytes = data[offset:offset + block_size].ljust(block_size, b'\x00')
+            self._expected_ack = struct.pack('<H', BoardUtilities.cxfer_checksum_calculator(block))
+            yield struct.pack('>I', CXFERTransfer.CXFERResponse.XFER_PKT_START.value) + block + self._expected_ack
+
+        yield struct.pack('>I', CXFERTransfer.CXFERResponse.XFER_DONE.value) + self._response(CommandCode.CXFER.value, bytes([1]))
+
+    def _next_block(self) -> bytes:
+        assert self._blocks is not None
+
+        block: bytes = next(self._blocks)
+        if block[:CXFERTransfer._XFER_RESPONSE_SIZE] == struct.pack('>I', CXFERTransfer.CXFERResponse.XFER_DONE.value):
+            self._blocks = None
+
+        return block
+
+    @staticmethod
+    def _response(code: int, payload: bytes) -> bytes:
+        response: bytes = bytes([code | BoardUtilities.BINARY_COMMAND_RESPONSE_FLAG, *payload])
+        return response + bytes([BoardUtilities.command_checksum_calculator(response)])
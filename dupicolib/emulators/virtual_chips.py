@@ -0,0 +1,87 @@
+"""This module contains models of the ICs plugged in the socket of the emulated boards"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Dict
+
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+from dupicolib.pin_mapper import PinMapper
+
+_PIN_MASK: int = 0xFFFFFFFFFFFFFFFF
+
+class VirtualChip:
+    """
+    This class sets the shape of an IC plugged in the socket of an emulated board.
+    Pins are handled as bit indexes on the board, as in the values sent with WRITE.
+    """
+
+    oscillating_pins: int = 0
+
+    def respond(self, pins: int) -> int:
+        """Return the state of all the pins, given the pins driven by the board
+
+        Args:
+            pins (int): Pins driven high by the board
+
+        Returns:
+            int: State of the pins read back by the board
+        """
+        raise NotImplementedError()
+
+    def cxfer_image(self, address_map: Sequence[int], data_map: Sequence[int], hi_mask: int) -> bytes | None:
+        """Optionally return the result of a whole CXFER transfer in one go, instead of going through respond for every address
+
+        Args:
+            address_map (Sequence[int]): Bit index of every address line, starting from A0
+            data_map (Sequence[int]): Bit index of every data line, starting from D0
+            hi_mask (int): Pins kept high during the transfer
+
+        Returns:
+            bytes | None: The data of the transfer, or None if it must be computed address by address
+        """
+        return None
+
+class VirtualROM(VirtualChip):
+    """A ROM with its outputs always enabled. Multi-byte words are stored little-endian in the image."""
+
+    def __init__(self, image: bytes, address_pins: Sequence[int], data_pins: Sequence[int], pin_map: Dict[int, int] | None = None):
+        """
+        Args:
+            image (bytes): Content of the ROM, addresses not covered by the image read as all ones
+            address_pins (Sequence[int]): Socket pins of the address lines, starting from A0
+            data_pins (Sequence[int]): Socket pins of the data lines, starting from D0
+            pin_map (Dict[int, int] | None, optional): Mapping of socket pins to bit indexes, the dupico one if None. Defaults to None.
+        """
+        pin_map = pin_map if pin_map is not None else M3BoardCommands._PIN_NUMBER_TO_INDEX_MAP
+
+        self.image: bytes = bytes(image)
+        self.address_indexes: tuple[int, ...] = tuple(pin_map[pin] for pin in address_pins)
+        self.data_indexes: tuple[int, ...] = tuple(pin_map[pin] for pin in data_pins)
+        self.word_size: int = -(len(self.data_indexes) // -8)
+
+        self._address_mapper = PinMapper(pin_map, address_pins)
+        self._data_mapper = PinMapper(pin_map, data_pins)
+        self._data_mask: int = self._data_mapper.map_value_to_pins(_PIN_MASK)
+        self._blank_word: bytes = bytes([0xFF] * self.word_size)
+
+    def respond(self, pins: int) -> int:
+        address: int = self._address_mapper.map_pins_to_value(pins)
+        word: bytes = self.image[address * self.word_size:(address + 1) * self.word_size] or self._blank_word
+
+        return (pins & ~self._data_mask) | self._data_mapper.map_value_to_pins(int.from_bytes(word, 'little'))
+
+    def cxfer_image(self, address_map: Sequence[int], data_map: Sequence[int], hi_mask: int) -> bytes | None:
+        # The transfer follows the wiring of the ROM: the hi pins on the upper address lines select a window of the image
+        width: int = len(address_map)
+        if tuple(address_map) != self.address_indexes[:width] or tuple(data_map) != self.data_indexes:
+            return None
+
+        if any(hi_mask & (1 << idx) for idx in self.address_indexes[:width]):
+            return None
+
+        start: int = self._address_mapper.map_pins_to_value(hi_mask) * self.word_size
+        size: int = (1 << width) * self.word_size
+        data: bytes = self.image[start:start + size]
+
+        return data + bytes([0xFF] * (size - len(data)))
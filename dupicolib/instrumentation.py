@@ -0,0 +1,195 @@
+"""This module contains the optional instrumentation of the board communication hot paths.
+
+Instrumentation is disabled by default: the hot paths only check whether `active` is None.
+Once enabled, a Metrics instance collects round-trip latencies, traffic, CXFER throughput and errors,
+and can forward every observation to a callback or be exported as JSON or Prometheus text.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Callable, Sequence
+import json
+import threading
+from typing import final
+
+# Upper bounds of the latency buckets, in seconds
+_LATENCY_BUCKETS: tuple[float, ...] = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+@final
+class Histogram:
+    """A cumulative histogram with fixed buckets, as used by Prometheus"""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets: Sequence[float] = _LATENCY_BUCKETS):
+        self.buckets: tuple[float, ...] = tuple(buckets)
+        self.counts: list[int] = [0] * (len(self.buckets) + 1) # The last one is +Inf
+        self.count: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self) -> dict:
+        cumulative: list[int] = []
+        total: int = 0
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+
+        return {
+            'buckets': {**{str(bound): cnt for bound, cnt in zip(self.buckets, cumulative)}, '+Inf': cumulative[-1]},
+            'count': self.count,
+            'sum': self.sum,
+        }
+
+@final
+class Metrics:
+    """
+    This class collects the metrics of the board communication. It's thread safe, so a single
+    instance can be shared by all the boards of a pool.
+    """
+
+    def __init__(self, callback: Callable[[str, str, float], None] | None = None):
+        """
+        Args:
+            callback (Callable[[str, str, float], None] | None, optional): Receives every observation as (metric, label, value), from the thread doing the I/O. Defaults to None.
+        """
+        self._callback = callback
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.latency: dict[str, Histogram] = {}
+            self.bytes_out: int = 0
+            self.bytes_in: int = 0
+            self.cxfer_blocks: int = 0
+            self.cxfer_bytes: int = 0
+            self.cxfer_time: float = 0.0
+            self.checksum_errors: int = 0
+            self.response_errors: int = 0
+            self.buffer_resets: int = 0
+
+    def observe_command(self, command: str, elapsed: float, bytes_out: int, bytes_in: int) -> None:
+        """Record a command round trip
+
+        Args:
+            command (str): Name of the command, 'binary_burst' or 'text_burst' for pipelined dupico or Brutus28 commands
+            elapsed (float): Time from the write to the complete response, in seconds
+            bytes_out (int): Bytes sent
+            bytes_in (int): Bytes received
+        """
+        with self._lock:
+            if (histogram := self.latency.get(command)) is None:
+                histogram = self.latency[command] = Histogram()
+            histogram.observe(elapsed)
+            self.bytes_out += bytes_out
+            self.bytes_in += bytes_in
+
+        if self._callback is not None:
+            self._callback('command_latency_seconds', command, elapsed)
+
+    def observe_cxfer_block(self, size: int, elapsed: float) -> None:
+        """Record a verified CXFER block
+
+        Args:
+            size (int): Size of the block, including header and checksum
+            elapsed (float): Time spent receiving the block, in seconds
+        """
+        with self._lock:
+            self.cxfer_blocks += 1
+            self.cxfer_bytes += size
+            self.cxfer_time += elapsed
+            self.bytes_in += size
+
+        if self._callback is not None:
+            self._callback('cxfer_block_seconds', '', elapsed)
+
+    def count_error(self, kind: str) -> None:
+        """Count an error
+
+        Args:
+            kind (str): One of 'checksum', 'response' or 'buffer_reset'
+        """
+        with self._lock:
+            if kind == 'checksum':
+                self.checksum_errors += 1
+            elif kind == 'buffer_reset':
+                self.buffer_resets += 1
+            else:
+                self.response_errors += 1
+
+        if self._callback is not None:
+            self._callback('errors_total', kind, 1)
+
+    @property
+    def cxfer_bytes_per_second(self) -> float:
+        return self.cxfer_bytes / self.cxfer_time if self.cxfer_time > 0 else 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'command_latency_seconds': {command: histogram.to_dict() for command, histogram in self.latency.items()},
+                'bytes_out': self.bytes_out,
+                'bytes_in': self.bytes_in,
+                'cxfer_blocks': self.cxfer_blocks,
+                'cxfer_bytes': self.cxfer_bytes,
+                'cxfer_bytes_per_second': self.cxfer_bytes_per_second,
+                'checksum_errors': self.checksum_errors,
+                'response_errors': self.response_errors,
+                'buffer_resets': self.buffer_resets,
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix: str = 'dupicolib') -> str:
+        """Export the metrics in the Prometheus text exposition format
+
+        Args:
+            prefix (str, optional): Prefix of every metric name. Defaults to 'dupicolib'.
+
+        Returns:
+            str: The metrics, one sample per line
+        """
+        snapshot = self.snapshot()
+        lines: list[str] = [f'# TYPE {prefix}_command_latency_seconds histogram']
+
+        for command, histogram in snapshot['command_latency_seconds'].items():
+            for bound, count in histogram['buckets'].items():
+                lines.append(f'{prefix}_command_latency_seconds_bucket{{command="{command}",le="{bound}"}} {count}')
+            lines.append(f'{prefix}_command_latency_seconds_sum{{command="{command}"}} {histogram["sum"]}')
+            lines.append(f'{prefix}_command_latency_seconds_count{{command="{command}"}} {histogram["count"]}')
+
+        for name in ('bytes_out', 'bytes_in', 'cxfer_blocks', 'cxfer_bytes', 'checksum_errors', 'response_errors', 'buffer_resets'):
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines.append(f'{prefix}_{name}_total {snapshot[name]}')
+
+        lines.append(f'# TYPE {prefix}_cxfer_bytes_per_second gauge')
+        lines.append(f'{prefix}_cxfer_bytes_per_second {snapshot["cxfer_bytes_per_second"]}')
+
+        return '\n'.join(lines) + '\n'
+
+# The metrics currently collected, None when instrumentation is disabled
+active: Metrics | None = None
+
+def enable(metrics: Metrics | None = None) -> Metrics:
+    """Enable instrumentation
+
+    Args:
+        metrics (Metrics | None, optional): Collector to use, a new one if None. Defaults to None.
+
+    Returns:
+        Metrics: The active collector
+    """
+    global active
+    active = metrics or Metrics()
+    return active
+
+def disable() -> None:
+    global active
+    active = None
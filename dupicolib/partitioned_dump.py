@@ -0,0 +1,176 @@
+"""This module contains code to split the dump of an IC into multiple CXFER transfers"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Type, final
+
+import serial
+
+from dupicolib.board_commands_interface import BoardCommandsInterface
+from dupicolib.board_pool import BoardPool, DumpJob, DumpScheduler
+
+@dataclass
+class DumpPartition:
+    """A slice of the address space, dumped as a standalone transfer"""
+    index: int
+    address_pins: list[int]
+    hi_pins: list[int]
+    offset: int
+    size: int
+
+@final
+class PartitionedDump:
+    """
+    This class splits the address space of an IC in 2^K partitions by fixing the top K address lines:
+    lines that are set in the partition index are added to the hi pins, and all of them are
+    removed from the address pins. Every partition is then read with its own CXFER transfer.
+
+    The hi pins are the whole output level of the transfer, on the dupico as on the Brutus28:
+    every output pin that is not in the list is written low. Hi pins cannot overlap the address
+    lines, so top address lines that are not set in the partition index are driven low by the transfer itself.
+    """
+
+    def __init__(self, address_pins: list[int], data_pins: list[int], hi_pins: list[int], partition_bits: int, partitions: Iterable[int] | None = None):
+        """
+        Args:
+            address_pins (list[int]): List of the pins composing the address, in order, starting from A0
+            data_pins (list[int]): List of the pins composing the data, in order, starting from D0
+            hi_pins (list[int]): List of the pins that must be always set to a high logic level during the transfer
+            partition_bits (int): Number of top address lines fixed for every partition
+            partitions (Iterable[int] | None, optional): Indexes of the partitions to dump, all of them if None. Defaults to None.
+
+        Raises:
+            ValueError: If the number of partition bits or the partition indexes are not valid, or an address line is also a hi pin
+        """
+        if not 0 <= partition_bits <= len(address_pins):
+            raise ValueError(f'Cannot partition {len(address_pins)} address lines using {partition_bits} bits')
+
+        if overlapping := set(address_pins) & set(hi_pins):
+            raise ValueError(f'Address lines {sorted(overlapping)} cannot also be hi pins')
+
+        self._data_pins: list[int] = list(data_pins)
+        self._partition_bits: int = partition_bits
+
+        low_address_pins: list[int] = address_pins[:len(address_pins) - partition_bits]
+        top_address_pins: list[int] = address_pins[len(address_pins) - partition_bits:]
+        partition_size: int = BoardCommandsInterface.cxfer_data_size(low_address_pins, data_pins)
+
+        indexes: list[int] = sorted(set(range(1 << partition_bits) if partitions is None else partitions))
+        if any(not 0 <= idx < (1 << partition_bits) for idx in indexes):
+            raise ValueError(f'Partition indexes must be between 0 and {(1 << partition_bits) - 1}')
+
+        self._partitions: list[DumpPartition] = [
+            DumpPartition(idx,
+                          low_address_pins,
+                          list(hi_pins) + [pin for bit, pin in enumerate(top_address_pins) if idx & (1 << bit)],
+                          idx * partition_size,
+                          partition_size)
+            for idx in indexes
+        ]
+
+    @classmethod
+    def for_range(cls, address_pins: list[int], data_pins: list[int], hi_pins: list[int], partition_bits: int, start_address: int, end_address: int) -> PartitionedDump:
+        """Build a dump of only the partitions covering an address range
+
+        Args:
+            address_pins (list[int]): List of the pins composing the address, in order, starting from A0
+            data_pins (list[int]): List of the pins composing the data, in order, starting from D0
+            hi_pins (list[int]): List of the pins that must be always set to a high logic level during the transfer
+            partition_bits (int): Number of top address lines fixed for every partition
+            start_address (int): First address of the range
+            end_address (int): Last address of the range, included
+
+        Returns:
+            PartitionedDump: A dump of the partitions containing the range
+        """
+        addresses_per_partition: int = 1 << (len(address_pins) - partition_bits)
+
+        return cls(address_pins, data_pins, hi_pins, partition_bits,
+                   range(start_address // addresses_per_partition, end_address // addresses_per_partition + 1))
+
+    @property
+    def partitions(self) -> list[DumpPartition]:
+        return list(self._partitions)
+
+    @property
+    def offset(self) -> int:
+        """Offset in the complete image of the first dumped partition"""
+        return self._partitions[0].offset if self._partitions else 0
+
+    def read(self, command_class: Type[BoardCommandsInterface], ser: serial.Serial, update_callback: Callable[[int], None] | None = None) -> bytearray:
+        """Read the partitions in order, on a single board
+
+        Args:
+            command_class (Type[BoardCommandsInterface]): Command class for the board
+            ser (serial.Serial): Serial port connected to the board
+            update_callback (Callable[[int], None] | None, optional): A callback receiving the number of bytes read. Defaults to None.
+
+        Raises:
+            IOError: If a partition could not be read
+
+        Returns:
+            bytearray: The content of the partitions, stitched in order
+        """
+        file_data: bytearray = bytearray()
+
+        for partition in self._partitions:
+            data = command_class.cxfer_read(partition.address_pins, self._data_pins, partition.hi_pins, None, ser)
+            self._check_partition(partition, data)
+
+            file_data.extend(memoryview(data)[:partition.size]) # type: ignore
+            if update_callback:
+                update_callback(len(file_data))
+
+        return file_data
+
+    def jobs(self, output: Callable[[DumpPartition, bytes], None]) -> list[DumpJob]:
+        """Build a DumpJob for every partition
+
+        Args:
+            output (Callable[[DumpPartition, bytes], None]): Callback receiving every partition with its content
+
+        Returns:
+            list[DumpJob]: The jobs, to be run through a DumpScheduler
+        """
+        return [DumpJob(partition.address_pins, self._data_pins, partition.hi_pins,
+                        lambda data, partition=partition: output(partition, data), # type: ignore
+                        f'partition {partition.index}')
+                for partition in self._partitions]
+
+    def read_parallel(self, pool: BoardPool) -> bytearray:
+        """Read the partitions spreading them across the boards of a pool
+
+        Args:
+            pool (BoardPool): An open pool of boards
+
+        Raises:
+            IOError: If a partition could not be read
+
+        Returns:
+            bytearray: The content of the partitions, stitched in order
+        """
+        file_data: bytearray = bytearray(sum(partition.size for partition in self._partitions))
+        positions: dict[int, int] = {}
+        position: int = 0
+        for partition in self._partitions:
+            positions[partition.index] = position
+            position += partition.size
+
+        def store(partition: DumpPartition, data: bytes) -> None:
+            self._check_partition(partition, data)
+            file_data[positions[partition.index]:positions[partition.index] + partition.size] = memoryview(data)[:partition.size]
+
+        report = DumpScheduler(pool).run(self.jobs(store))
+
+        if failed := [result for result in report.results if result.error is not None]:
+            raise IOError(f'{len(failed)} partitions failed, first error: {failed[0].error}')
+
+        return file_data
+
+    @staticmethod
+    def _check_partition(partition: DumpPartition, data: bytes | None) -> None:
+        # The board might pad the last block of a transfer
+        if data is None or len(data) < partition.size:
+            raise IOError(f'Partition {partition.index} returned {None if data is None else len(data)} bytes, expected {partition.size}')
@@ -0,0 +1,173 @@
+"""This module contains a precompiled mapper between logical values and board pin states"""
+
+from array import array
+from collections.abc import Iterable
+from typing import Any, Dict, Sequence, Tuple, final
+
+try:
+    import numpy as np
+except ImportError: # NumPy is an optional dependency
+    np = None
+
+_SLICE_BITS: int = 8
+_SLICE_MASK: int = (1 << _SLICE_BITS) - 1
+
+@final
+class PinMapper:
+    """
+    This class converts values to pin states (and back) for a fixed list of pins.
+
+    Mapping tables are built once, at construction time: each byte of the source value
+    indexes a 256 entries table that already contains the OR-ed bits for that byte, so mapping
+    a value takes a single table read for every byte containing mapped bits.
+    """
+
+    __slots__ = ('_pins', '_value_tables', '_pin_tables', '_np_value_tables', '_np_pin_tables')
+
+    def __init__(self, pin_map: Dict[int, int], pins: Sequence[int]):
+        """Build the lookup tables for a list of pins
+
+        Args:
+            pin_map (Dict[int, int]): dictionary associating every pin number to its bit index on the board, negative indexes are ignored
+            pins (Sequence[int]): A list of the pins associated to every bit of the value, starting from bit 0
+
+        Raises:
+            KeyError: If one of the pins is not present in the pin map
+        """
+        self._pins: Tuple[int, ...] = tuple(pins)
+
+        positions: list[int] = [pin_map[pin] for pin in self._pins]
+
+        # value bit index -> pin bit index
+        self._value_tables: Tuple[Tuple[int, Tuple[int, ...]], ...] = self._build_tables(
+            [(idx, pos) for idx, pos in enumerate(positions) if pos >= 0]
+        )
+
+        # pin bit index -> value bit index
+        self._pin_tables: Tuple[Tuple[int, Tuple[int, ...]], ...] = self._build_tables(
+            [(pos, idx) for idx, pos in enumerate(positions) if pos >= 0]
+        )
+
+        # NumPy versions of the tables are built only when the array methods are used
+        self._np_value_tables: Tuple[Tuple[Any, Any], ...] | None = None
+        self._np_pin_tables: Tuple[Tuple[Any, Any], ...] | None = None
+
+    @staticmethod
+    def _build_tables(bit_pairs: list[Tuple[int, int]]) -> Tuple[Tuple[int, Tuple[int, ...]], ...]:
+        """Build a lookup table for every byte of the source value that contains at least a mapped bit
+
+        Args:
+            bit_pairs (list[Tuple[int, int]]): list of (source bit index, destination bit index) pairs
+
+        Returns:
+            Tuple[Tuple[int, Tuple[int, ...]], ...]: A tuple of (source shift, table) pairs
+        """
+        contributions: Dict[int, list[int]] = {}
+
+        for src_bit, dst_bit in bit_pairs:
+            slice_bits: list[int] = contributions.setdefault(src_bit // _SLICE_BITS, [0] * _SLICE_BITS)
+            slice_bits[src_bit % _SLICE_BITS] |= 1 << dst_bit
+
+        tables: list[Tuple[int, Tuple[int, ...]]] = []
+        for slice_idx in sorted(contributions):
+            slice_bits = contributions[slice_idx]
+            table: list[int] = [0] * (_SLICE_MASK + 1)
+
+            # Every entry is the entry with its lowest set bit cleared, plus the contribution of that bit
+            for entry in range(1, _SLICE_MASK + 1):
+                lowest_bit: int = (entry & -entry).bit_length() - 1
+                table[entry] = table[entry & (entry - 1)] | slice_bits[lowest_bit]
+
+            tables.append((slice_idx * _SLICE_BITS, tuple(table)))
+
+        return tuple(tables)
+
+    @property
+    def pins(self) -> Tuple[int, ...]:
+        return self._pins
+
+    def map_value_to_pins(self, value: int) -> int:
+        """Convert a value into the pin state that sets it on the mapped pins
+
+        Args:
+            value (int): The value to map to the pins
+
+        Returns:
+            int: A value that can be used by the board to address and change the selected pins
+        """
+        ret_val: int = 0
+
+        for shift, table in self._value_tables:
+            ret_val |= table[(value >> shift) & _SLICE_MASK]
+
+        return ret_val
+
+    def map_pins_to_value(self, value: int) -> int:
+        """Convert a pin state read from the board into the value composed by the mapped pins
+
+        Args:
+            value (int): the value representing the pin state
+
+        Returns:
+            int: the actual number that those pins are forming
+        """
+        ret_val: int = 0
+
+        for shift, table in self._pin_tables:
+            ret_val |= table[(value >> shift) & _SLICE_MASK]
+
+        return ret_val
+
+    def map_values_to_pins_array(self, values: Iterable[int]) -> Any:
+        """Convert many values at once into pin states, see map_value_to_pins.
+        If NumPy is available the conversion is vectorized.
+
+        Args:
+            values (Iterable[int]): The values to map to the pins, ideally a numpy.ndarray of uint64
+
+        Returns:
+            numpy.ndarray | array: An uint64 numpy.ndarray with the pin states, or an array('Q') if NumPy is not installed
+        """
+        if np is None:
+            return array('Q', map(self.map_value_to_pins, values))
+
+        if self._np_value_tables is None:
+            self._np_value_tables = self._to_np_tables(self._value_tables)
+
+        return self._map_array(self._np_value_tables, values)
+
+    def map_pins_to_values_array(self, values: Iterable[int]) -> Any:
+        """Convert many pin states at once into the values formed by the pins, see map_pins_to_value.
+        If NumPy is available the conversion is vectorized.
+
+        Args:
+            values (Iterable[int]): The pin states, ideally a numpy.ndarray of uint64
+
+        Returns:
+            numpy.ndarray | array: An uint64 numpy.ndarray with the values, or an array('Q') if NumPy is not installed
+        """
+        if np is None:
+            return array('Q', map(self.map_pins_to_value, values))
+
+        if self._np_pin_tables is None:
+            self._np_pin_tables = self._to_np_tables(self._pin_tables)
+
+        return self._map_array(self._np_pin_tables, values)
+
+    @staticmethod
+    def _to_np_tables(tables: Tuple[Tuple[int, Tuple[int, ...]], ...]) -> Tuple[Tuple[Any, Any], ...]:
+        return tuple((np.uint64(shift), np.array(table, dtype=np.uint64)) for shift, table in tables)
+
+    @staticmethod
+    def _map_array(np_tables: Tuple[Tuple[Any, Any], ...], values: Iterable[int]) -> Any:
+        src = values if isinstance(values, np.ndarray) else np.fromiter(values, dtype=np.uint64)
+        src = src.astype(np.uint64, copy=False)
+
+        ret_val = np.zeros(src.shape, dtype=np.uint64)
+        slice_mask = np.uint64(_SLICE_MASK)
+
+        # Every table read is a vectorized gather over the whole array
+        for shift, table in np_tables:
+            ret_val |= table[(src >> shift) & slice_mask]
+
+        return ret_val
@@ -0,0 +1,174 @@
+"""This module contains the multi-pass dump of marginal ICs, comparing every pass against the first one while it's being received"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+from typing import Type, final
+
+import serial
+
+from dupicolib.board_commands_interface import BoardCommandsInterface
+from dupicolib.dump_sinks import DumpSink
+
+try:
+    import numpy as np
+except ImportError: # NumPy is an optional dependency
+    np = None
+
+_LOGGER = logging.getLogger(__name__)
+
+@dataclass
+class StabilityReport:
+    """Outcome of a multi-pass dump. Bits set in the mask flipped in at least one pass."""
+    reference: bytes
+    mask: bytearray
+    data_width: int
+    passes: int
+    differing_passes: int
+
+    @property
+    def stable(self) -> bool:
+        return self.differing_passes == 0
+
+    def unstable_bits(self) -> dict[int, int]:
+        """Offsets of the bytes that changed across the passes
+
+        Returns:
+            dict[int, int]: The mask of the unstable bits of every unstable byte, by offset
+        """
+        if np is not None:
+            offsets = np.flatnonzero(np.frombuffer(self.mask, dtype=np.uint8))
+            return {int(offset): self.mask[offset] for offset in offsets}
+
+        return {offset: bits for offset, bits in enumerate(self.mask) if bits}
+
+    def unstable_addresses(self) -> list[int]:
+        """Addresses of the IC with at least one unstable data line"""
+        return sorted({offset // self.data_width for offset in self.unstable_bits()})
+
+@final
+class PassComparator(DumpSink):
+    """
+    This class receives a dump pass and compares it, block by block, against a reference image,
+    accumulating the bits that differ into a mask. Only the mask is kept, never the data of the pass.
+    With NumPy the comparison is vectorized, otherwise every block is compared as a single big integer.
+    """
+
+    def __init__(self, reference: bytes | bytearray, mask: bytearray | None = None):
+        """
+        Args:
+            reference (bytes | bytearray): Image the passes are compared against
+            mask (bytearray | None, optional): Mask to accumulate the differences into, a new empty one if None. Defaults to None.
+        """
+        super().__init__()
+        self.reference = reference
+        self.mask: bytearray = mask if mask is not None else bytearray(len(reference))
+        self.differs: bool = False
+
+        if len(self.mask) != len(reference):
+            raise ValueError(f'Mask of {len(self.mask)} bytes for a reference of {len(reference)} bytes')
+
+    def start_pass(self) -> None:
+        """Prepare to receive another pass, keeping the mask"""
+        self.written = 0
+        self.differs = False
+
+    def write(self, data: bytes | bytearray | memoryview) -> None:
+        start: int = self.written
+        end: int = start + len(data)
+        if end > len(self.reference):
+            raise IOError(f'Received {end} bytes for a reference of {len(self.reference)} bytes')
+
+        if np is not None:
+            diff = np.frombuffer(data, dtype=np.uint8) ^ np.frombuffer(self.reference, dtype=np.uint8, count=end - start, offset=start)
+            if diff.any():
+                mask = np.frombuffer(self.mask, dtype=np.uint8, count=end - start, offset=start)
+                mask |= diff
+                self.differs = True
+        elif diff_value := int.from_bytes(data, 'little') ^ int.from_bytes(memoryview(self.reference)[start:end], 'little'):
+            self.mask[start:end] = (int.from_bytes(memoryview(self.mask)[start:end], 'little') | diff_value).to_bytes(end - start, 'little')
+            self.differs = True
+
+        self.written = end
+
+@final
+class MultiPassDump:
+    """
+    This class dumps an IC several times, to find data lines that do not read the same on every pass, as on marginal EPROMs.
+
+    The first pass is kept as the reference, every following pass is streamed through a PassComparator,
+    so the memory used is the one of a single image plus the mask. The dump stops early once enough
+    consecutive passes have matched the reference exactly.
+    """
+
+    def __init__(self, address_pins: list[int], data_pins: list[int], hi_pins: list[int], max_passes: int = 5, agreeing_passes: int = 3):
+        """
+        Args:
+            address_pins (list[int]): List of the pins composing the address, in order, starting from A0
+            data_pins (list[int]): List of the pins composing the data, in order, starting from D0
+            hi_pins (list[int]): List of the pins that must be always set to a high logic level during the transfer
+            max_passes (int, optional): Maximum number of passes, the reference included. Defaults to 5.
+            agreeing_passes (int, optional): Stop once this many consecutive passes, the reference included, are identical. Defaults to 3.
+
+        Raises:
+            ValueError: If the number of passes is not valid
+        """
+        if not 1 <= agreeing_passes <= max_passes:
+            raise ValueError(f'Cannot stop after {agreeing_passes} agreeing passes out of {max_passes}')
+
+        self._address_pins: list[int] = list(address_pins)
+        self._data_pins: list[int] = list(data_pins)
+        self._hi_pins: list[int] = list(hi_pins)
+        self.max_passes: int = max_passes
+        self.agreeing_passes: int = agreeing_passes
+
+    def read(self, command_class: Type[BoardCommandsInterface], ser: serial.Serial, update_callback: Callable[[int, int], None] | None = None) -> StabilityReport:
+        """Dump the IC until enough passes agree, or the maximum number of passes is reached
+
+        Args:
+            command_class (Type[BoardCommandsInterface]): Command class for the board
+            ser (serial.Serial): Serial port connected to the board
+            update_callback (Callable[[int, int], None] | None, optional): A callback receiving the pass number, starting from 0, and the bytes read in the pass. Defaults to None.
+
+        Raises:
+            IOError: If a pass could not be read, or was incomplete
+
+        Returns:
+            StabilityReport: The reference image and the unstable bits
+        """
+        size: int = command_class.cxfer_data_size(self._address_pins, self._data_pins)
+
+        data = command_class.cxfer_read(self._address_pins, self._data_pins, self._hi_pins, (lambda read: update_callback(0, read)) if update_callback else None, ser)
+        if data is None or len(data) < size:
+            raise IOError(f'Reference pass returned {None if data is None else len(data)} bytes, expected {size}')
+
+        # The board might pad the last block of a transfer
+        reference: bytes = bytes(memoryview(data)[:size])
+        del data
+
+        comparator = PassComparator(reference)
+        passes: int = 1
+        differing_passes: int = 0
+        agreeing: int = 1
+
+        while agreeing < self.agreeing_passes and passes < self.max_passes:
+            comparator.start_pass()
+            pass_number: int = passes
+
+            command_class.cxfer_read_to_sink(self._address_pins, self._data_pins, self._hi_pins, comparator,
+                                             (lambda read: update_callback(pass_number, read)) if update_callback else None, ser)
+            if comparator.written != size:
+                raise IOError(f'Pass {pass_number} returned {comparator.written} bytes, expected {size}')
+
+            passes += 1
+            if comparator.differs:
+                _LOGGER.warning(f'Pass {pass_number} differs from the reference')
+                differing_passes += 1
+                # Start counting again, from the reference
+                agreeing = 1
+            else:
+                agreeing += 1
+
+        return StabilityReport(reference, comparator.mask, -(len(self._data_pins) // -8), passes, differing_passes)
@@ -0,0 +1,197 @@
+"""This module contains code to retry failed CXFER transfers and to resume interrupted dumps"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+import json
+import logging
+import os
+import time
+from typing import Type, final
+
+import serial
+
+from dupicolib.board_commands_interface import BoardCommandsInterface
+from dupicolib.board_utilities import BoardUtilities, HandshakeConfig
+from dupicolib.partitioned_dump import DumpPartition, PartitionedDump
+
+_LOGGER = logging.getLogger(__name__)
+
+# Target size of every partition: a failed transfer costs at most this much data
+_DEFAULT_PARTITION_SIZE: int = 32 * 1024
+_DEFAULT_MAX_RETRIES: int = 3
+
+@dataclass
+class ResumeToken:
+    """Progress of a dump: its pin profile and the partitions already verified"""
+    address_pins: list[int]
+    data_pins: list[int]
+    hi_pins: list[int]
+    partition_bits: int
+    completed: set[int] = field(default_factory=set)
+
+    def save(self, path: str | os.PathLike) -> None:
+        with open(path, 'w', encoding='utf-8') as token_file:
+            json.dump({
+                'address_pins': self.address_pins,
+                'data_pins': self.data_pins,
+                'hi_pins': self.hi_pins,
+                'partition_bits': self.partition_bits,
+                'completed': sorted(self.completed),
+            }, token_file)
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> ResumeToken:
+        with open(path, 'r', encoding='utf-8') as token_file:
+            token = json.load(token_file)
+
+        return cls(token['address_pins'], token['data_pins'], token['hi_pins'], token['partition_bits'], set(token['completed']))
+
+@dataclass
+class ResumableDumpResult:
+    data: bytearray
+    token: ResumeToken
+    retries: dict[int, int] = field(default_factory=dict)
+
+    @property
+    def total_retries(self) -> int:
+        return sum(self.retries.values())
+
+class DumpInterruptedError(IOError):
+    """Raised when a partition keeps failing. Carries what was read so far, to resume the dump later."""
+
+    def __init__(self, message: str, result: ResumableDumpResult):
+        super().__init__(message)
+        self.result = result
+
+@final
+class ResumableDump:
+    """
+    This class dumps an IC as a sequence of partitions (see PartitionedDump), each one read with its own CXFER transfer.
+
+    The dupico protocol has no way to ask for a block again, so when a transfer fails (bad checksum, short read or
+    XFER_PKT_FAIL) the connection is reset and only the affected partition is read again. Verified partitions are kept,
+    and the progress is tracked in a ResumeToken, so an interrupted dump can be continued later.
+    """
+
+    def __init__(self, address_pins: list[int], data_pins: list[int], hi_pins: list[int], partition_bits: int | None = None, max_retries: int = _DEFAULT_MAX_RETRIES,
+                 reset_config: HandshakeConfig | None = None):
+        """
+        Args:
+            address_pins (list[int]): List of the pins composing the address, in order, starting from A0
+            data_pins (list[int]): List of the pins composing the data, in order, starting from D0
+            hi_pins (list[int]): List of the pins that must be always set to a high logic level during the transfer
+            partition_bits (int | None, optional): Number of top address lines fixed for every partition, chosen for partitions of about 32 KiB if None. Defaults to None.
+            max_retries (int, optional): Number of times a failed partition is read again. Defaults to 3.
+            reset_config (HandshakeConfig | None, optional): Timing of the reset before a retry: DTR is held low for the initial backoff,
+                then the handshake follows it. The defaults if None. Defaults to None.
+        """
+        if partition_bits is None:
+            total_size: int = BoardCommandsInterface.cxfer_data_size(address_pins, data_pins)
+            partition_bits = min(len(address_pins), max(0, (total_size // _DEFAULT_PARTITION_SIZE).bit_length() - 1))
+
+        self._dump = PartitionedDump(address_pins, data_pins, hi_pins, partition_bits)
+        self._address_pins: list[int] = list(address_pins)
+        self._data_pins: list[int] = list(data_pins)
+        self._hi_pins: list[int] = list(hi_pins)
+        self._partition_bits: int = partition_bits
+        self._max_retries: int = max_retries
+        self._reset_config: HandshakeConfig = reset_config or HandshakeConfig()
+
+    @property
+    def partitions(self) -> list[DumpPartition]:
+        return self._dump.partitions
+
+    @property
+    def size(self) -> int:
+        return sum(partition.size for partition in self._dump.partitions)
+
+    def new_token(self) -> ResumeToken:
+        return ResumeToken(list(self._address_pins), list(self._data_pins), list(self._hi_pins), self._partition_bits)
+
+    def read(self, command_class: Type[BoardCommandsInterface], ser: serial.Serial, token: ResumeToken | None = None, buffer: bytearray | None = None,
+             update_callback: Callable[[int], None] | None = None) -> ResumableDumpResult:
+        """Read all the partitions that are not completed yet, retrying the failed ones
+
+        Args:
+            command_class (Type[BoardCommandsInterface]): Command class for the board
+            ser (serial.Serial): Serial port connected to the board
+            token (ResumeToken | None, optional): Progress of a previous attempt, to skip the partitions already read. Defaults to None.
+            buffer (bytearray | None, optional): Data of the previous attempt, required when resuming. Defaults to None.
+            update_callback (Callable[[int], None] | None, optional): A callback receiving the number of bytes verified so far. Defaults to None.
+
+        Raises:
+            ValueError: If the token belongs to a different dump, or the buffer is missing or too small
+            DumpInterruptedError: If a partition failed more than the allowed retries
+
+        Returns:
+            ResumableDumpResult: The data, the final token and the retries done for every partition
+        """
+        token = token or self.new_token()
+        if (token.address_pins, token.data_pins, token.hi_pins, token.partition_bits) != (self._address_pins, self._data_pins, self._hi_pins, self._partition_bits):
+            raise ValueError('The resume token belongs to a different dump')
+
+        if buffer is None:
+            if token.completed:
+                raise ValueError('Resuming a dump requires the data read so far')
+            buffer = bytearray(self.size)
+        elif len(buffer) < self.size:
+            raise ValueError(f'Buffer of {len(buffer)} bytes is too small for a dump of {self.size} bytes')
+
+        result = ResumableDumpResult(buffer, token)
+        verified: int = sum(partition.size for partition in self._dump.partitions if partition.index in token.completed)
+
+        for partition in self._dump.partitions:
+            if partition.index in token.completed:
+                continue
+
+            self._read_partition(command_class, ser, partition, result)
+            token.completed.add(partition.index)
+
+            verified += partition.size
+            if update_callback:
+                update_callback(verified)
+
+        return result
+
+    def _read_partition(self, command_class: Type[BoardCommandsInterface], ser: serial.Serial, partition: DumpPartition, result: ResumableDumpResult) -> None:
+        position: int = partition.offset - self._dump.offset
+
+        for attempt in range(self._max_retries + 1):
+            try:
+                if attempt > 0:
+                    result.retries[partition.index] = attempt
+                    self._resync(command_class, ser)
+
+                data = command_class.cxfer_read(partition.address_pins, self._data_pins, partition.hi_pins, None, ser)
+                PartitionedDump._check_partition(partition, data)
+            except IOError as exc:
+                _LOGGER.warning(f'Partition {partition.index} failed on attempt {attempt + 1}: {exc}')
+
+                if attempt == self._max_retries:
+                    raise DumpInterruptedError(f'Partition {partition.index} failed after {attempt + 1} attempts: {exc}', result) from exc
+                continue
+
+            result.data[position:position + partition.size] = memoryview(data)[:partition.size] # type: ignore
+            return
+
+    def _resync(self, command_class: Type[BoardCommandsInterface], ser: serial.Serial) -> None:
+        # The board might still be waiting for an acknowledge: reset it right away, holding DTR low long enough to be seen
+        ser.dtr = False
+        ser.reset_input_buffer()
+        time.sleep(self._reset_config.initial_backoff)
+        ser.dtr = True
+
+        # The reset dropped the CXFER configuration held by the board
+        BoardUtilities.mark_connection_reset(ser)
+        if (clear_cache := getattr(command_class, 'clear_cxfer_profile_cache', None)) is not None:
+            clear_cache(ser)
+
+        if (initialize := getattr(command_class, 'initialize_connection', None)) is not None:
+            ready: bool = initialize(ser)
+        else:
+            ready = BoardUtilities.initialize_connection(ser, config=self._reset_config)
+
+        if not ready:
+            raise IOError('Unable to reinitialize the connection with the board')
@@ -0,0 +1,253 @@
+"""This module contains the incremental hashing of dumps and an on-disk index of known ROM images, to identify a chip while it's being dumped"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import Enum
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from typing import final
+import zlib
+
+from dupicolib.dump_sinks import DumpSink
+
+_LOGGER = logging.getLogger(__name__)
+
+_DEFAULT_BLOCK_SIZE: int = 1024 # Same as a CXFER block
+_DEFAULT_PREFIX_DEPTH: int = 16
+
+_SCHEMA: str = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS roms (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    crc32 INTEGER NOT NULL,
+    sha256 BLOB NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS prefixes (
+    rom_id INTEGER NOT NULL REFERENCES roms(id) ON DELETE CASCADE,
+    depth INTEGER NOT NULL,
+    digest BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS prefixes_lookup ON prefixes (depth, digest);
+'''
+
+@dataclass(frozen=True)
+class KnownRom:
+    id: int
+    name: str
+    size: int
+    crc32: int
+    sha256: bytes
+
+class MatchAction(Enum):
+    CONTINUE = 0
+    SKIP = 1
+
+class DumpSkippedError(IOError):
+    """Raised by a HashingSink when the dump is stopped because the chip was identified"""
+
+    def __init__(self, message: str, matches: list[KnownRom]):
+        super().__init__(message)
+        self.matches = matches
+
+@final
+class RomIndex:
+    """
+    This class keeps an index of known ROM images in a SQLite database. Besides the hashes of the whole image,
+    every image is indexed by the SHA-256 of its first 1, 2, ... N blocks, so a dump can be matched while
+    only its first blocks have been read.
+
+    The block size and the number of indexed prefixes are fixed when the database is created.
+    """
+
+    def __init__(self, path: str | os.PathLike, block_size: int = _DEFAULT_BLOCK_SIZE, prefix_depth: int = _DEFAULT_PREFIX_DEPTH):
+        """
+        Args:
+            path (str | os.PathLike): Path of the database, created if it does not exist
+            block_size (int, optional): Size of the blocks, for a new database. Defaults to 1024.
+            prefix_depth (int, optional): Number of prefixes indexed for every image, for a new database. Defaults to 16.
+        """
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._db.execute('PRAGMA foreign_keys = ON')
+
+        with self._db:
+            self._db.executemany('INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)', (('block_size', block_size), ('prefix_depth', prefix_depth)))
+
+        meta: dict[str, int] = dict(self._db.execute('SELECT key, value FROM meta'))
+        self.block_size: int = meta['block_size']
+        self.prefix_depth: int = meta['prefix_depth']
+
+    def __enter__(self) -> RomIndex:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def add(self, name: str, data: bytes | bytearray | memoryview) -> KnownRom:
+        """Add an image to the index. An image already present is not added again.
+
+        Args:
+            name (str): Name of the image
+            data (bytes | bytearray | memoryview): Content of the image
+
+        Returns:
+            KnownRom: The indexed image
+        """
+        sha256: bytes = hashlib.sha256(data).digest()
+
+        if (known := self.lookup(sha256)) is not None:
+            return known
+
+        prefix_hash = hashlib.sha256()
+        prefixes: list[tuple[int, bytes]] = []
+        with memoryview(data) as view:
+            for depth in range(1, min(self.prefix_depth, len(view) // self.block_size) + 1):
+                prefix_hash.update(view[(depth - 1) * self.block_size:depth * self.block_size])
+                prefixes.append((depth, prefix_hash.digest()))
+
+        crc32: int = zlib.crc32(data)
+
+        with self._lock, self._db:
+            rom_id = self._db.execute('INSERT INTO roms (name, size, crc32, sha256) VALUES (?, ?, ?, ?)', (name, len(data), crc32, sha256)).lastrowid
+            self._db.executemany('INSERT INTO prefixes (rom_id, depth, digest) VALUES (?, ?, ?)', ((rom_id, depth, digest) for depth, digest in prefixes))
+
+        return KnownRom(rom_id, name, len(data), crc32, sha256) # type: ignore
+
+    def add_file(self, path: str | os.PathLike, name: str | None = None) -> KnownRom:
+        """Add an image file to the index, named after the file unless a name is given"""
+        with open(path, 'rb') as image_file:
+            return self.add(name or os.path.basename(path), image_file.read())
+
+    def lookup(self, sha256: bytes) -> KnownRom | None:
+        """Find an image by the SHA-256 of its whole content"""
+        with self._lock:
+            row = self._db.execute('SELECT id, name, size, crc32, sha256 FROM roms WHERE sha256 = ?', (sha256,)).fetchone()
+
+        return KnownRom(*row) if row else None
+
+    def match_prefix(self, depth: int, digest: bytes, size: int | None = None) -> list[KnownRom]:
+        """Find the images starting with the same blocks as a dump
+
+        Args:
+            depth (int): Number of blocks hashed, between 1 and prefix_depth
+            digest (bytes): SHA-256 of the first `depth` blocks
+            size (int | None, optional): Size of the chip, to exclude images of a different size. Defaults to None.
+
+        Returns:
+            list[KnownRom]: The matching images
+        """
+        query: str = 'SELECT r.id, r.name, r.size, r.crc32, r.sha256 FROM prefixes p JOIN roms r ON r.id = p.rom_id WHERE p.depth = ? AND p.digest = ?'
+        params: tuple = (depth, digest)
+
+        if size is not None:
+            query += ' AND r.size = ?'
+            params += (size,)
+
+        with self._lock:
+            return [KnownRom(*row) for row in self._db.execute(query + ' ORDER BY r.id', params)]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM roms').fetchone()[0]
+
+@final
+class HashingSink(DumpSink):
+    """
+    This class hashes a dump while it's being received, keeping the running CRC32 and SHA-256 of the whole
+    content and the CRC32 of every block, then passes the data on to another sink, if any.
+
+    With an index, the dump is matched against the known images at every block boundary within the indexed prefixes.
+    The callback is told about the matching images, and can stop the dump by returning MatchAction.SKIP,
+    in which case DumpSkippedError is raised from the write. As this interrupts the transfer, the connection
+    to the board must be reinitialized afterwards.
+    """
+
+    def __init__(self, sink: DumpSink | None = None, index: RomIndex | None = None, size: int | None = None,
+                 on_match: Callable[[int, list[KnownRom]], MatchAction] | None = None, block_size: int = _DEFAULT_BLOCK_SIZE):
+        """
+        Args:
+            sink (DumpSink | None, optional): Sink receiving the data after hashing. Defaults to None.
+            index (RomIndex | None, optional): Index of the known images. Defaults to None.
+            size (int | None, optional): Size of the chip, to ignore known images of a different size. Defaults to None.
+            on_match (Callable[[int, list[KnownRom]], MatchAction] | None, optional): Receives the number of blocks matched and the candidate images,
+                until no image matches anymore or the indexed prefixes are over. Defaults to None.
+            block_size (int, optional): Size of the hashed blocks, the one of the index if given. Defaults to 1024.
+        """
+        super().__init__()
+        self._sink = sink
+        self._index = index
+        self._size = size
+        self._on_match = on_match
+        self.block_size: int = index.block_size if index is not None else block_size
+
+        self.crc32: int = 0
+        self.block_crc32: array = array('I')
+        self.matches: list[KnownRom] = []
+        self._sha256 = hashlib.sha256()
+        self._block: bytearray = bytearray()
+        self._matching: bool = index is not None
+
+    @property
+    def sha256(self) -> bytes:
+        return self._sha256.digest()
+
+    def write(self, data: bytes | bytearray | memoryview) -> None:
+        with memoryview(data) as view:
+            offset: int = 0
+            while offset < len(view):
+                # Hash up to the end of the block, the prefix digests need the running hash at every block boundary
+                length: int = min(len(view) - offset, self.block_size - len(self._block))
+                chunk = view[offset:offset + length]
+
+                self._sha256.update(chunk)
+                self.crc32 = zlib.crc32(chunk, self.crc32)
+                self._block += chunk
+                offset += length
+
+                if len(self._block) == self.block_size:
+                    self._complete_block()
+
+        self.written += len(data)
+
+        if self._sink is not None:
+            self._sink.write(data)
+
+    def close(self) -> None:
+        if self._block:
+            self.block_crc32.append(zlib.crc32(self._block))
+            self._block.clear()
+
+        if self._sink is not None:
+            self._sink.close()
+
+    def identify(self) -> KnownRom | None:
+        """Look up the whole content hashed so far in the index"""
+        return self._index.lookup(self.sha256) if self._index is not None else None
+
+    def _complete_block(self) -> None:
+        self.block_crc32.append(zlib.crc32(self._block))
+        self._block.clear()
+
+        if not self._matching or self._index is None:
+            return
+
+        depth: int = len(self.block_crc32)
+        self.matches = self._index.match_prefix(depth, self._sha256.digest(), self._size)
+        self._matching = bool(self.matches) and depth < self._index.prefix_depth
+
+        _LOGGER.debug(f'{len(self.matches)} known images match the first {depth} blocks')
+
+        if self._on_match is not None and self._on_match(depth, self.matches) == MatchAction.SKIP:
+            raise DumpSkippedError(f'Dump skipped after {depth} blocks, matching {", ".join(rom.name for rom in self.matches) or "no known image"}', self.matches)
@@ -0,0 +1,309 @@
+"""This module contains a recorder of the traffic on a serial port, and a replayer that serves a recorded trace as a serial port"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+from enum import Enum
+import os
+import struct
+import time
+from typing import Any, BinaryIO
+
+import serial
+
+_MAGIC: bytes = b'DPTRACE1'
+_EVENT_HEADER = struct.Struct('<BdI') # Kind, timestamp, data length
+
+class TraceEventKind(Enum):
+    WRITE = 0
+    READ = 1
+    RESET_INPUT = 2
+    DTR_LOW = 3
+    DTR_HIGH = 4
+
+@dataclass(frozen=True)
+class TraceEvent:
+    kind: TraceEventKind
+    timestamp: float
+    data: bytes = b''
+
+class TraceMismatchError(Exception):
+    """Raised when the host does not write what was recorded"""
+
+def read_trace(path: str | os.PathLike) -> list[TraceEvent]:
+    """Load a trace file
+
+    Args:
+        path (str | os.PathLike): Path of the trace
+
+    Raises:
+        ValueError: If the file is not a trace, or it's truncated
+
+    Returns:
+        list[TraceEvent]: The events, in order
+    """
+    with open(path, 'rb') as trace_file:
+        return list(iter_trace(trace_file))
+
+def iter_trace(trace_file: BinaryIO) -> Iterator[TraceEvent]:
+    if trace_file.read(len(_MAGIC)) != _MAGIC:
+        raise ValueError('Not a dupicolib trace file')
+
+    while header := trace_file.read(_EVENT_HEADER.size):
+        if len(header) != _EVENT_HEADER.size:
+            raise ValueError('Truncated trace event header')
+
+        kind, timestamp, size = _EVENT_HEADER.unpack(header)
+        if len((data := trace_file.read(size))) != size:
+            raise ValueError('Truncated trace event data')
+
+        yield TraceEvent(TraceEventKind(kind), timestamp, data)
+
+class RecordingSerial:
+    """
+    This class wraps a serial port, recording every write, read, input reset and DTR change, with its timestamp, into a trace file.
+    Reads that time out are recorded too, as empty reads.
+
+    Attributes that are not recorded are forwarded to the wrapped port.
+    """
+
+    def __init__(self, ser: serial.Serial, path: str | os.PathLike):
+        """
+        Args:
+            ser (serial.Serial): Port to record
+            path (str | os.PathLike): Path of the trace file, overwritten if it exists
+        """
+        self._ser = ser
+        self._file: BinaryIO = open(path, 'wb')
+        self._file.write(_MAGIC)
+        self._start: float = time.perf_counter()
+
+    def __enter__(self) -> RecordingSerial:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._ser, name)
+
+    @property
+    def ser(self) -> serial.Serial:
+        return self._ser
+
+    @property
+    def timeout(self) -> float | None:
+        return self._ser.timeout
+
+    @timeout.setter
+    def timeout(self, value: float | None) -> None:
+        self._ser.timeout = value
+
+    @property
+    def in_waiting(self) -> int:
+        return self._ser.in_waiting
+
+    @property
+    def dtr(self) -> bool:
+        return self._ser.dtr
+
+    @dtr.setter
+    def dtr(self, value: bool) -> None:
+        self._record(TraceEventKind.DTR_HIGH if value else TraceEventKind.DTR_LOW)
+        self._ser.dtr = value
+
+    def write(self, data: bytes | bytearray | memoryview) -> int | None:
+        self._record(TraceEventKind.WRITE, bytes(data))
+        return self._ser.write(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data: bytes = self._ser.read(size)
+        self._record(TraceEventKind.READ, data)
+        return data
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:
+        size: int = self._ser.readinto(buffer)
+        with memoryview(buffer) as view:
+            self._record(TraceEventKind.READ, bytes(view[:size]))
+        return size
+
+    def readline(self, size: int = -1) -> bytes:
+        data: bytes = self._ser.readline(size)
+        self._record(TraceEventKind.READ, data)
+        return data
+
+    def reset_input_buffer(self) -> None:
+        self._record(TraceEventKind.RESET_INPUT)
+        self._ser.reset_input_buffer()
+
+    def close(self) -> None:
+        """Close the trace file and the port"""
+        if not self._file.closed:
+            self._file.close()
+        self._ser.close()
+
+    def _record(self, kind: TraceEventKind, data: bytes = b'') -> None:
+        self._file.write(_EVENT_HEADER.pack(kind.value, time.perf_counter() - self._start, len(data)))
+        self._file.write(data)
+
+class ReplaySerial:
+    """
+    This class serves a recorded trace as a serial port.
+
+    Data written by the host is checked against the recorded writes. Data recorded as read becomes
+    available once all the writes recorded before it have been done, and is dropped by the input resets
+    that were recorded before it was read. Reads may be chunked differently from the recording, while the host
+    must write the same bytes, completing every recorded write before it can read the data that followed it.
+
+    Without realtime, the recorded data is served as fast as possible. With realtime, every chunk of data is
+    served with the delay it had from the last write in the recording.
+    """
+
+    def __init__(self, trace: str | os.PathLike | list[TraceEvent], realtime: bool = False, strict: bool = True, timeout: float | None = 1.0):
+        """
+        Args:
+            trace (str | os.PathLike | list[TraceEvent]): Path of the trace file, or its events
+            realtime (bool, optional): True to reproduce the recorded timing. Defaults to False.
+            strict (bool, optional): True to raise TraceMismatchError when the host writes something different from the recording. Defaults to True.
+            timeout (float | None, optional): Read timeout, kept for code that reads or changes it. Reads never wait longer than the recorded timing. Defaults to 1.0.
+        """
+        self._events: list[TraceEvent] = list(trace) if isinstance(trace, list) else read_trace(trace)
+        self.realtime = realtime
+        self.strict = strict
+        self.timeout: float | None = timeout
+        self.is_open: bool = True
+        self.dtr: bool = True
+        self.port: str = 'replay://'
+
+        self._pos: int = 0 # Next event
+        self._event_offset: int = 0 # Bytes already consumed from the next event
+        self._rx: bytearray = bytearray() # Data received before the last write, not yet read
+        self._anchor_trace: float = 0.0
+        self._anchor_real: float = time.perf_counter()
+
+    def __enter__(self) -> ReplaySerial:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def finished(self) -> bool:
+        """True once every recorded write has been done"""
+        return all(event.kind != TraceEventKind.WRITE for event in self._events[self._pos:])
+
+    @property
+    def in_waiting(self) -> int:
+        self._collect(False)
+        return len(self._rx)
+
+    def write(self, data: bytes | bytearray | memoryview) -> int:
+        expected: bytearray = bytearray()
+
+        while len(expected) < len(data) and self._pos < len(self._events):
+            event = self._events[self._pos]
+
+            if event.kind == TraceEventKind.WRITE:
+                chunk = event.data[self._event_offset:self._event_offset + len(data) - len(expected)]
+                expected += chunk
+                self._advance(len(chunk))
+                self._anchor(event)
+            elif event.kind == TraceEventKind.READ:
+                # Data received before this write stays in the input buffer
+                self._rx += event.data[self._event_offset:]
+                self._advance(len(event.data))
+            else:
+                self._advance(0)
+
+        if self.strict and expected != data:
+            raise TraceMismatchError(f'Host wrote {bytes(data)!r}, the trace expected {bytes(expected)!r}')
+
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        self._wait_for(lambda: len(self._rx) >= size)
+
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:
+        with memoryview(buffer) as view:
+            data = self.read(len(view))
+            view[:len(data)] = data
+            return len(data)
+
+    def readline(self, size: int = -1) -> bytes:
+        self._wait_for(lambda: b'\n' in self._rx or 0 <= size <= len(self._rx))
+
+        line_end = self._rx.find(b'\n') + 1 or len(self._rx)
+        if size >= 0:
+            line_end = min(line_end, size)
+
+        data = bytes(self._rx[:line_end])
+        del self._rx[:line_end]
+        return data
+
+    def reset_input_buffer(self) -> None:
+        self._rx.clear()
+
+        # Skip what was read before the recorded reset
+        for idx in range(self._pos, len(self._events)):
+            event = self._events[idx]
+            if event.kind == TraceEventKind.RESET_INPUT:
+                self._pos, self._event_offset = idx + 1, 0
+                return
+            elif event.kind != TraceEventKind.READ:
+                return
+
+    def reset_output_buffer(self) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.is_open = False
+
+    def _advance(self, consumed: int) -> None:
+        self._event_offset += consumed
+        if self._event_offset >= len(self._events[self._pos].data):
+            self._pos += 1
+            self._event_offset = 0
+
+    def _anchor(self, event: TraceEvent) -> None:
+        self._anchor_trace = event.timestamp
+        self._anchor_real = time.perf_counter()
+
+    def _collect(self, wait: bool) -> bool:
+        """Move the next recorded read to the input buffer, if it's not past a write
+
+        Returns:
+            bool: True if data was collected
+        """
+        while self._pos < len(self._events):
+            event = self._events[self._pos]
+
+            if event.kind in (TraceEventKind.DTR_LOW, TraceEventKind.DTR_HIGH):
+                self._advance(0)
+                continue
+            elif event.kind != TraceEventKind.READ:
+                return False
+
+            if self.realtime:
+                delay: float = self._anchor_real + (event.timestamp - self._anchor_trace) - time.perf_counter()
+                if delay > 0:
+                    if not wait:
+                        return False
+                    time.sleep(delay)
+
+            self._rx += event.data[self._event_offset:]
+            self._advance(len(event.data))
+            return True
+
+        return False
+
+    def _wait_for(self, condition) -> None:
+        while not condition() and self._collect(True):
+            pass
@@ -0,0 +1,221 @@
+"""Fake boards and helpers shared by the tests"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+from collections.abc import Callable
+import struct
+
+from dupicolib.board_interfaces.m3_board_commands import CommandCode
+from dupicolib.board_interfaces.special_modes.cxfer import CXFERTransfer
+from dupicolib.board_utilities import BoardUtilities
+from dupicolib.emulators.brutus28_simulator import Brutus28Simulator
+from dupicolib.emulators.link import EmulatedSerial, LinkProfile
+from dupicolib.emulators.m3_emulator import M3Emulator
+from dupicolib.emulators.virtual_chips import VirtualROM
+
+_CXFER_FRAME_SIZE: int = 19 # Command code, subcommand, 16 parameter bytes and checksum
+
+class FakeCXFERSerial:
+    """Minimal dupico stand-in answering CXFER configuration frames and streaming an image on EXECUTE_READ"""
+
+    def __init__(self, image: bytes, corrupt_block: int | None = None, failed_block: int | None = None):
+        self.image = image
+        self.corrupt_block = corrupt_block
+        self.failed_block = failed_block
+        self.frames: list[bytes] = []
+        self.acks: list[bytes] = []
+        self._pending_acks = 0
+        self._tx = bytearray()
+        self._rx = bytearray()
+
+    def write(self, data: bytes) -> int:
+        if self._pending_acks:
+            self._pending_acks -= 1
+            self.acks.append(bytes(data))
+            return len(data)
+
+        self._tx.extend(data)
+        while len(self._tx) >= _CXFER_FRAME_SIZE:
+            frame = bytes(self._tx[:_CXFER_FRAME_SIZE])
+            del self._tx[:_CXFER_FRAME_SIZE]
+            self.frames.append(frame)
+
+            if frame[1] == CXFERTransfer.CXFERSubCommand.EXECUTE_READ.value:
+                self._queue_transfer()
+            else:
+                self._queue_response(frame[0], 0)
+
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def reset_input_buffer(self):
+        self._rx.clear()
+
+    def _queue_response(self, cmd: int, value: int):
+        resp = bytes([cmd | BoardUtilities.BINARY_COMMAND_RESPONSE_FLAG, value])
+        self._rx.extend(resp + bytes([BoardUtilities.command_checksum_calculator(resp)]))
+
+    def _queue_transfer(self):
+        self._pending_acks = -(len(self.image) // -1024)
+        for idx in range(0, len(self.image), 1024):
+            if idx // 1024 == self.failed_block:
+                self._rx.extend(struct.pack('>I', CXFERTransfer.CXFERResponse.XFER_PKT_FAIL.value))
+                return
+
+            block = self.image[idx:idx + 1024]
+            checksum = BoardUtilities.cxfer_checksum_calculator(block)
+            if idx // 1024 == self.corrupt_block:
+                checksum ^= 1
+            self._rx.extend(struct.pack('>I', CXFERTransfer.CXFERResponse.XFER_PKT_START.value) + block + struct.pack('<H', checksum))
+
+        self._rx.extend(struct.pack('>I', CXFERTransfer.CXFERResponse.XFER_DONE.value))
+        self._queue_response(9, CXFERTransfer.CXFERSubCommand.EXECUTE_READ.value)
+
+def make_test_image(size: int) -> bytes:
+    """Deterministic image, with pages that differ from each other"""
+    return bytes((idx * 7 + (idx >> 8)) & 0xFF for idx in range(size))
+
+class FakePinsSerial:
+    """dupico stand-in handling WRITE and READ commands, the pins read back inverted"""
+
+    _FRAME_SIZES: dict[int, int] = {CommandCode.WRITE.value: 10, CommandCode.READ.value: 2}
+
+    def __init__(self):
+        self.pins = 0
+        self.writes: list[bytes] = []
+        self._tx = bytearray()
+        self._rx = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self.writes.append(bytes(data))
+        self._tx.extend(data)
+
+        while self._tx and len(self._tx) >= (frame_size := self._FRAME_SIZES[self._tx[0]]):
+            frame = bytes(self._tx[:frame_size])
+            del self._tx[:frame_size]
+
+            if frame[0] == CommandCode.WRITE.value:
+                self.pins = struct.unpack('<Q', frame[1:9])[0]
+
+            resp = bytes([frame[0] | BoardUtilities.BINARY_COMMAND_RESPONSE_FLAG, *struct.pack('<Q', ~self.pins & 0xFFFFFFFFFF)])
+            self._rx.extend(resp + bytes([BoardUtilities.command_checksum_calculator(resp)]))
+
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def reset_input_buffer(self):
+        self._rx.clear()
+
+class FakeIdentifySerial:
+    """dupico stand-in that announces itself and answers MODEL and VERSION"""
+
+    def __init__(self):
+        self._rx = bytearray(b'REMOTE_CONTROL_ENABLED\r\n')
+        self.dtr = True
+        self.timeout = 1.0
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._rx)
+
+    def readline(self, size: int = -1) -> bytes:
+        line_end = self._rx.find(b'\n') + 1
+        data = bytes(self._rx[:line_end])
+        del self._rx[:line_end]
+        return data
+
+    def write(self, data: bytes) -> int:
+        payload = bytes([3]) if data[0] == 4 else b'0.1.2'.ljust(10, b'\x00')
+        resp = bytes([data[0] | BoardUtilities.BINARY_COMMAND_RESPONSE_FLAG, *payload])
+        self._rx.extend(resp + bytes([BoardUtilities.command_checksum_calculator(resp)]))
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def reset_input_buffer(self):
+        self._rx.clear()
+
+class FakeBrutusSerial:
+    """Small command-shell fake for the Brutus28 text protocol."""
+
+    def __init__(self, input_provider: Callable[[int], int] | None = None):
+        self.input_provider = input_provider
+        self.last_output = 0
+        self.writes: list[str] = []
+        self._rx = bytearray()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._rx)
+
+    def reset_input_buffer(self):
+        self._rx.clear()
+
+    def write(self, data: bytes):
+        # Bursts carry several commands, each one terminated by a carriage return
+        for command in data.decode('ASCII').split('\r')[:-1]:
+            self._handle(command.strip())
+
+    def _handle(self, command: str):
+        self.writes.append(command)
+
+        if not command:
+            self._queue('CMD> ')
+        elif command == 'version':
+            self._queue('Version 0.3 built TEST\r\nCMD> ')
+        elif command == 'pld check':
+            self._queue('OK\r\nCMD> ')
+        elif command in ('pld enable', 'pld disable'):
+            self._queue('CMD> ')
+        elif command.startswith('pld output '):
+            self.last_output = int(command.split()[-1], 0)
+            self._queue('CMD> ')
+        elif command == 'pld input':
+            value = self.input_provider(self.last_output) if self.input_provider else self.last_output
+            self._queue(f'Input={value:028b}\r\nCMD> ')
+        else:
+            self._queue(f'Unknown command {command}\r\nCMD> ')
+
+    def read(self, size: int = 1) -> bytes:
+        if not self._rx:
+            return b''
+
+        data = self._rx[:size]
+        del self._rx[:size]
+        return bytes(data)
+
+    def _queue(self, text: str):
+        self._rx.extend(text.encode('ASCII'))
+
+# Emulated boards, with a virtual ROM in the socket
+
+M3_ADDRESS_PINS: list[int] = list(range(1, 16))
+M3_DATA_PINS: list[int] = [16, 17, 18, 19, 20, 22, 23, 24]
+
+def emulated_m3_board(image: bytes, profile: LinkProfile | None = None) -> EmulatedSerial:
+    return EmulatedSerial(M3Emulator(VirtualROM(image, M3_ADDRESS_PINS, M3_DATA_PINS)), profile)
+
+BRUTUS_ADDRESS_PINS: list[int] = list(range(1, 11))
+BRUTUS_DATA_PINS: list[int] = list(range(11, 19))
+
+def simulated_brutus_rom(image: bytes, **kwargs) -> Brutus28Simulator:
+    return Brutus28Simulator(VirtualROM(image, BRUTUS_ADDRESS_PINS, BRUTUS_DATA_PINS, Brutus28Simulator.pin_map()), **kwargs)
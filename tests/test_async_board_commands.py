@@ -0,0 +1,154 @@
+"""Tests for the asyncio board commands, run against fake boards served on ptys"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import asyncio
+import os
+import select
+import threading
+import time
+
+from dupicolib.async_serial import AsyncSerialPort
+from dupicolib.async_board_utilities import AsyncBoardUtilities
+from dupicolib.board_interfaces.async_m3_board_commands import AsyncM3BoardCommands
+from dupicolib.board_interfaces.special_modes.cxfer import CXFERBlockFailedError
+from dupicolib.board_utilities import HandshakeConfig
+from board_fakes import FakeCXFERSerial, FakePinsSerial, make_test_image
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'openpty'), reason='ptys are not available')
+
+class PtyBridge:
+    """Serves a fake serial object on the master side of a pty"""
+
+    def __init__(self, fake):
+        self.fake = fake
+        self.master, self._slave = os.openpty()
+        self.port = os.ttyname(self._slave)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while not self._stop.is_set():
+            if not select.select([self.master], [], [], 0.05)[0]:
+                continue
+
+            try:
+                self.fake.write(os.read(self.master, 4096))
+            except OSError:
+                return
+
+            if resp := self.fake.read(1 << 20):
+                os.write(self.master, resp)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        os.close(self.master)
+        os.close(self._slave)
+
+def test_async_write_pins():
+    """Test single and pipelined pin writes"""
+    bridge = PtyBridge(FakePinsSerial())
+
+    async def run():
+        port = await AsyncSerialPort.open(bridge.port)
+        try:
+            assert await AsyncM3BoardCommands.write_pins(0x55, port) == ~0x55 & 0xFFFFFFFFFF
+            readbacks = await AsyncM3BoardCommands.write_pins_sequence(range(100), None, port, window_size=16)
+            assert list(readbacks) == [~value & 0xFFFFFFFFFF for value in range(100)] # type: ignore
+        finally:
+            port.close()
+
+    try:
+        asyncio.run(run())
+    finally:
+        bridge.close()
+
+def test_async_cxfer_many_boards():
+    """Test CXFER streams from several boards driven by the same event loop"""
+    images = [make_test_image(2048 * (idx + 1)) for idx in range(4)]
+    bridges = [PtyBridge(FakeCXFERSerial(image)) for image in images]
+
+    async def dump(bridge: PtyBridge, address_width: int) -> bytes:
+        port = await AsyncSerialPort.open(bridge.port)
+        try:
+            blocks = [block async for block in AsyncM3BoardCommands.cxfer_stream(list(range(1, address_width + 1)), [13, 14, 15, 16, 17, 18, 19, 20], [], port)]
+            return b''.join(blocks)
+        finally:
+            port.close()
+
+    async def run() -> list[bytes]:
+        return await asyncio.gather(*(dump(bridge, (len(image) - 1).bit_length()) for bridge, image in zip(bridges, images)))
+
+    try:
+        assert asyncio.run(run()) == images
+    finally:
+        for bridge in bridges:
+            bridge.close()
+
+def test_async_cxfer_failed_block():
+    """Test that a block reported as failed by the board raises the same error as the sync transfer"""
+    bridge = PtyBridge(FakeCXFERSerial(make_test_image(2048), failed_block=1))
+
+    async def dump() -> list[bytes]:
+        port = await AsyncSerialPort.open(bridge.port)
+        try:
+            return [block async for block in AsyncM3BoardCommands.cxfer_stream(list(range(1, 12)), [13, 14, 15, 16, 17, 18, 19, 20], [], port)]
+        finally:
+            port.close()
+
+    try:
+        with pytest.raises(CXFERBlockFailedError) as exc_info:
+            asyncio.run(dump())
+        assert exc_info.value.received == 1024
+    finally:
+        bridge.close()
+
+class FakeBootingAsyncPort:
+    """Async port stand-in for a board that announces itself only after being reset by a DTR toggle"""
+
+    def __init__(self):
+        self.timeout: float | None = 1.0
+        self.dtr_toggles = 0
+        self._rx = bytearray()
+
+    @property
+    def dtr(self) -> bool:
+        return True
+
+    @dtr.setter
+    def dtr(self, value: bool):
+        if value:
+            self.dtr_toggles += 1
+            self._rx.extend(b'REMOTE_CONTROL_ENABLED\r\n')
+
+    async def readline(self, size: int = -1) -> bytes:
+        if not self._rx:
+            await asyncio.sleep(self.timeout or 0)
+            return b''
+
+        line_end = self._rx.find(b'\n') + 1
+        data = bytes(self._rx[:line_end if size < 0 else min(size, line_end)])
+        del self._rx[:len(data)]
+        return data
+
+    def reset_input_buffer(self):
+        self._rx.clear()
+
+def test_async_handshake_timing():
+    """Test that the async handshake follows the attempt timeout and backoff of HandshakeConfig"""
+    port = FakeBootingAsyncPort()
+
+    start = time.perf_counter()
+    ready = asyncio.run(AsyncBoardUtilities.initialize_connection(port, config=HandshakeConfig(max_attempts=3, attempt_timeout=0.1))) # type: ignore
+    elapsed = time.perf_counter() - start
+
+    assert ready
+    assert port.dtr_toggles == 1
+    assert elapsed < 0.5
+    assert port.timeout == 1.0 # Restored
@@ -24,3 +24,5 @@ def test_board_command_class_factory_invalid(valid_semver_complete):
     with pytest.raises(Exception):
         BoardCommandClassFactory.get_command_class(0, fw_ver_dict)
 
+def test_board_command_class_factory_classes():
+    assert BoardCommandClassFactory.get_command_classes() == [M3BoardCommands]
@@ -0,0 +1,82 @@
+"""Tests for the parallel board discovery"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import threading
+import time
+
+from dupicolib import board_discovery
+from dupicolib.board_discovery import BoardDiscovery
+from dupicolib.board_interfaces.brutus28_board_commands import Brutus28BoardCommands
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+from board_fakes import FakeIdentifySerial
+
+class FakeDeadSerial(FakeIdentifySerial):
+    """A port that never answers, every read waits for the whole timeout"""
+
+    def __init__(self):
+        super().__init__()
+        self._rx.clear()
+
+    def readline(self, size: int = -1) -> bytes:
+        time.sleep(self.timeout)
+        return b''
+
+    def read(self, size: int = 1) -> bytes:
+        time.sleep(self.timeout)
+        return b''
+
+def _fake_serial_factory(ports: dict, opened: dict):
+    class FakePort:
+        def __init__(self, port: str, baudrate: int, timeout: float, write_timeout: float):
+            self._ser = ports[port]()
+            self._ser.timeout = timeout
+            opened[port] = (timeout, write_timeout)
+
+        def __enter__(self):
+            return self._ser
+
+        def __exit__(self, *exc):
+            return None
+
+    return FakePort
+
+def test_discover_skips_dead_ports(monkeypatch):
+    """Test that a hung port gives up by itself, without stalling the scan"""
+    opened = {}
+    monkeypatch.setattr(board_discovery.serial, 'Serial', _fake_serial_factory({
+        'good0': FakeIdentifySerial,
+        'dead': FakeDeadSerial,
+        'good1': FakeIdentifySerial,
+    }, opened))
+
+    threads = threading.active_count()
+    start_time = time.perf_counter()
+    boards = BoardDiscovery.discover(['good0', 'dead', 'good1'], timeout=0.5)
+    elapsed = time.perf_counter() - start_time
+
+    assert [board.port for board in boards] == ['good0', 'good1']
+    assert all(board.model == 3 and board.command_class is M3BoardCommands for board in boards)
+    assert boards[0].parsed_version is not None
+    assert elapsed < 1.0
+    # No probe is left running in the background
+    assert threading.active_count() == threads
+    # Single reads and writes get only a share of the probe time
+    assert all(timeout < 0.5 and write_timeout < 0.5 for timeout, write_timeout in opened.values())
+
+def test_discover_dead_port_with_command_class(monkeypatch):
+    """Test that a port with an explicit command class is bound by the same timeout"""
+    monkeypatch.setattr(board_discovery.serial, 'Serial', _fake_serial_factory({'dead': FakeDeadSerial}, {}))
+
+    start_time = time.perf_counter()
+    boards = BoardDiscovery.discover(['dead'], timeout=0.5, command_classes={'dead': Brutus28BoardCommands})
+
+    assert not boards
+    assert time.perf_counter() - start_time < 1.0
+
+def test_discover_no_ports():
+    """Test an empty scan"""
+    assert not BoardDiscovery.discover([])
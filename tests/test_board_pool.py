@@ -0,0 +1,47 @@
+"""Tests for the board pool and the dump scheduler"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+from dupicolib.board_interfaces.brutus28_board_commands import Brutus28BoardCommands
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+from dupicolib.board_pool import BoardConnection, BoardPool, DumpJob, DumpScheduler
+from board_fakes import FakeBrutusSerial, FakeCXFERSerial, FakeIdentifySerial, make_test_image
+
+def test_identify_board():
+    """Test model, version and command class detection"""
+    conn = BoardPool.identify_board('fake', FakeIdentifySerial()) # type: ignore
+
+    assert conn is not None
+    assert conn.model == 3
+    assert conn.version == '0.1.2'
+    assert conn.command_class is M3BoardCommands
+
+def test_identify_board_explicit_class():
+    """Test boards with an explicit command class"""
+    conn = BoardPool.identify_board('fake', FakeBrutusSerial(), Brutus28BoardCommands) # type: ignore
+
+    assert conn is not None
+    assert conn.model == 28
+    assert conn.command_class is Brutus28BoardCommands
+
+def test_dump_scheduler(tmp_path):
+    """Test that jobs are spread across the boards and stats are collected"""
+    image = make_test_image(2048)
+    pool = BoardPool([])
+    pool._boards = [BoardConnection(f'fake{idx}', FakeCXFERSerial(image), 3, '0.1.2', None, M3BoardCommands) for idx in range(3)] # type: ignore
+
+    collected: list[bytes] = []
+    jobs = [DumpJob(list(range(1, 12)), [13, 14, 15, 16, 17, 18, 19, 20], [], collected.append, f'job{idx}') for idx in range(5)]
+    jobs.append(DumpJob(list(range(1, 12)), [13, 14, 15, 16, 17, 18, 19, 20], [], tmp_path / 'out.bin', 'file_job'))
+
+    report = DumpScheduler(pool).run(jobs)
+
+    assert len(report.results) == 6
+    assert all(result.error is None for result in report.results)
+    assert collected == [image] * 5
+    assert (tmp_path / 'out.bin').read_bytes() == image
+    assert report.bytes_read == 6 * 2048
+    assert sum(stats.jobs for stats in report.board_stats.values()) == 6
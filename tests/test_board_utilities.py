@@ -1,12 +1,14 @@
 """Tests for Board Utilities"""
 
-from dupicolib.board_utilities import BoardUtilities
+from dupicolib.board_utilities import BoardUtilities, HandshakeConfig
 
 # pylint: disable=wrong-import-position,wrong-import-order
 
 import sys
 sys.path.insert(0, '.') # Make VSCode happy...
 
+import time
+
 import pytest
 
 def test_command_checksum_calculator(valid_semver_complete):
@@ -18,3 +20,119 @@ def test_cxfer_checksum_calculator(valid_semver_complete):
     """Execute a 16 bit checksum calculation"""
     assert BoardUtilities.cxfer_checksum_calculator(bytes([4])) == 4
     assert BoardUtilities.cxfer_checksum_calculator(bytes([4, 252])) == 256
+
+class FakeEchoSerial:
+    """Board stand-in answering every command with its first parameter byte"""
+
+    def __init__(self, bad_response: int | None = None):
+        self.bad_response = bad_response
+        self.writes: list[bytes] = []
+        self._rx = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self.writes.append(bytes(data))
+        # Every command in these tests is made of a code, a parameter and the checksum
+        for idx in range(0, len(data), 3):
+            resp = bytes([data[idx] | BoardUtilities.BINARY_COMMAND_RESPONSE_FLAG, data[idx + 1]])
+            chks = BoardUtilities.command_checksum_calculator(resp)
+            if idx // 3 == self.bad_response:
+                chks ^= 0xFF
+            self._rx.extend(resp + bytes([chks]))
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def reset_input_buffer(self):
+        self._rx.clear()
+
+def test_send_binary_command():
+    """Send a single command and validate the response"""
+    ser = FakeEchoSerial()
+    assert BoardUtilities.send_binary_command(ser, bytes([4, 0x12]), 1) == bytes([0x12]) # type: ignore
+
+def test_send_binary_commands():
+    """Send a burst of commands with a single write"""
+    ser = FakeEchoSerial()
+    results = BoardUtilities.send_binary_commands(ser, [(bytes([4, idx]), 1) for idx in range(5)]) # type: ignore
+
+    assert results.ok
+    assert results.failed_index is None
+    assert results.responses == [bytes([idx]) for idx in range(5)]
+    assert len(ser.writes) == 1
+
+def test_send_binary_commands_failure():
+    """Check that the failing command in a burst is reported"""
+    ser = FakeEchoSerial(bad_response=2)
+    results = BoardUtilities.send_binary_commands(ser, [(bytes([4, idx]), 1) for idx in range(5)]) # type: ignore
+
+    assert not results.ok
+    assert results.failed_index == 2
+    assert results.responses == [bytes([0]), bytes([1]), None, None, None]
+
+class FakeBootingSerial:
+    """Board stand-in that sends its banner in pieces, some time after every DTR toggle"""
+
+    def __init__(self, boot_time: float, boots_needed: int = 1):
+        self.timeout: float | None = 1.0
+        self.dtr_toggles = 0
+        self._boot_time = boot_time
+        self._boots_needed = boots_needed
+        self._ready_at = time.perf_counter() + boot_time
+        self._rx = bytearray()
+
+    @property
+    def dtr(self) -> bool:
+        return True
+
+    @dtr.setter
+    def dtr(self, value: bool):
+        if value:
+            self.dtr_toggles += 1
+            self._ready_at = time.perf_counter() + self._boot_time
+
+    def readline(self, size: int = -1) -> bytes:
+        if not self._rx and self.dtr_toggles + 1 >= self._boots_needed and time.perf_counter() >= self._ready_at:
+            self._rx.extend(b'REMOTE_CONTROL_ENABLED\r\n')
+            self._ready_at = float('inf')
+
+        if not self._rx:
+            time.sleep(self.timeout or 0)
+            return b''
+
+        # Deliver the banner a few bytes at a time, as a short read would
+        data = bytes(self._rx[:min(size, 5)])
+        del self._rx[:len(data)]
+        return data
+
+    def reset_input_buffer(self):
+        self._rx.clear()
+
+def test_handshake_early_exit():
+    """Test that the banner is accepted as soon as it arrives, even when split across reads"""
+    ser = FakeBootingSerial(0.05)
+    result = BoardUtilities.handshake(ser) # type: ignore
+
+    assert result.ready
+    assert result.attempts == 1
+    assert result.elapsed < 0.5
+    assert ser.timeout == 1.0 # Restored
+
+def test_handshake_dtr_backoff():
+    """Test that DTR is toggled when an attempt times out"""
+    ser = FakeBootingSerial(0.01, boots_needed=2)
+    result = BoardUtilities.handshake(ser, HandshakeConfig(max_attempts=3, attempt_timeout=0.1)) # type: ignore
+
+    assert result.ready
+    assert result.attempts == 2
+    assert ser.dtr_toggles == 1
+
+def test_handshake_deadline():
+    """Test that the overall deadline is respected"""
+    ser = FakeBootingSerial(10.0)
+    result = BoardUtilities.handshake(ser, HandshakeConfig(max_attempts=100, deadline=0.3, attempt_timeout=0.1)) # type: ignore
+
+    assert not result.ready
+    assert result.elapsed < 0.6
@@ -5,54 +5,12 @@
 import sys
 sys.path.insert(0, '.') # Make VSCode happy...
 
-from collections.abc import Callable
+import gc
 
-from dupicolib.board_interfaces.brutus28_board_commands import Brutus28BoardCommands
+import pytest
 
-
-class FakeBrutusSerial:
-    """Small command-shell fake for the Brutus28 text protocol."""
-
-    def __init__(self, input_provider: Callable[[int], int] | None = None):
-        self.input_provider = input_provider
-        self.last_output = 0
-        self.writes: list[str] = []
-        self._rx = bytearray()
-
-    def reset_input_buffer(self):
-        self._rx.clear()
-
-    def write(self, data: bytes):
-        command = data.decode("ASCII").strip()
-        self.writes.append(command)
-
-        if not command:
-            self._queue("CMD> ")
-        elif command == "version":
-            self._queue("Version 0.3 built TEST\r\nCMD> ")
-        elif command == "pld check":
-            self._queue("OK\r\nCMD> ")
-        elif command in ("pld enable", "pld disable"):
-            self._queue("CMD> ")
-        elif command.startswith("pld output "):
-            self.last_output = int(command.split()[-1], 0)
-            self._queue("CMD> ")
-        elif command == "pld input":
-            value = self.input_provider(self.last_output) if self.input_provider else self.last_output
-            self._queue(f"Input={value:028b}\r\nCMD> ")
-        else:
-            self._queue(f"Unknown command {command}\r\nCMD> ")
-
-    def read(self, size: int = 1) -> bytes:
-        if not self._rx:
-            return b""
-
-        data = self._rx[:size]
-        del self._rx[:size]
-        return bytes(data)
-
-    def _queue(self, text: str):
-        self._rx.extend(text.encode("ASCII"))
+from dupicolib.board_interfaces.brutus28_board_commands import Brutus28BoardCommands, Brutus28PromptReader
+from board_fakes import FakeBrutusSerial
 
 
 def test_brutus28_initialize_and_version():
@@ -105,3 +63,86 @@ def test_brutus28_cxfer_read():
     assert updates == [1, 2, 3, 4]
     assert "pld output 0x10" in ser.writes
     assert "pld output 0x13" in ser.writes
+
+
+def test_brutus28_cxfer_read_window_sizes():
+    def input_provider(last_output: int) -> int:
+        address = Brutus28BoardCommands.map_pins_to_value([1, 2, 3, 4, 5], last_output)
+        return last_output | Brutus28BoardCommands.map_value_to_pins([10, 11, 12, 13, 14, 15, 16, 17], address * 7)
+
+    for window_size in (1, 3, 32, 100):
+        ser = FakeBrutusSerial(input_provider)
+        data = Brutus28BoardCommands.cxfer_read([1, 2, 3, 4, 5], [10, 11, 12, 13, 14, 15, 16, 17], [], None, ser, window_size=window_size)
+
+        assert data == bytes((address * 7) & 0xFF for address in range(32))
+        assert ser.writes[-2:] == ["pld output 0x1f", "pld input"]
+
+
+def test_brutus28_burst_missing_response():
+    class DroppingBrutusSerial(FakeBrutusSerial):
+        def _handle(self, command: str):
+            if command != "pld input":
+                super()._handle(command)
+
+    ser = DroppingBrutusSerial()
+
+    with pytest.raises(TimeoutError, match="command 2 of 2"):
+        Brutus28BoardCommands._send_text_commands(ser, ["pld output 0x1", "pld input"], timeout=0.05)
+
+
+def test_brutus28_detect_osc_pins():
+    reads = iter(range(10))
+    ser = FakeBrutusSerial(lambda last_output: 0x100 if next(reads) % 2 else 0)
+
+    assert Brutus28BoardCommands.detect_osc_pins(10, ser, window_size=4) == 0x100
+    assert ser.writes.count("pld input") == 10
+
+
+def test_brutus28_prompt_reader_keeps_leftover_bytes():
+    ser = FakeBrutusSerial()
+    ser._queue("Version 0.3\r\nCM")
+    reader = Brutus28PromptReader(ser)
+
+    with pytest.raises(TimeoutError):
+        reader.read_response(timeout=0.01)
+
+    ser._queue("D> Input=1\r\nCMD> extra")
+    assert list(reader.iter_responses(2)) == ["Version 0.3\r\nCMD>", "Input=1\r\nCMD>"]
+
+    ser._queue("\r\nCMD>")
+    assert reader.read_response() == "extra\r\nCMD>"
+
+
+@pytest.mark.parametrize("prompt", ["CMD>", "CMD>\r\n", "CMD> "])
+def test_brutus28_prompt_reader_prompt_whitespace(prompt):
+    ser = FakeBrutusSerial()
+    reader = Brutus28PromptReader(ser)
+
+    ser._queue(f"Version 0.3\r\n{prompt}")
+    assert reader.read_response(timeout=0.01) == "Version 0.3\r\nCMD>"
+
+    # Whitespace after the prompt might arrive only later, it still does not end up in the next response
+    ser._queue(f" Input=1\r\n{prompt}")
+    assert reader.read_response(timeout=0.01) == "Input=1\r\nCMD>"
+
+
+def test_brutus28_prompt_reader_released_with_port():
+    ser = FakeBrutusSerial()
+    Brutus28BoardCommands.get_version(ser)
+    assert ser in Brutus28BoardCommands._PROMPT_READER_BY_SERIAL
+
+    readers = len(Brutus28BoardCommands._PROMPT_READER_BY_SERIAL)
+    del ser
+    gc.collect()
+
+    assert len(Brutus28BoardCommands._PROMPT_READER_BY_SERIAL) == readers - 1
+
+
+def test_brutus28_write_pins_sequence():
+    ser = FakeBrutusSerial(lambda last_output: last_output ^ 0xF)
+
+    readbacks = Brutus28BoardCommands.write_pins_sequence(range(10), None, ser, window_size=4)
+
+    assert list(readbacks) == [value ^ 0xF for value in range(10)]
+    assert Brutus28BoardCommands.read_pins_sequence(3, None, ser).tolist() == [9 ^ 0xF] * 3
+    assert Brutus28BoardCommands.write_pins_sequence(range(10), lambda steps: steps < 5, ser).tolist() == [value ^ 0xF for value in range(5)]
@@ -0,0 +1,64 @@
+"""Tests for the Brutus28 shell simulator"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import os
+import time
+
+from dupicolib.board_interfaces.brutus28_board_commands import Brutus28BoardCommands
+from dupicolib.emulators.brutus28_simulator import Brutus28Simulator
+from dupicolib.emulators.link import EmulatedSerial, LinkProfile, PtyServer
+from board_fakes import BRUTUS_ADDRESS_PINS, BRUTUS_DATA_PINS, make_test_image, simulated_brutus_rom
+import pytest
+import serial
+
+def test_simulator_shell():
+    """Test the basic shell commands"""
+    ser = EmulatedSerial(Brutus28Simulator())
+
+    assert Brutus28BoardCommands.initialize_connection(ser) # type: ignore
+    assert Brutus28BoardCommands.get_version(ser) == 'Version 0.3 built SIM' # type: ignore
+    assert Brutus28BoardCommands.test_board(ser) # type: ignore
+    assert Brutus28BoardCommands.set_power(True, ser) # type: ignore
+    assert Brutus28BoardCommands.write_pins(0x1234, ser) == 0x1234 # type: ignore
+    assert Brutus28BoardCommands.read_pins(ser) == 0x1234 # type: ignore
+
+def test_simulator_cxfer_read():
+    """Test a dump of a virtual ROM, with and without echo"""
+    image = make_test_image(1 << len(BRUTUS_ADDRESS_PINS))
+
+    for echo in (True, False):
+        ser = EmulatedSerial(simulated_brutus_rom(image, echo=echo))
+        assert Brutus28BoardCommands.initialize_connection(ser) # type: ignore
+        assert Brutus28BoardCommands.cxfer_read(BRUTUS_ADDRESS_PINS, BRUTUS_DATA_PINS, [], None, ser) == image # type: ignore
+
+def test_simulator_latency():
+    """Test that command latency is applied, and that pipelining hides the link latency"""
+    image = make_test_image(1 << len(BRUTUS_ADDRESS_PINS))
+    ser = EmulatedSerial(simulated_brutus_rom(image, command_latency={'pld input': 0.001}), LinkProfile(latency=0.005))
+    assert Brutus28BoardCommands.initialize_connection(ser) # type: ignore
+
+    start_time = time.perf_counter()
+    assert Brutus28BoardCommands.cxfer_read(BRUTUS_ADDRESS_PINS[:4], BRUTUS_DATA_PINS, [], None, ser, window_size=1) is not None # type: ignore
+    unpipelined = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    assert Brutus28BoardCommands.cxfer_read(BRUTUS_ADDRESS_PINS[:4], BRUTUS_DATA_PINS, [], None, ser) is not None # type: ignore
+    pipelined = time.perf_counter() - start_time
+
+    # Every window of one address pays the link latency once
+    assert unpipelined >= 16 * (0.001 + 0.005)
+    assert 16 * 0.001 <= pipelined < unpipelined
+
+@pytest.mark.skipif(not hasattr(os, 'openpty'), reason='ptys are not available')
+def test_simulator_pty():
+    """Test the simulator served on a pty, through pyserial"""
+    image = make_test_image(1 << len(BRUTUS_ADDRESS_PINS))
+
+    with PtyServer(simulated_brutus_rom(image)) as server:
+        with serial.Serial(server.port, 115200, timeout=1.0) as ser:
+            assert Brutus28BoardCommands.initialize_connection(ser)
+            assert Brutus28BoardCommands.cxfer_read(BRUTUS_ADDRESS_PINS, BRUTUS_DATA_PINS, [], None, ser) == image
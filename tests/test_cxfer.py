@@ -0,0 +1,151 @@
+"""Tests for the CXFER transfer mode"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import hashlib
+import threading
+import time
+
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+from dupicolib.board_interfaces.special_modes.cxfer import CXFERBlockFailedError, CXFERTransfer
+from board_fakes import FakeCXFERSerial, make_test_image
+import pytest
+
+def test_cxfer_read():
+    """Test a complete CXFER read"""
+    image = make_test_image(4096)
+    ser = FakeCXFERSerial(image)
+    updates: list[int] = []
+
+    data = M3BoardCommands.cxfer_read(list(range(1, 13)), [13, 14, 15, 16, 17, 18, 19, 20], [41], updates.append, ser) # type: ignore
+
+    assert data == image
+    assert updates == [1024, 2048, 3072, 4096]
+    assert len(ser.acks) == 4
+
+def test_cxfer_stream():
+    """Test that blocks are yielded while the transfer runs"""
+    image = make_test_image(3072)
+    ser = FakeCXFERSerial(image)
+
+    stream = M3BoardCommands.cxfer_stream(list(range(1, 12)), [13, 14, 15, 16, 17, 18, 19, 20], [], ser) # type: ignore
+
+    assert next(stream) == image[:1024]
+    assert len(ser.acks) == 1
+    assert b''.join(stream) == image[1024:]
+    assert len(ser.acks) == 3
+
+def test_cxfer_checksum_error():
+    """Test that a corrupted block interrupts the transfer before being delivered"""
+    ser = FakeCXFERSerial(make_test_image(3072), corrupt_block=1)
+    blocks: list[bytes] = []
+
+    with pytest.raises(IOError):
+        for block in M3BoardCommands.cxfer_stream(list(range(1, 12)), [13, 14, 15, 16, 17, 18, 19, 20], [], ser): # type: ignore
+            blocks.append(block)
+
+    assert len(blocks) == 1
+    assert len(ser.acks) == 1
+
+def test_cxfer_failed_block():
+    """Test that a block reported as failed by the board raises a specific error"""
+    ser = FakeCXFERSerial(make_test_image(3072), failed_block=2)
+
+    with pytest.raises(CXFERBlockFailedError) as exc_info:
+        M3BoardCommands.cxfer_read(list(range(1, 12)), [13, 14, 15, 16, 17, 18, 19, 20], [], None, ser) # type: ignore
+
+    assert exc_info.value.received == 2048
+
+def test_cxfer_read_into():
+    """Test receiving straight into a buffer sized exactly as the IC"""
+    image = make_test_image(4096)
+    ser = FakeCXFERSerial(image)
+    buffer = bytearray(M3BoardCommands.cxfer_data_size(list(range(1, 13)), [13, 14, 15, 16, 17, 18, 19, 20]))
+
+    assert M3BoardCommands.cxfer_read_into(list(range(1, 13)), [13, 14, 15, 16, 17, 18, 19, 20], [], buffer, None, ser) == 4096 # type: ignore
+    assert buffer == image
+
+def test_cxfer_read_buffer_growth():
+    """Test that the transfer buffer grows if the board sends more data than expected"""
+    image = make_test_image(3072)
+    ser = FakeCXFERSerial(image)
+
+    assert CXFERTransfer.read(9, ser, None, 1024) == image # type: ignore
+
+def test_cxfer_read_into_small_buffer():
+    """Test that a caller-provided buffer is never resized"""
+    ser = FakeCXFERSerial(make_test_image(3072))
+
+    with pytest.raises(IOError, match='too small'):
+        CXFERTransfer.read_into(9, ser, bytearray(2048)) # type: ignore
+
+def test_cxfer_read_buffered():
+    """Test a CXFER read drained by the I/O thread, hashing every block in the consumer"""
+    image = make_test_image(4096)
+    ser = FakeCXFERSerial(image)
+    updates: list[int] = []
+    digest = hashlib.sha256()
+
+    data = M3BoardCommands.cxfer_read_buffered(list(range(1, 13)), [13, 14, 15, 16, 17, 18, 19, 20], [41], updates.append, ser, digest.update) # type: ignore
+
+    assert data == image
+    assert updates == [1024, 2048, 3072, 4096]
+    assert digest.digest() == hashlib.sha256(image).digest()
+    assert len(ser.acks) == 4
+
+def test_cxfer_buffered_ring():
+    """Test that the I/O thread receives ahead of a slow consumer, until the ring is full"""
+    image = make_test_image(8192)
+    ser = FakeCXFERSerial(image)
+
+    stream = CXFERTransfer.iter_blocks_buffered(9, ser, 3) # type: ignore
+    assert next(stream) == image[:1024]
+
+    deadline = time.perf_counter() + 2.0
+    while len(ser.acks) < 3 and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert len(ser.acks) == 3 # The block held by the consumer, and two more
+
+    assert b''.join(bytes(block) for block in stream) == image[1024:]
+    assert len(ser.acks) == 8
+
+def test_cxfer_buffered_errors():
+    """Test that errors in the I/O thread reach the consumer, and that an abandoned transfer stops the thread"""
+    ser = FakeCXFERSerial(make_test_image(3072), corrupt_block=1)
+
+    with pytest.raises(IOError, match='checksum'):
+        CXFERTransfer.read_buffered(9, ser) # type: ignore
+    assert len(ser.acks) == 1
+
+    stream = CXFERTransfer.iter_blocks_buffered(9, FakeCXFERSerial(make_test_image(8192)), 1) # type: ignore
+    next(stream)
+    stream.close()
+    assert not any(thread.name == 'cxfer-io' for thread in threading.enumerate())
+
+def test_cxfer_configuration_cache():
+    """Test that the configuration is sent in a single burst, and only when the profile changes"""
+    image = make_test_image(2048)
+    ser = FakeCXFERSerial(image)
+    address_pins = list(range(1, 12))
+    data_pins = [13, 14, 15, 16, 17, 18, 19, 20]
+
+    assert M3BoardCommands.cxfer_read(address_pins, data_pins, [41], None, ser) == image # type: ignore
+    config_frames = len(ser.frames) - 1
+    assert config_frames == 7 # Clear, address map, data map, hi mask, data mask and the two widths
+
+    assert M3BoardCommands.cxfer_read(address_pins, data_pins, [41], None, ser) == image # type: ignore
+    assert len(ser.frames) == config_frames + 2
+    assert ser.frames[-1][1] == CXFERTransfer.CXFERSubCommand.EXECUTE_READ.value
+
+    assert M3BoardCommands.cxfer_read(address_pins, data_pins, [40], None, ser) == image # type: ignore
+    assert len(ser.frames) == 2 * config_frames + 3
+
+    # A failed transfer invalidates the cached profile
+    ser.corrupt_block = 0
+    with pytest.raises(IOError):
+        M3BoardCommands.cxfer_read(address_pins, data_pins, [40], None, ser) # type: ignore
+    assert M3BoardCommands._CXFER_PROFILE_BY_SERIAL.get(ser) is None # type: ignore
@@ -0,0 +1,118 @@
+"""Tests for the detection cache"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import json
+import time
+
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+from dupicolib.board_utilities import HandshakeConfig
+from dupicolib.detection_cache import DetectionCache
+from board_fakes import FakeIdentifySerial, emulated_m3_board
+
+# Boards that need a full detection get the banner at once, don't wait long for it
+_SHORT_HANDSHAKE = HandshakeConfig(attempt_timeout=0.1)
+
+class FakeSilentSerial(FakeIdentifySerial):
+    """A board that is already in remote control mode: no banner, commands only"""
+
+    def __init__(self):
+        super().__init__()
+        self._rx.clear()
+        self.writes = 0
+
+    def write(self, data: bytes) -> int:
+        self.writes += 1
+        return super().write(data)
+
+class FakeResettingSerial(FakeIdentifySerial):
+    """A board that announces itself again after a DTR toggle"""
+
+    @property
+    def dtr(self) -> bool:
+        return self._dtr
+
+    @dtr.setter
+    def dtr(self, value: bool):
+        self._dtr = value
+        if value:
+            self._rx.extend(b'REMOTE_CONTROL_ENABLED\r\n')
+
+def test_cache_hit_skips_handshake(tmp_path):
+    """Test that a known board is identified with a single command, without waiting for a banner"""
+    cache = DetectionCache(tmp_path / 'boards.json')
+    assert cache.identify_board('fake', FakeIdentifySerial(), 'key') is not None # type: ignore
+
+    # Reload from disk
+    cache = DetectionCache(tmp_path / 'boards.json')
+    ser = FakeSilentSerial()
+    start = time.monotonic()
+    conn = cache.identify_board('fake', ser, 'key') # type: ignore
+
+    assert time.monotonic() - start < 0.5
+    assert conn is not None
+    assert ser.writes == 1
+    assert conn.model == 3
+    assert conn.version == '0.1.2'
+    assert conn.parsed_version is not None and conn.parsed_version['major'] == '0'
+    assert conn.command_class is M3BoardCommands
+
+def test_stale_entry_falls_back(tmp_path):
+    """Test that a reflashed board runs the full detection and refreshes the entry"""
+    cache = DetectionCache(tmp_path / 'boards.json')
+    assert cache.identify_board('fake', FakeIdentifySerial(), 'key') is not None # type: ignore
+    cache.lookup('key').version = '0.0.9' # type: ignore
+
+    conn = cache.identify_board('fake', FakeResettingSerial(), 'key', _SHORT_HANDSHAKE) # type: ignore
+
+    assert conn is not None
+    assert conn.version == '0.1.2'
+    assert cache.lookup('key').version == '0.1.2' # type: ignore
+
+def test_stale_entry_shares_deadline(tmp_path):
+    """Test that the check of a known board and the full detection after it share the same deadline"""
+    cache = DetectionCache(tmp_path / 'boards.json')
+    assert cache.identify_board('fake', FakeIdentifySerial(), 'key') is not None # type: ignore
+
+    ser = FakeSilentSerial()
+    ser.write = lambda data: len(data) # type: ignore # The board does not answer at all
+    start = time.monotonic()
+    conn = cache.identify_board('fake', ser, 'key', HandshakeConfig(deadline=0.4, attempt_timeout=0.4)) # type: ignore
+
+    assert conn is None
+    assert time.monotonic() - start < 0.6
+    assert cache.lookup('key') is None
+
+def test_unknown_class_is_a_miss(tmp_path):
+    """Test that a command class not known to dupicolib is never loaded from the cache file"""
+    cache = DetectionCache(tmp_path / 'boards.json')
+    assert cache.identify_board('fake', FakeIdentifySerial(), 'key') is not None # type: ignore
+
+    with open(tmp_path / 'boards.json', 'r', encoding='utf-8') as cache_file:
+        entries = json.load(cache_file)
+    entries['key']['command_class'] = 'os:system'
+    with open(tmp_path / 'boards.json', 'w', encoding='utf-8') as cache_file:
+        json.dump(entries, cache_file)
+
+    cache = DetectionCache(tmp_path / 'boards.json')
+    conn = cache.identify_board('fake', FakeResettingSerial(), 'key', _SHORT_HANDSHAKE) # type: ignore
+
+    assert conn is not None
+    assert conn.command_class is M3BoardCommands
+    assert cache.lookup('key').command_class == 'dupicolib.board_interfaces.m3_board_commands:M3BoardCommands' # type: ignore
+
+def test_cache_hit_drains_banner(tmp_path):
+    """Test that the banner sent by a freshly reset board does not get in the way of the cached check"""
+    cache = DetectionCache(tmp_path / 'boards.json')
+    assert cache.identify_board('emulated', emulated_m3_board(bytes(256)), 'key') is not None # type: ignore
+
+    start = time.monotonic()
+    conn = cache.identify_board('emulated', emulated_m3_board(bytes(256)), 'key') # type: ignore
+    elapsed = time.monotonic() - start
+
+    assert conn is not None
+    assert conn.command_class is M3BoardCommands
+    assert elapsed < 0.5
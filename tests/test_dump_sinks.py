@@ -0,0 +1,125 @@
+"""Tests for the dump sinks"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+from dupicolib.board_interfaces.brutus28_board_commands import Brutus28BoardCommands
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+from dupicolib.board_utilities import BoardUtilities
+from dupicolib.dump_sinks import IntelHexSink, MmapSink, RawFileSink, SRecordSink
+from dupicolib.emulators.link import EmulatedSerial
+from board_fakes import BRUTUS_ADDRESS_PINS, BRUTUS_DATA_PINS, FakeCXFERSerial, M3_ADDRESS_PINS, M3_DATA_PINS, emulated_m3_board, make_test_image, simulated_brutus_rom
+import pytest
+
+def _parse_intel_hex(text: str) -> dict[int, int]:
+    memory: dict[int, int] = {}
+    segment: int = 0
+
+    for line in text.splitlines():
+        record = bytes.fromhex(line[1:])
+        assert line[0] == ':' and sum(record) & 0xFF == 0 and record[0] == len(record) - 5
+        address, record_type, data = (record[1] << 8) | record[2], record[3], record[4:-1]
+
+        if record_type == 0x00:
+            assert address + len(data) <= 0x10000
+            memory.update({segment + address + idx: value for idx, value in enumerate(data)})
+        elif record_type == 0x04:
+            segment = int.from_bytes(data, 'big') << 16
+        elif record_type == 0x01:
+            break
+
+    return memory
+
+def _parse_srecord(text: str) -> tuple[dict[int, int], list[str]]:
+    memory: dict[int, int] = {}
+    types: list[str] = []
+
+    for line in text.splitlines():
+        record = bytes.fromhex(line[2:])
+        assert (sum(record) + 1) & 0xFF == 0 and record[0] == len(record) - 1
+        types.append(line[:2])
+
+        if line[1] in '123':
+            address_size = int(line[1]) + 1
+            address = int.from_bytes(record[1:1 + address_size], 'big')
+            memory.update({address + idx: value for idx, value in enumerate(record[1 + address_size:-1])})
+
+    return memory, types
+
+def test_mmap_sink(tmp_path):
+    """Test a CXFER dump straight into a memory-mapped file"""
+    image = make_test_image(1 << 15)
+    ser = emulated_m3_board(image)
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+
+    with MmapSink(tmp_path / 'dump.bin', len(image)) as sink:
+        assert M3BoardCommands.cxfer_read_to_sink(M3_ADDRESS_PINS, M3_DATA_PINS, [], sink, None, ser) == len(image) # type: ignore
+
+    assert (tmp_path / 'dump.bin').read_bytes() == image
+
+    with MmapSink(tmp_path / 'small.bin', 16) as sink:
+        with pytest.raises(IOError):
+            sink.write(bytes(17))
+
+def test_raw_sink_padding(tmp_path):
+    """Test that the padding of the last CXFER block is not written"""
+    image = make_test_image(256)
+    updates: list[int] = []
+
+    with RawFileSink(tmp_path / 'dump.bin') as sink:
+        M3BoardCommands.cxfer_read_to_sink(list(range(1, 9)), [13, 14, 15, 16, 17, 18, 19, 20], [], sink, updates.append, FakeCXFERSerial(image + bytes(768))) # type: ignore
+
+    assert (tmp_path / 'dump.bin').read_bytes() == image
+    assert updates == [256]
+
+    with RawFileSink(tmp_path / 'dump.bin', append=True) as sink:
+        sink.write(b'\xAA')
+    assert (tmp_path / 'dump.bin').read_bytes() == image + b'\xAA'
+
+def test_intel_hex_sink(tmp_path):
+    """Test the Intel HEX encoding, across 64 KiB segments and with unaligned blocks"""
+    image = make_test_image(0x14000)
+
+    with IntelHexSink(tmp_path / 'dump.hex', record_size=32, base_address=0x8) as sink:
+        for idx in range(0, len(image), 1000):
+            sink.write(memoryview(image)[idx:idx + 1000])
+
+    text = (tmp_path / 'dump.hex').read_text()
+    assert _parse_intel_hex(text) == {0x8 + idx: value for idx, value in enumerate(image)}
+    assert ':020000040001F9' in text.splitlines()
+    assert text.splitlines()[-1] == ':00000001FF'
+
+def test_srecord_sink(tmp_path):
+    """Test the S-record encoding and the selection of the address width"""
+    image = make_test_image(1000)
+
+    for size, data_type, end_type in ((len(image), 'S1', 'S9'), (0x20000, 'S2', 'S8'), (None, 'S3', 'S7')):
+        with SRecordSink(tmp_path / 'dump.s', size, header=b'test') as sink:
+            sink.write(image[:100])
+            sink.write(image[100:])
+
+        memory, types = _parse_srecord((tmp_path / 'dump.s').read_text())
+        assert memory == dict(enumerate(image))
+        assert types == ['S0', *[data_type] * 63, 'S5', end_type]
+
+def test_brutus28_sink(tmp_path):
+    """Test a Brutus28 dump written window by window"""
+    image = make_test_image(1 << len(BRUTUS_ADDRESS_PINS))
+    ser = EmulatedSerial(simulated_brutus_rom(image))
+    assert Brutus28BoardCommands.initialize_connection(ser) # type: ignore
+
+    with IntelHexSink(tmp_path / 'dump.hex') as sink:
+        assert Brutus28BoardCommands.cxfer_read_to_sink(BRUTUS_ADDRESS_PINS, BRUTUS_DATA_PINS, [], sink, None, ser) == len(image) # type: ignore
+
+    assert _parse_intel_hex((tmp_path / 'dump.hex').read_text()) == dict(enumerate(image))
+
+def test_sink_without_port(tmp_path):
+    """Test that a dump to a sink without a serial port reads nothing, like cxfer_read"""
+    with RawFileSink(tmp_path / 'dump.bin') as sink:
+        assert M3BoardCommands.cxfer_read_to_sink(M3_ADDRESS_PINS, M3_DATA_PINS, [], sink, None) == 0
+        assert Brutus28BoardCommands.cxfer_read_to_sink(BRUTUS_ADDRESS_PINS, BRUTUS_DATA_PINS, [], sink, None) == 0
+        assert Brutus28BoardCommands.cxfer_read_to_sink(BRUTUS_ADDRESS_PINS, BRUTUS_DATA_PINS, [], sink, None, EmulatedSerial(simulated_brutus_rom(bytes(1))), window_size=0) == 0 # type: ignore
+
+    assert (tmp_path / 'dump.bin').read_bytes() == b''
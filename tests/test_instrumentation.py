@@ -0,0 +1,108 @@
+"""Tests for the hot path instrumentation"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import json
+import time
+
+from dupicolib import instrumentation
+from dupicolib.board_interfaces.brutus28_board_commands import Brutus28BoardCommands
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+from dupicolib.board_interfaces.special_modes.cxfer import CXFERTransfer
+from dupicolib.board_utilities import BoardUtilities
+from dupicolib.emulators.brutus28_simulator import Brutus28Simulator
+from dupicolib.emulators.link import EmulatedSerial, LinkProfile
+from dupicolib.emulators.m3_emulator import M3Emulator
+from dupicolib.emulators.virtual_chips import VirtualROM
+from dupicolib.instrumentation import Histogram, Metrics
+from board_fakes import FakeCXFERSerial, make_test_image
+import pytest
+
+_ADDRESS_PINS: list[int] = list(range(1, 12))
+_DATA_PINS: list[int] = [13, 14, 15, 16, 17, 18, 19, 20]
+
+@pytest.fixture
+def metrics():
+    observations: list[tuple[str, str, float]] = []
+    collector = instrumentation.enable(Metrics(lambda *obs: observations.append(obs)))
+    collector.observations = observations # type: ignore
+    yield collector
+    instrumentation.disable()
+
+def test_histogram():
+    """Test bucket boundaries"""
+    histogram = Histogram((1.0, 2.0))
+    for value in (0.5, 1.0, 1.5, 3.0):
+        histogram.observe(value)
+
+    assert histogram.to_dict()['buckets'] == {'1.0': 2, '2.0': 3, '+Inf': 4}
+    assert histogram.count == 4 and histogram.sum == 6.0
+
+def test_binary_metrics(metrics):
+    """Test latency, traffic and CXFER throughput for the dupico"""
+    image = make_test_image(1 << len(_ADDRESS_PINS))
+    ser = EmulatedSerial(M3Emulator(VirtualROM(image, _ADDRESS_PINS, _DATA_PINS)))
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+
+    assert M3BoardCommands.get_model(ser) == 3 # type: ignore
+    assert M3BoardCommands.cxfer_read(_ADDRESS_PINS, _DATA_PINS, [], None, ser) == image # type: ignore
+
+    snapshot = json.loads(metrics.to_json())
+    assert snapshot['command_latency_seconds']['0x04']['count'] == 1
+    assert snapshot['command_latency_seconds']['binary_burst']['count'] == 1
+    assert 'text_burst' not in snapshot['command_latency_seconds']
+    assert snapshot['cxfer_blocks'] == 2
+    assert snapshot['cxfer_bytes_per_second'] > 0
+    assert snapshot['bytes_in'] > len(image)
+    assert ('command_latency_seconds', '0x04', pytest.approx(metrics.latency['0x04'].sum)) in metrics.observations
+
+    text = metrics.to_prometheus()
+    assert 'dupicolib_command_latency_seconds_count{command="0x04"} 1' in text
+    assert 'dupicolib_cxfer_blocks_total 2' in text
+
+def test_buffered_cxfer_block_time(metrics):
+    """Test that the time a buffered transfer waits for a slow consumer is not counted as link time"""
+    image = make_test_image(8192)
+
+    for _ in CXFERTransfer.iter_blocks_buffered(9, FakeCXFERSerial(image), 1): # type: ignore
+        time.sleep(0.02)
+
+    assert metrics.cxfer_blocks == 8
+    assert metrics.cxfer_time < 0.05
+
+def test_error_metrics(metrics):
+    """Test that checksum errors and buffer resets are counted"""
+    ser = EmulatedSerial(M3Emulator(VirtualROM(b'', _ADDRESS_PINS, _DATA_PINS)), LinkProfile(corrupt_rate=1.0, seed=3))
+    ser.reset_input_buffer()
+
+    for _ in range(8):
+        M3BoardCommands.test_board(ser) # type: ignore
+
+    assert metrics.checksum_errors + metrics.response_errors == 8
+    assert metrics.buffer_resets == 8
+
+def test_text_metrics(metrics):
+    """Test the Brutus28 shell commands"""
+    ser = EmulatedSerial(Brutus28Simulator())
+    assert Brutus28BoardCommands.initialize_connection(ser) # type: ignore
+    assert Brutus28BoardCommands.read_pins(ser) == 0 # type: ignore
+    assert Brutus28BoardCommands.read_pins_sequence(4, None, ser) is not None # type: ignore
+
+    assert metrics.latency['pld input'].count == 1
+    assert metrics.latency['text_burst'].count == 1
+    assert 'binary_burst' not in metrics.latency
+
+def test_disabled():
+    """Test that nothing is collected when disabled"""
+    collector = Metrics()
+    instrumentation.enable(collector)
+    instrumentation.disable()
+
+    ser = EmulatedSerial(M3Emulator(VirtualROM(b'', _ADDRESS_PINS, _DATA_PINS)))
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+    assert M3BoardCommands.get_model(ser) == 3 # type: ignore
+
+    assert not collector.latency
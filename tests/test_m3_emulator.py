@@ -0,0 +1,79 @@
+"""Tests for the dupico M3 emulator"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import os
+
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+from dupicolib.board_pool import BoardPool
+from dupicolib.board_utilities import BoardUtilities
+from dupicolib.emulators.link import LinkProfile, PtyServer
+from dupicolib.emulators.m3_emulator import M3Emulator
+from dupicolib.emulators.virtual_chips import VirtualROM
+from dupicolib.partitioned_dump import PartitionedDump
+from board_fakes import M3_ADDRESS_PINS, M3_DATA_PINS, emulated_m3_board, make_test_image
+import pytest
+import serial
+
+def test_emulator_identify_and_pins():
+    """Test the handshake, identification and pin access on the emulator"""
+    image = make_test_image(1 << 15)
+    ser = emulated_m3_board(image)
+
+    conn = BoardPool.identify_board('emulated', ser) # type: ignore
+    assert conn is not None and conn.command_class is M3BoardCommands
+    assert M3BoardCommands.test_board(ser) # type: ignore
+    assert M3BoardCommands.set_power(True, ser) # type: ignore
+
+    readbacks = M3BoardCommands.write_pins_sequence(M3BoardCommands.map_values_to_pins_array(M3_ADDRESS_PINS, range(256)), None, ser) # type: ignore
+    assert readbacks is not None
+    assert [int(value) for value in M3BoardCommands.map_pins_to_values_array(M3_DATA_PINS, readbacks)] == list(image[:256])
+
+def test_emulator_cxfer():
+    """Test complete, partitioned and remapped CXFER transfers"""
+    image = make_test_image(1 << 15)
+    ser = emulated_m3_board(image)
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+
+    assert M3BoardCommands.cxfer_read(M3_ADDRESS_PINS, M3_DATA_PINS, [], None, ser) == image # type: ignore
+    assert PartitionedDump(M3_ADDRESS_PINS, M3_DATA_PINS, [], 2).read(M3BoardCommands, ser) == image # type: ignore
+
+    # Swapping two data lines goes through the pin-level model
+    swapped = [M3_DATA_PINS[1], M3_DATA_PINS[0], *M3_DATA_PINS[2:]]
+    data = M3BoardCommands.cxfer_read(M3_ADDRESS_PINS[:10], swapped, [], None, ser) # type: ignore
+    assert data == bytes((value & 0xFC) | ((value & 1) << 1) | ((value >> 1) & 1) for value in image[:1024])
+
+def test_emulator_cxfer_after_reset():
+    """Test that the CXFER configuration is sent again after the board is reset"""
+    image = make_test_image(1 << 15)
+    ser = emulated_m3_board(image)
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+    assert M3BoardCommands.cxfer_read(M3_ADDRESS_PINS, M3_DATA_PINS, [], None, ser) == image # type: ignore
+
+    # The reset clears the configuration held by the board
+    ser.dtr = False
+    ser.dtr = True
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+    assert M3BoardCommands.cxfer_read(M3_ADDRESS_PINS, M3_DATA_PINS, [], None, ser) == image # type: ignore
+
+def test_emulator_corruption():
+    """Test that injected corruption is caught by the CXFER checksums"""
+    ser = emulated_m3_board(make_test_image(1 << 15), LinkProfile(corrupt_rate=1.0, seed=1))
+    ser.reset_input_buffer()
+
+    with pytest.raises(IOError):
+        M3BoardCommands._cxfer_configure(M3_ADDRESS_PINS, M3_DATA_PINS, [], ser) # type: ignore
+
+@pytest.mark.skipif(not hasattr(os, 'openpty'), reason='ptys are not available')
+def test_emulator_pty():
+    """Test the emulator served on a pty, through pyserial"""
+    image = make_test_image(1 << 15)
+
+    with PtyServer(M3Emulator(VirtualROM(image, M3_ADDRESS_PINS, M3_DATA_PINS))) as server:
+        with serial.Serial(server.port, 115200, timeout=1.0) as ser:
+            conn = BoardPool.identify_board(server.port, ser)
+            assert conn is not None and conn.model == 3
+            assert M3BoardCommands.cxfer_read(M3_ADDRESS_PINS, M3_DATA_PINS, [], None, ser) == image
@@ -0,0 +1,65 @@
+"""Tests for partitioned dumps"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+from dupicolib.board_interfaces.brutus28_board_commands import Brutus28BoardCommands
+from dupicolib.board_pool import BoardConnection, BoardPool
+from dupicolib.partitioned_dump import PartitionedDump
+from board_fakes import FakeBrutusSerial
+import pytest
+
+_ADDRESS_PINS: list[int] = [1, 2, 3, 4, 5, 6, 7]
+_DATA_PINS: list[int] = [10, 11, 12, 13, 14, 15, 16, 17]
+_HI_PINS: list[int] = [20]
+
+def _rom_serial() -> FakeBrutusSerial:
+    # The data is a function of the address, and is valid only if the hi pin is set
+    def input_provider(last_output: int) -> int:
+        address = Brutus28BoardCommands.map_pins_to_value(_ADDRESS_PINS, last_output)
+        data = (address * 3 + 1) & 0xFF if Brutus28BoardCommands.map_pins_to_value(_HI_PINS, last_output) else 0
+        return last_output | Brutus28BoardCommands.map_value_to_pins(_DATA_PINS, data)
+
+    return FakeBrutusSerial(input_provider)
+
+_IMAGE: bytes = bytes((address * 3 + 1) & 0xFF for address in range(1 << len(_ADDRESS_PINS)))
+
+def test_partition_profiles():
+    """Test that top address lines are moved to the hi pins"""
+    partitions = PartitionedDump(_ADDRESS_PINS, _DATA_PINS, _HI_PINS, 2).partitions
+
+    assert [partition.hi_pins for partition in partitions] == [[20], [20, 6], [20, 7], [20, 6, 7]]
+    assert all(partition.address_pins == _ADDRESS_PINS[:5] for partition in partitions)
+    assert [partition.offset for partition in partitions] == [0, 32, 64, 96]
+
+def test_partitioned_read():
+    """Test that partitions are stitched back in order"""
+    assert PartitionedDump(_ADDRESS_PINS, _DATA_PINS, _HI_PINS, 3).read(Brutus28BoardCommands, _rom_serial()) == _IMAGE # type: ignore
+
+def test_range_read():
+    """Test dumping only the partitions containing a range"""
+    dump = PartitionedDump.for_range(_ADDRESS_PINS, _DATA_PINS, _HI_PINS, 3, 20, 40)
+
+    assert [partition.index for partition in dump.partitions] == [1, 2]
+    assert dump.offset == 16
+    assert dump.read(Brutus28BoardCommands, _rom_serial()) == _IMAGE[16:48] # type: ignore
+
+def test_invalid_partitions():
+    with pytest.raises(ValueError):
+        PartitionedDump(_ADDRESS_PINS, _DATA_PINS, _HI_PINS, 8)
+
+    with pytest.raises(ValueError):
+        PartitionedDump(_ADDRESS_PINS, _DATA_PINS, _HI_PINS, 2, [4])
+
+    # A hi pin would keep a top address line high in every partition
+    with pytest.raises(ValueError):
+        PartitionedDump(_ADDRESS_PINS, _DATA_PINS, _HI_PINS + [7], 2)
+
+def test_parallel_read():
+    """Test partitions spread across several boards"""
+    pool = BoardPool([])
+    pool._boards = [BoardConnection(f'fake{idx}', _rom_serial(), 28, 'Version', None, Brutus28BoardCommands) for idx in range(3)] # type: ignore
+
+    assert PartitionedDump(_ADDRESS_PINS, _DATA_PINS, _HI_PINS, 3).read_parallel(pool) == _IMAGE
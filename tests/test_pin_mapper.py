@@ -0,0 +1,57 @@
+"""Tests for the precompiled pin mapper"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import random
+
+from dupicolib.board_commands_interface import BoardCommandsInterface
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+from dupicolib.pin_mapper import PinMapper
+import dupicolib.pin_mapper as pin_mapper_module
+import pytest
+
+def test_pin_mapper_matches_reference(pin_list_18bit, ignored_pin_list):
+    """Compare the table-based mapper with the bit-by-bit implementation"""
+    rnd = random.Random(1234)
+
+    for pins in (pin_list_18bit, ignored_pin_list):
+        mapper = PinMapper(M3BoardCommands._PIN_NUMBER_TO_INDEX_MAP, pins)
+
+        for _ in range(500):
+            value: int = rnd.getrandbits(64)
+            assert mapper.map_value_to_pins(value) == BoardCommandsInterface._map_value_to_pins(M3BoardCommands._PIN_NUMBER_TO_INDEX_MAP, pins, value)
+            assert mapper.map_pins_to_value(value) == BoardCommandsInterface._map_pins_to_value(M3BoardCommands._PIN_NUMBER_TO_INDEX_MAP, pins, value)
+
+def test_pin_mapper_invalid_pins(invalid_pin_list):
+    """Tests that an exception is raised when building a mapper for pins not specified in the map"""
+    with pytest.raises(KeyError):
+        PinMapper(M3BoardCommands._PIN_NUMBER_TO_INDEX_MAP, invalid_pin_list)
+
+def test_pin_mapper_cache(pin_list_18bit):
+    """Tests that mappers are built once per pin list"""
+    assert M3BoardCommands._get_pin_mapper(tuple(pin_list_18bit)) is M3BoardCommands._get_pin_mapper(tuple(pin_list_18bit))
+
+def test_map_array_numpy(pin_list_18bit):
+    """Test the vectorized mapping of a whole address space"""
+    np = pytest.importorskip('numpy')
+
+    addresses = np.arange(1 << len(pin_list_18bit), dtype=np.uint64)
+    pin_states = M3BoardCommands.map_values_to_pins_array(pin_list_18bit, addresses)
+
+    assert pin_states.dtype == np.uint64
+    assert int(pin_states[0x3FFFF]) == 0x1FA00FFE
+    assert int(pin_states[0x12345]) == 0x7000A22
+    assert all(int(pin_states[idx]) == M3BoardCommands.map_value_to_pins(pin_list_18bit, idx) for idx in range(0, 1 << 18, 997))
+    assert np.array_equal(M3BoardCommands.map_pins_to_values_array(pin_list_18bit, pin_states), addresses)
+
+def test_map_array_fallback(pin_list_18bit, monkeypatch):
+    """Test the pure Python fallback used when NumPy is not installed"""
+    monkeypatch.setattr(pin_mapper_module, 'np', None)
+    mapper = PinMapper(M3BoardCommands._PIN_NUMBER_TO_INDEX_MAP, pin_list_18bit)
+
+    pin_states = mapper.map_values_to_pins_array([0x3FFFF, 0x12345])
+    assert list(pin_states) == [0x1FA00FFE, 0x7000A22]
+    assert list(mapper.map_pins_to_values_array(pin_states)) == [0x3FFFF, 0x12345]
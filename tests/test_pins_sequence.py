@@ -0,0 +1,43 @@
+"""Tests for pipelined pin sequences"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+from array import array
+
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+from board_fakes import FakePinsSerial
+
+def test_write_pins_sequence_m3():
+    """Test a pipelined sequence of writes"""
+    ser = FakePinsSerial()
+    values = array('Q', range(0, 1000, 7))
+
+    readbacks = M3BoardCommands.write_pins_sequence(values, None, ser, window_size=16) # type: ignore
+
+    assert list(readbacks) == [~value & 0xFFFFFFFFFF for value in values] # type: ignore
+    assert len(ser.writes) == -(len(values) // -16)
+
+def test_read_pins_sequence_m3():
+    """Test a pipelined sequence of reads"""
+    ser = FakePinsSerial()
+    ser.pins = 0xFF
+
+    assert list(M3BoardCommands.read_pins_sequence(5, None, ser)) == [0xFFFFFFFF00] * 5 # type: ignore
+
+def test_pins_sequence_early_stop_m3():
+    """Test that the callback can stop the sequence"""
+    ser = FakePinsSerial()
+    progress: list[int] = []
+
+    def callback(steps: int) -> bool:
+        progress.append(steps)
+        return steps < 20
+
+    readbacks = M3BoardCommands.write_pins_sequence(range(100), callback, ser, window_size=8) # type: ignore
+
+    assert len(readbacks) == 20 # type: ignore
+    assert progress == list(range(1, 21))
+    assert len(ser.writes) == 3
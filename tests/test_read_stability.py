@@ -0,0 +1,89 @@
+"""Tests for the multi-pass stability analysis"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+from dupicolib import read_stability
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+from dupicolib.board_utilities import BoardUtilities
+from dupicolib.emulators.link import EmulatedSerial
+from dupicolib.emulators.m3_emulator import M3Emulator
+from dupicolib.emulators.virtual_chips import VirtualROM
+from dupicolib.read_stability import MultiPassDump, PassComparator
+from board_fakes import M3_ADDRESS_PINS, M3_DATA_PINS, make_test_image
+import pytest
+
+class FlakyROM(VirtualROM):
+    """A ROM with a weak bit, flipping on every other read, and a bit flipping only on the third read"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = 0
+
+    def cxfer_image(self, address_map, data_map, hi_mask):
+        data = bytearray(super().cxfer_image(address_map, data_map, hi_mask)) # type: ignore
+        if self.reads % 2:
+            data[200] ^= 0x01
+        if self.reads == 2:
+            data[5000] ^= 0x80
+        self.reads += 1
+        return bytes(data)
+
+def test_multi_pass_stable():
+    """Test that a stable chip stops after the agreeing passes"""
+    image = make_test_image(1 << 15)
+    ser = EmulatedSerial(M3Emulator(VirtualROM(image, M3_ADDRESS_PINS, M3_DATA_PINS)))
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+    updates: list[tuple[int, int]] = []
+
+    report = MultiPassDump(M3_ADDRESS_PINS, M3_DATA_PINS, [], max_passes=5, agreeing_passes=3).read(M3BoardCommands, ser, lambda *update: updates.append(update)) # type: ignore
+
+    assert report.stable and report.passes == 3
+    assert report.reference == image
+    assert report.unstable_bits() == {} and report.unstable_addresses() == []
+    assert updates[-1] == (2, len(image)) and len(updates) == 3 * 32
+
+def test_multi_pass_unstable():
+    """Test that flipping bits are found, and keep the dump going up to the maximum passes"""
+    image = make_test_image(1 << 15)
+    chip = FlakyROM(image, M3_ADDRESS_PINS, M3_DATA_PINS)
+    ser = EmulatedSerial(M3Emulator(chip))
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+
+    report = MultiPassDump(M3_ADDRESS_PINS, M3_DATA_PINS, [], max_passes=4, agreeing_passes=3).read(M3BoardCommands, ser) # type: ignore
+
+    assert report.passes == 4 and report.differing_passes == 3
+    assert report.reference == image
+    assert report.unstable_bits() == {200: 0x01, 5000: 0x80}
+    assert report.unstable_addresses() == [200, 5000]
+
+@pytest.mark.parametrize('numpy', [True, False])
+def test_pass_comparator(numpy, monkeypatch):
+    """Test the comparison of unaligned blocks, with and without NumPy"""
+    if numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(read_stability, 'np', None)
+
+    reference = make_test_image(3000)
+    noisy = bytearray(reference)
+    noisy[0] ^= 0x10
+    noisy[1500] ^= 0x03
+
+    comparator = PassComparator(reference)
+    for idx in range(0, len(noisy), 700):
+        comparator.write(memoryview(noisy)[idx:idx + 700])
+    assert comparator.differs
+
+    comparator.start_pass()
+    comparator.write(reference)
+    assert not comparator.differs
+
+    with pytest.raises(IOError):
+        comparator.write(b'\x00')
+
+    report = read_stability.StabilityReport(reference, comparator.mask, 2, 3, 1)
+    assert report.unstable_bits() == {0: 0x10, 1500: 0x03}
+    assert report.unstable_addresses() == [0, 750]
@@ -0,0 +1,90 @@
+"""Tests for the retried and resumable dumps"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import time
+
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+from dupicolib.board_utilities import BoardUtilities, HandshakeConfig
+from dupicolib.emulators.link import LinkProfile
+from dupicolib.resumable_dump import DumpInterruptedError, ResumableDump, ResumeToken
+from board_fakes import M3_ADDRESS_PINS, M3_DATA_PINS, emulated_m3_board, make_test_image
+import pytest
+
+def test_resumable_dump_retries():
+    """Test that partitions failing on a noisy link are read again"""
+    image = make_test_image(1 << 15)
+    ser = emulated_m3_board(image, LinkProfile(corrupt_rate=0.05, seed=3))
+    ser.timeout = 0.1
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+
+    dump = ResumableDump(M3_ADDRESS_PINS, M3_DATA_PINS, [], 3, max_retries=10)
+    result = dump.read(M3BoardCommands, ser) # type: ignore
+
+    assert result.data == image
+    assert result.token.completed == set(range(8))
+    assert result.total_retries > 0
+    assert all(partition in range(8) for partition in result.retries)
+
+def test_resumable_dump_resume(tmp_path):
+    """Test that an interrupted dump continues from the last verified partition"""
+    image = make_test_image(1 << 15)
+    profile = LinkProfile()
+    ser = emulated_m3_board(image, profile)
+    ser.timeout = 0.1
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+
+    def break_link(verified: int) -> None:
+        if verified == 3 * 4096:
+            profile.corrupt_rate = 1.0
+
+    # The banner does not get through the broken link either, don't wait long for it
+    dump = ResumableDump(M3_ADDRESS_PINS, M3_DATA_PINS, [], 3, max_retries=1, reset_config=HandshakeConfig(attempt_timeout=0.2))
+    with pytest.raises(DumpInterruptedError) as exc_info:
+        dump.read(M3BoardCommands, ser, update_callback=break_link) # type: ignore
+
+    partial = exc_info.value.result
+    assert partial.token.completed == {0, 1, 2}
+    assert partial.retries == {3: 1}
+    assert partial.data[:3 * 4096] == image[:3 * 4096]
+
+    partial.token.save(tmp_path / 'dump.token')
+    token = ResumeToken.load(tmp_path / 'dump.token')
+    assert token == partial.token
+
+    profile.corrupt_rate = 0.0
+    progress: list[int] = []
+    result = dump.read(M3BoardCommands, ser, token, partial.data, progress.append) # type: ignore
+
+    assert result.data == image
+    assert progress == [4096 * idx for idx in range(4, 9)]
+
+    with pytest.raises(ValueError):
+        ResumableDump(M3_ADDRESS_PINS, M3_DATA_PINS, [], 2).read(M3BoardCommands, ser, token, partial.data) # type: ignore
+    with pytest.raises(ValueError):
+        dump.read(M3BoardCommands, ser, token) # type: ignore
+
+def test_resumable_dump_resync():
+    """Test that a retry holds the board in reset for a while and sends the CXFER configuration again"""
+    image = make_test_image(1 << 15)
+    ser = emulated_m3_board(image)
+    ser.timeout = 0.1
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+    assert M3BoardCommands.cxfer_read(M3_ADDRESS_PINS, M3_DATA_PINS, [], None, ser) == image # type: ignore
+    assert ser in M3BoardCommands._CXFER_PROFILE_BY_SERIAL
+
+    dump = ResumableDump(M3_ADDRESS_PINS, M3_DATA_PINS, [], 3, reset_config=HandshakeConfig(initial_backoff=0.1))
+    start = time.perf_counter()
+    dump._resync(M3BoardCommands, ser) # type: ignore
+
+    assert time.perf_counter() - start >= 0.1
+    assert ser not in M3BoardCommands._CXFER_PROFILE_BY_SERIAL
+    assert M3BoardCommands.cxfer_read(M3_ADDRESS_PINS, M3_DATA_PINS, [], None, ser) == image # type: ignore
+
+def test_resumable_dump_default_partitions():
+    """Test that the default partitions are about 32 KiB"""
+    assert len(ResumableDump(list(range(19)), list(range(8)), []).partitions) == 16
+    assert len(ResumableDump(list(range(10)), list(range(8)), []).partitions) == 1
@@ -0,0 +1,105 @@
+"""Tests for the incremental hashing and the index of known ROM images"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import hashlib
+import zlib
+
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+from dupicolib.board_utilities import BoardUtilities
+from dupicolib.dump_sinks import RawFileSink
+from dupicolib.rom_index import DumpSkippedError, HashingSink, MatchAction, RomIndex
+from board_fakes import M3_ADDRESS_PINS, M3_DATA_PINS, emulated_m3_board, make_test_image
+import pytest
+
+def test_rom_index(tmp_path):
+    """Test adding and looking up images, and that the parameters of the index are persisted"""
+    image = make_test_image(4096)
+
+    with RomIndex(tmp_path / 'roms.db', block_size=512, prefix_depth=4) as index:
+        rom = index.add('test', image)
+        assert index.add('duplicate', image) == rom
+        assert len(index) == 1
+
+        assert rom.size == 4096 and rom.crc32 == zlib.crc32(image) and rom.sha256 == hashlib.sha256(image).digest()
+        assert index.lookup(hashlib.sha256(image).digest()) == rom
+        assert index.match_prefix(2, hashlib.sha256(image[:1024]).digest()) == [rom]
+        assert index.match_prefix(2, hashlib.sha256(image[:1024]).digest(), 8192) == []
+        assert index.match_prefix(5, hashlib.sha256(image[:2560]).digest()) == []
+
+    with RomIndex(tmp_path / 'roms.db') as index:
+        assert (index.block_size, index.prefix_depth) == (512, 4)
+        assert index.lookup(rom.sha256) == rom
+
+def test_hashing_sink(tmp_path):
+    """Test the running hashes of a CXFER dump, identified while it's being written to disk"""
+    image = make_test_image(1 << 15)
+    ser = emulated_m3_board(image)
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+    matches: list[tuple[int, list[str]]] = []
+
+    def on_match(depth, roms) -> MatchAction:
+        matches.append((depth, [rom.name for rom in roms]))
+        return MatchAction.CONTINUE
+
+    with RomIndex(tmp_path / 'roms.db') as index:
+        index.add('other', bytes(len(image)))
+        index.add('test', image)
+
+        with HashingSink(RawFileSink(tmp_path / 'dump.bin'), index, len(image), on_match) as sink:
+            M3BoardCommands.cxfer_read_to_sink(M3_ADDRESS_PINS, M3_DATA_PINS, [], sink, None, ser) # type: ignore
+
+        assert matches == [(depth, ['test']) for depth in range(1, 17)]
+        assert sink.identify() is not None and sink.identify().name == 'test' # type: ignore
+
+    assert (tmp_path / 'dump.bin').read_bytes() == image
+    assert sink.crc32 == zlib.crc32(image) and sink.sha256 == hashlib.sha256(image).digest()
+    assert list(sink.block_crc32) == [zlib.crc32(image[idx:idx + 1024]) for idx in range(0, len(image), 1024)]
+
+def test_hashing_sink_unaligned():
+    """Test that blocks are hashed the same whatever the size of the writes, and that unknown images stop the matching"""
+    image = make_test_image(5000)
+    matches: list[int] = []
+
+    def on_match(depth, roms) -> MatchAction:
+        matches.append(len(roms))
+        return MatchAction.CONTINUE
+
+    with HashingSink(block_size=1024) as sink:
+        for idx in range(0, len(image), 700):
+            sink.write(memoryview(image)[idx:idx + 700])
+
+    assert list(sink.block_crc32) == [zlib.crc32(image[idx:idx + 1024]) for idx in range(0, len(image), 1024)]
+    assert sink.written == len(image)
+
+    with RomIndex(':memory:') as index:
+        index.add('test', make_test_image(8192)[::-1])
+
+        sink = HashingSink(index=index, on_match=on_match)
+        sink.write(image)
+        assert matches == [0]
+
+def test_hashing_sink_skip(tmp_path):
+    """Test that a known chip can be skipped after its first blocks"""
+    image = make_test_image(1 << 15)
+    ser = emulated_m3_board(image)
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+
+    with RomIndex(tmp_path / 'roms.db') as index:
+        index.add('test', image)
+        sink = HashingSink(index=index, on_match=lambda depth, roms: MatchAction.SKIP if depth == 2 else MatchAction.CONTINUE)
+
+        with pytest.raises(DumpSkippedError) as exc_info:
+            M3BoardCommands.cxfer_read_to_sink(M3_ADDRESS_PINS, M3_DATA_PINS, [], sink, None, ser) # type: ignore
+
+    assert [rom.name for rom in exc_info.value.matches] == ['test']
+    assert sink.written == 1024
+
+    # The board is left in the middle of the transfer, and must be reset
+    ser.dtr = False
+    ser.dtr = True
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+    assert M3BoardCommands.cxfer_read(M3_ADDRESS_PINS, M3_DATA_PINS, [], None, ser) == image # type: ignore
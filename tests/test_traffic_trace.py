@@ -0,0 +1,77 @@
+"""Tests for the traffic recorder and replayer"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, '.') # Make VSCode happy...
+
+import time
+
+from dupicolib.board_interfaces.brutus28_board_commands import Brutus28BoardCommands
+from dupicolib.board_interfaces.m3_board_commands import M3BoardCommands
+from dupicolib.board_utilities import BoardUtilities
+from dupicolib.emulators.brutus28_simulator import Brutus28Simulator
+from dupicolib.emulators.link import EmulatedSerial, LinkProfile
+from dupicolib.emulators.m3_emulator import M3Emulator
+from dupicolib.emulators.virtual_chips import VirtualROM
+from dupicolib.traffic_trace import RecordingSerial, ReplaySerial, TraceEventKind, TraceMismatchError, read_trace
+from board_fakes import make_test_image
+import pytest
+
+_ADDRESS_PINS: list[int] = list(range(1, 12))
+_DATA_PINS: list[int] = [13, 14, 15, 16, 17, 18, 19, 20]
+
+def _record_m3_session(path, profile: LinkProfile | None = None) -> bytes:
+    image = make_test_image(1 << len(_ADDRESS_PINS))
+
+    with RecordingSerial(EmulatedSerial(M3Emulator(VirtualROM(image, _ADDRESS_PINS, _DATA_PINS)), profile), path) as ser: # type: ignore
+        assert BoardUtilities.initialize_connection(ser) # type: ignore
+        assert M3BoardCommands.get_model(ser) == 3 # type: ignore
+        assert M3BoardCommands.cxfer_read(_ADDRESS_PINS, _DATA_PINS, [], None, ser) == image # type: ignore
+
+    return image
+
+def test_record_and_replay(tmp_path):
+    """Test that a recorded dupico session replays identically"""
+    image = _record_m3_session(tmp_path / 'session.trace')
+
+    events = read_trace(tmp_path / 'session.trace')
+    assert events[0].kind == TraceEventKind.READ
+    assert sum(len(event.data) for event in events if event.kind == TraceEventKind.READ) > len(image)
+
+    ser = ReplaySerial(tmp_path / 'session.trace')
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+    assert M3BoardCommands.get_model(ser) == 3 # type: ignore
+    assert M3BoardCommands.cxfer_read(_ADDRESS_PINS, _DATA_PINS, [], None, ser) == image # type: ignore
+    assert ser.finished
+
+def test_replay_mismatch(tmp_path):
+    """Test that a host diverging from the recording is detected"""
+    _record_m3_session(tmp_path / 'session.trace')
+
+    ser = ReplaySerial(tmp_path / 'session.trace')
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+
+    with pytest.raises(TraceMismatchError):
+        M3BoardCommands.get_version(ser) # type: ignore
+
+def test_replay_realtime(tmp_path):
+    """Test that the recorded latency is reproduced"""
+    _record_m3_session(tmp_path / 'session.trace', LinkProfile(latency=0.01))
+
+    ser = ReplaySerial(tmp_path / 'session.trace', realtime=True)
+    assert BoardUtilities.initialize_connection(ser) # type: ignore
+
+    start_time = time.perf_counter()
+    assert M3BoardCommands.get_model(ser) == 3 # type: ignore
+    assert time.perf_counter() - start_time >= 0.009
+
+def test_replay_brutus28(tmp_path):
+    """Test a Brutus28 session"""
+    with RecordingSerial(EmulatedSerial(Brutus28Simulator()), tmp_path / 'brutus.trace') as ser: # type: ignore
+        assert Brutus28BoardCommands.initialize_connection(ser) # type: ignore
+        assert list(Brutus28BoardCommands.write_pins_sequence(range(100), None, ser)) == list(range(100)) # type: ignore
+
+    ser = ReplaySerial(tmp_path / 'brutus.trace')
+    assert Brutus28BoardCommands.initialize_connection(ser) # type: ignore
+    assert list(Brutus28BoardCommands.write_pins_sequence(range(100), None, ser)) == list(range(100)) # type: ignore